@@ -6,9 +6,9 @@ import chainlit as cl
 from dotenv import load_dotenv
 
 from ai_agent_work_base.core.llm import LLMClient
-from ai_agent_work_base.engine.loader import WorkflowLoader
 from ai_agent_work_base.engine.executor import GraphExecutor
-from ai_agent_work_base.skills import load_all_skills
+from ai_agent_work_base.engine.registry import get_registry
+from ai_agent_work_base.skills import get_skill_registry
 from ai_agent_work_base.schemas.workflow import NodeDefinition
 
 # Load environment variables
@@ -18,22 +18,17 @@ load_dotenv()
 WORKFLOW_DIR = Path("workflows")
 
 def get_available_workflows():
-    """workflowsディレクトリ内のYAMLファイルを取得"""
-    files = list(WORKFLOW_DIR.glob("*.yaml")) + list(WORKFLOW_DIR.glob("*.yml"))
-    workflows = []
-    for f in files:
-        try:
-            wf = WorkflowLoader.load(f)
-            workflows.append({"name": wf.name, "path": f, "obj": wf})
-        except Exception as e:
-            print(f"Error loading {f}: {e}")
-    return workflows
+    """workflowsディレクトリ内のワークフローを取得（共有レジストリの読み込み済み定義を使う）"""
+    registry = get_registry(WORKFLOW_DIR)
+    for entry in registry.catalog().entries:
+        if entry["error"] is not None:
+            print(f"Error loading {WORKFLOW_DIR / entry['file']}: {entry['error']}")
+    return [{"name": wf.name, "path": path, "obj": wf} for path, wf in registry.workflows()]
 
 @cl.on_chat_start
 async def start():
     """セッション開始時にワークフロー選択を表示"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if not os.getenv("OPENAI_API_KEY") and not os.getenv("LLM_BACKENDS"):
         await cl.Message(content="Error: OPENAI_API_KEY is not set.").send()
         return
 
@@ -58,7 +53,7 @@ async def on_workflow_selected(action: cl.Action):
     """ワークフローが選択されたときの処理"""
     workflow_path = Path(action.payload["path"])
     try:
-        workflow = WorkflowLoader.load(workflow_path)
+        workflow = get_registry(WORKFLOW_DIR).get(workflow_path.name)
     except Exception as e:
         await cl.Message(content=f"Error loading workflow: {e}").send()
         return
@@ -86,37 +81,46 @@ async def on_workflow_selected(action: cl.Action):
 
 async def execute_workflow(workflow, inputs):
     """ワークフローを実行する"""
-    import asyncio
     llm_client = LLMClient()
-    skills = load_all_skills()
-
-    def sync_on_start(node: NodeDefinition):
-        cl.run_sync(
-            cl.Message(content=f"▶️ **Step: {node.id}** ({node.type}) executing...").send()
-        )
-
-    def sync_on_end(node: NodeDefinition, output: Any):
+    skills = get_skill_registry()
+
+    # llmノードの出力をストリーミング表示するメッセージ（ノードIDごと）
+    streams: Dict[str, cl.Message] = {}
+
+    async def on_start(node: NodeDefinition):
+        await cl.Message(content=f"▶️ **Step: {node.id}** ({node.type}) executing...").send()
+
+    async def on_token(node: NodeDefinition, delta: str):
+        msg = streams.get(node.id)
+        if msg is None:
+            msg = streams[node.id] = cl.Message(content="")
+        await msg.stream_token(delta)
+
+    async def on_end(node: NodeDefinition, output: Any):
+        msg = streams.pop(node.id, None)
+        if msg is not None:
+            # ストリーミング済みの本文はそのまま残し、完了表示だけ追加する
+            await msg.send()
+            await cl.Message(content=f"✅ **Step: {node.id}** 完了").send()
+            return
         out_str = str(output)
         if len(out_str) > 500:
             out_str = out_str[:500] + "..."
-        cl.run_sync(
-            cl.Message(content=f"✅ **Step: {node.id}** 完了\n```\n{out_str}\n```").send()
-        )
-
-    def run_sync():
-        executor = GraphExecutor(
-            workflow,
-            skills,
-            llm_client,
-            on_node_start=sync_on_start,
-            on_node_end=sync_on_end
-        )
-        return executor.execute(inputs)
+        await cl.Message(content=f"✅ **Step: {node.id}** 完了\n```\n{out_str}\n```").send()
+
+    executor = GraphExecutor(
+        workflow,
+        skills,
+        llm_client,
+        on_node_start=on_start,
+        on_node_end=on_end,
+        on_node_token=on_token
+    )
 
     await cl.Message(content="🚀 ワークフローを実行します...").send()
 
     try:
-        results = await asyncio.to_thread(run_sync)
+        results = await executor.aexecute(inputs)
         await cl.Message(content="🎉 ワークフローが完了しました！").send()
 
     except Exception as e:
@@ -1,8 +1,9 @@
 import argparse
+import json
 import os
 import sys
 from pathlib import Path
-from typing import Any, List, Dict
+from typing import Any, Iterator, List, Dict, Optional
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
@@ -11,11 +12,18 @@ from rich.table import Table
 from dotenv import load_dotenv
 
 from ai_agent_work_base.core.llm import LLMClient
-from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.core.llm_cache import (
+    DEFAULT_SQLITE_PATH,
+    MemoryResponseCache,
+    SQLiteResponseCache,
+    create_response_cache_from_env,
+)
+from ai_agent_work_base.engine.checkpoint import CheckpointStore
 from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.registry import get_registry
 from ai_agent_work_base.engine.trigger_runner import TriggerRunner
 from ai_agent_work_base.engine.slack_trigger import SlackTriggerApp
-from ai_agent_work_base.skills import load_all_skills
+from ai_agent_work_base.skills import get_skill_registry
 from ai_agent_work_base.schemas.workflow import NodeDefinition, WorkflowDefinition
 
 # Load environment variables
@@ -26,16 +34,12 @@ WORKFLOW_DIR = Path("workflows")
 TRIGGER_DIR = Path("triggers")
 
 def get_available_workflows() -> List[Dict[str, Any]]:
-    """workflowsディレクトリ内のYAMLファイルを取得"""
-    files = list(WORKFLOW_DIR.glob("*.yaml")) + list(WORKFLOW_DIR.glob("*.yml"))
-    workflows = []
-    for f in files:
-        try:
-            wf = WorkflowLoader.load(f)
-            workflows.append({"name": wf.name, "path": f, "obj": wf})
-        except Exception as e:
-            console.print(f"[red]Error loading {f}: {e}[/red]")
-    return workflows
+    """workflowsディレクトリ内のワークフローを取得（共有レジストリの読み込み済み定義を使う）"""
+    registry = get_registry(WORKFLOW_DIR)
+    for entry in registry.catalog().entries:
+        if entry["error"] is not None:
+            console.print(f"[red]Error loading {WORKFLOW_DIR / entry['file']}: {entry['error']}[/red]")
+    return [{"name": wf.name, "path": path, "obj": wf} for path, wf in registry.workflows()]
 
 def select_workflow(workflows: List[Dict[str, Any]]) -> Dict[str, Any]:
     """ワークフローを選択する"""
@@ -75,7 +79,8 @@ def collect_inputs(workflow: WorkflowDefinition) -> Dict[str, Any]:
 
 def list_skills() -> None:
     """登録済みスキルの一覧をテーブル形式で表示する"""
-    skills = load_all_skills()
+    # マニフェストのみを参照し、スキルのモジュールはimportしない
+    skills = get_skill_registry().specs()
 
     table = Table(title="Available Skills", show_lines=True)
     table.add_column("Name", style="cyan", no_wrap=True)
@@ -98,49 +103,74 @@ def list_skills() -> None:
     console.print("[dim]* = required[/dim]")
 
 
-def run_workflow() -> None:
-    """ワークフローを選択して実行する"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+def run_workflow(workflow_name: Optional[str] = None) -> None:
+    """ワークフローを選択して実行する（workflow_name を指定した場合は選択を省略する）"""
+    # LLM_BACKENDS を設定している場合はエンドポイントごとの設定でキーを持つ
+    if not os.getenv("OPENAI_API_KEY") and not os.getenv("LLM_BACKENDS"):
         console.print("[bold red]Error:[/bold red] OPENAI_API_KEY environment variable is not set.")
         console.print("Please set it in .env file or environment variables.")
         sys.exit(1)
 
-    workflows = get_available_workflows()
-    if not workflows:
-        console.print("[yellow]No workflow files found in workflows/ directory.[/yellow]")
-        return
+    if workflow_name:
+        try:
+            workflow: WorkflowDefinition = get_registry(WORKFLOW_DIR).get(workflow_name)
+        except (ValueError, FileNotFoundError) as e:
+            console.print(f"[bold red]エラー:[/bold red] {e}")
+            sys.exit(1)
+    else:
+        workflows = get_available_workflows()
+        if not workflows:
+            console.print("[yellow]No workflow files found in workflows/ directory.[/yellow]")
+            return
 
-    selected = select_workflow(workflows)
-    workflow: WorkflowDefinition = selected["obj"]
+        selected = select_workflow(workflows)
+        workflow = selected["obj"]
 
     console.print(f"\nSelected: [bold green]{workflow.name}[/bold green]")
     inputs = collect_inputs(workflow)
 
     try:
         llm_client = LLMClient()
-        skills = load_all_skills()
+        skills = get_skill_registry()
 
         def on_node_start(node: NodeDefinition):
             console.print(f"▶️  Step: [bold cyan]{node.id}[/bold cyan] ({node.type}) executing...")
 
+        streamed = set()
+
+        def on_node_token(node: NodeDefinition, delta: str):
+            # LLMの出力を受信した順に表示する
+            streamed.add(node.id)
+            console.out(delta, style="dim", end="", highlight=False)
+
         def on_node_end(node: NodeDefinition, output: Any):
+            if node.id in streamed:
+                console.out("")
             out_str = str(output)
             if len(out_str) > 200:
                 out_str = out_str[:200] + "..."
             console.print(f"✅ Step: [bold cyan]{node.id}[/bold cyan] Finished. Result: {out_str}")
 
+        # チェックポイントは失敗時の再開用なので、完了した実行の分は削除する
+        store = CheckpointStore()
         executor = GraphExecutor(
             workflow,
             skills,
             llm_client,
             on_node_start=on_node_start,
-            on_node_end=on_node_end
+            on_node_end=on_node_end,
+            on_node_token=on_node_token,
+            checkpoint_store=store
         )
 
         console.print("\n[bold]Executing Workflow...[/bold]")
-        with console.status("[bold green]Running...[/bold green]", spinner="dots"):
-            results = executor.execute(inputs)
+        try:
+            with console.status("[bold green]Running...[/bold green]", spinner="dots"):
+                results = executor.execute(inputs)
+        except Exception:
+            console.print(f"[yellow]再開するには: resume {executor.last_run_id}[/yellow]")
+            raise
+        store.delete(executor.last_run_id)
 
         console.print("\n[bold green]🎉 Workflow Completed![/bold green]")
 
@@ -152,6 +182,120 @@ def run_workflow() -> None:
         sys.exit(1)
 
 
+def _read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """JSONLファイルから入力を1行ずつ読み込む（空行は無視する）"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: JSONとして読み込めません: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"{path}:{line_no}: 各行はJSONオブジェクトである必要があります")
+            yield row
+
+
+def _batch_llm_client() -> LLMClient:
+    """
+    バッチ実行用の LLMClient を返す
+
+    LLM_CACHE が未設定でも、同じバッチ内の同一リクエストは再利用するようプロセス内のキャッシュを持たせる。
+    レート制限の枠待ちでは対話的な呼び出しを優先する。
+    """
+    cache = create_response_cache_from_env() or MemoryResponseCache()
+    return LLMClient(priority="batch", cache=cache)
+
+
+def run_batch(workflow_name: str, inputs_path: Path, jobs: int, output_path: Optional[Path]) -> None:
+    """
+    JSONLの各行を入力としてワークフローを並行実行し、完了した順に結果をJSONLで出力する
+
+    出力の各行: {"index": 入力の行番号(0始まり), "inputs": {...}, "outputs": {...}} または
+    {"index": ..., "inputs": {...}, "error": "..."}。--output 省略時は標準出力に書き出す。
+    """
+    # 結果を標準出力に書く場合は進捗を標準エラーに出す
+    log = Console(stderr=True)
+    if not os.getenv("OPENAI_API_KEY") and not os.getenv("LLM_BACKENDS"):
+        log.print("[bold red]Error:[/bold red] OPENAI_API_KEY environment variable is not set.")
+        sys.exit(1)
+    try:
+        workflow = get_registry(WORKFLOW_DIR).get(workflow_name)
+    except (ValueError, FileNotFoundError) as e:
+        log.print(f"[bold red]エラー:[/bold red] {e}")
+        sys.exit(1)
+    if not inputs_path.exists():
+        log.print(f"[bold red]エラー:[/bold red] 入力ファイルが見つかりません: {inputs_path}")
+        sys.exit(1)
+
+    # 全ての実行で LLMClient（レスポンスキャッシュ）・スキル・ノード結果キャッシュを共有する
+    executor = GraphExecutor(workflow, get_skill_registry(), _batch_llm_client())
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    succeeded = failed = 0
+    try:
+        for result in executor.execute_many(_read_jsonl(inputs_path), concurrency=jobs):
+            record: Dict[str, Any] = {"index": result.index, "inputs": result.inputs}
+            if result.error is None:
+                record["outputs"] = result.outputs
+                succeeded += 1
+                log.print(f"✅ #{result.index} 完了")
+            else:
+                record["error"] = str(result.error)
+                failed += 1
+                log.print(f"[red]❌ #{result.index} 失敗: {result.error}[/red]")
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+    except ValueError as e:
+        log.print(f"[bold red]エラー:[/bold red] {e}")
+        sys.exit(1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    log.print(f"\n[bold]完了: {succeeded}件 / 失敗: {failed}件[/bold]")
+    if failed:
+        sys.exit(1)
+
+
+def resume_workflow(run_id: str) -> None:
+    """チェックポイントから失敗したワークフローを再開する"""
+    store = CheckpointStore()
+    try:
+        checkpoint = store.load(run_id)
+        workflow = WorkflowDefinition.model_validate(checkpoint["workflow"])
+    except (ValueError, FileNotFoundError) as e:
+        console.print(f"[bold red]エラー:[/bold red] {e}")
+        sys.exit(1)
+
+    if checkpoint.get("status") == "completed":
+        console.print(f"[yellow]{run_id} は完了済みです。[/yellow]")
+        return
+    console.print(
+        f"再開: [bold green]{workflow.name}[/bold green] "
+        f"(run_id: {run_id}, 再開ノード: [cyan]{checkpoint.get('next_node_id')}[/cyan])"
+    )
+    if checkpoint.get("error"):
+        console.print(f"[dim]前回のエラー: {checkpoint['error']}[/dim]")
+
+    executor = GraphExecutor(
+        workflow,
+        get_skill_registry(),
+        LLMClient(),
+        on_node_start=lambda node: console.print(f"▶️  Step: [bold cyan]{node.id}[/bold cyan] ({node.type}) executing..."),
+        on_node_end=lambda node, output: console.print(f"✅ Step: [bold cyan]{node.id}[/bold cyan] Finished."),
+        checkpoint_store=store,
+    )
+    try:
+        executor.resume(run_id)
+    except Exception as e:
+        console.print(f"[bold red]Execution Error:[/bold red] {str(e)}")
+        console.print(f"[yellow]再開するには: resume {run_id}[/yellow]")
+        sys.exit(1)
+    store.delete(run_id)
+    console.print("\n[bold green]🎉 Workflow Completed![/bold green]")
+
+
 def list_triggers() -> None:
     """登録済みトリガーの一覧をテーブル形式で表示する"""
     runner = TriggerRunner(
@@ -183,7 +327,7 @@ def list_triggers() -> None:
 def run_trigger_once(trigger_name: str) -> None:
     """指定トリガーを即時1回実行する"""
     llm_client = LLMClient()
-    skills = load_all_skills()
+    skills = get_skill_registry()
 
     runner = TriggerRunner(
         triggers_dir=TRIGGER_DIR,
@@ -203,7 +347,7 @@ def run_trigger_once(trigger_name: str) -> None:
 def start_slack_trigger() -> None:
     """Slack BoltアプリをSocket Modeで起動する"""
     llm_client = LLMClient()
-    skills = load_all_skills()
+    skills = get_skill_registry()
 
     app = SlackTriggerApp(
         workflows_dir=WORKFLOW_DIR,
@@ -222,8 +366,9 @@ def start_slack_trigger() -> None:
 def start_scheduler() -> None:
     """cronトリガーをバックグラウンドで起動し続ける"""
     import time
-    llm_client = LLMClient()
-    skills = load_all_skills()
+    # 定期実行はバッチ扱い（同じプロセスの対話的な呼び出しを優先する）
+    llm_client = LLMClient(priority="batch")
+    skills = get_skill_registry()
 
     runner = TriggerRunner(
         triggers_dir=TRIGGER_DIR,
@@ -245,12 +390,50 @@ def start_scheduler() -> None:
         console.print("[yellow]スケジューラーを停止しました。[/yellow]")
 
 
+def _open_llm_cache() -> SQLiteResponseCache:
+    return SQLiteResponseCache(Path(os.getenv("LLM_CACHE_PATH", DEFAULT_SQLITE_PATH)))
+
+
+def show_cache_stats() -> None:
+    """LLMレスポンスキャッシュ（SQLite）の統計情報を表示する"""
+    stats = _open_llm_cache().stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{stats['hits'] / lookups:.1%}" if lookups else "-"
+
+    table = Table(title="LLM Response Cache")
+    table.add_column("Item", style="cyan")
+    table.add_column("Value", style="green")
+    table.add_row("Path", stats["path"])
+    table.add_row("Entries", str(stats["entries"]))
+    table.add_row("Expired", str(stats["expired"]))
+    table.add_row("Hits", str(stats["hits"]))
+    table.add_row("Misses", str(stats["misses"]))
+    table.add_row("Hit rate", hit_rate)
+    table.add_row("Size", f"{stats['size_bytes'] / 1024:.1f} KiB")
+    console.print(table)
+
+
+def purge_cache(expired_only: bool) -> None:
+    """LLMレスポンスキャッシュ（SQLite）のエントリを削除する"""
+    count = _open_llm_cache().purge(expired_only=expired_only)
+    target = "期限切れのエントリ" if expired_only else "エントリ"
+    console.print(f"[green]{target}を{count}件削除しました。[/green]")
+
+
 def main():
     parser = argparse.ArgumentParser(description="AI Agent Platform CLI")
     subparsers = parser.add_subparsers(dest="command")
 
     subparsers.add_parser("skills", help="登録済みスキルの一覧を表示する")
-    subparsers.add_parser("run", help="ワークフローを選択して実行する")
+    run_parser = subparsers.add_parser("run", help="ワークフローを選択して実行する")
+    run_parser.add_argument(
+        "workflow", nargs="?", help="実行するワークフロー名（省略時は一覧から選択。--inputs-jsonl と併用するとバッチ実行）"
+    )
+    run_parser.add_argument("--inputs-jsonl", type=Path, help="1行1件の入力を記述したJSONLファイル")
+    run_parser.add_argument("--jobs", type=int, default=4, help="同時に実行する件数（デフォルト: 4）")
+    run_parser.add_argument("--output", type=Path, help="結果を書き出すJSONLファイル（省略時は標準出力）")
+    resume_parser = subparsers.add_parser("resume", help="チェックポイントから失敗したワークフローを再開する")
+    resume_parser.add_argument("run_id", help="再開する実行のrun_id")
 
     trigger_parser = subparsers.add_parser("trigger", help="トリガー管理")
     trigger_sub = trigger_parser.add_subparsers(dest="trigger_command")
@@ -260,8 +443,25 @@ def main():
     trigger_sub.add_parser("start", help="cronスケジューラーを起動する")
     trigger_sub.add_parser("slack", help="Slack BoltアプリをSocket Modeで起動する")
 
+    cache_parser = subparsers.add_parser("cache", help="LLMレスポンスキャッシュの管理")
+    cache_sub = cache_parser.add_subparsers(dest="cache_command")
+    cache_sub.add_parser("stats", help="件数・ヒット率などを表示する")
+    purge_parser = cache_sub.add_parser("purge", help="キャッシュを削除する")
+    purge_parser.add_argument("--expired", action="store_true", help="期限切れのエントリのみ削除する")
+
     args = parser.parse_args()
 
+    if args.command == "run" and args.inputs_jsonl:
+        # スクリプトから呼ばれる前提のため、画面のクリアや対話的な入力は行わない
+        if not args.workflow:
+            run_parser.error("--inputs-jsonl を指定する場合はワークフロー名が必要です")
+        if args.jobs < 1:
+            run_parser.error("--jobs は1以上を指定してください")
+        run_batch(args.workflow, args.inputs_jsonl, args.jobs, args.output)
+        return
+    if args.command == "run" and args.output:
+        run_parser.error("--output は --inputs-jsonl と併用してください")
+
     console.clear()
     console.print(Panel.fit("🤖 AI Agent Platform CLI", style="bold blue"))
 
@@ -278,7 +478,18 @@ def main():
             start_slack_trigger()
         else:
             trigger_parser.print_help()
-    elif args.command == "run" or args.command is None:
+    elif args.command == "resume":
+        resume_workflow(args.run_id)
+    elif args.command == "cache":
+        if args.cache_command == "stats":
+            show_cache_stats()
+        elif args.cache_command == "purge":
+            purge_cache(args.expired)
+        else:
+            cache_parser.print_help()
+    elif args.command == "run":
+        run_workflow(args.workflow)
+    elif args.command is None:
         run_workflow()
     else:
         parser.print_help()
@@ -0,0 +1,255 @@
+"""
+複数の OpenAI 互換エンドポイントを束ねる LLM バックエンドプール。
+
+モデルごとに複数のエンドポイント（APIキー違い・リージョン違い・ローカルの vLLM 等）を登録し、
+
+- 遅延の指数移動平均（EWMA）・エラー率・実行中の件数から最も速そうなエンドポイントに送る
+- 接続エラー・タイムアウト・5xx・429 の場合は次のエンドポイントに切り替える（フェイルオーバー）
+- 失敗したエンドポイントは cooldown 秒（連続失敗ごとに2倍）のあいだ後回しにする
+
+全エンドポイントが失敗した場合は最後のエラーを送出する（429 ならレート制限スケジューラーが待って再試行する）。
+
+設定（環境変数）:
+    LLM_BACKENDS: エンドポイント定義のYAMLファイル（schemas/backend.py を参照）。未設定の場合は
+        OPENAI_API_KEY を使う単一のクライアントで動作する
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import yaml
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+
+from ..schemas.backend import BackendsConfig, EndpointConfig
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 次のエンドポイントで再試行するエラー（400 などリクエスト自体の誤りは切り替えても同じなので対象外）
+_FAILOVER_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+# EWMA の重み（新しい計測値の割合）
+_ALPHA = 0.2
+# エラー率がスコアに与える影響の大きさ
+_ERROR_PENALTY = 4.0
+_MAX_COOLDOWN = 300.0
+
+
+class Endpoint:
+    """OpenAI 互換エンドポイント1つと、その遅延・エラー率の計測値"""
+
+    def __init__(self, config: EndpointConfig):
+        self.config = config
+        self.name = config.name
+        self._client: Optional[OpenAI] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+        # 計測値（BackendPool._lock で保護する）
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.inflight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        # 再試行はプールとレート制限スケジューラーが行う
+        return {
+            "api_key": self.config.resolve_api_key() or "",
+            "base_url": self.config.base_url,
+            "timeout": self.config.timeout,
+            "max_retries": 0,
+        }
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI(**self._client_kwargs())
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(**self._client_kwargs())
+        return self._async_client
+
+    def score(self) -> float:
+        """小さいほど優先する。未計測のエンドポイントは計測のため最優先にする"""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + self.inflight) * (1 + _ERROR_PENALTY * self.error_rate)
+
+
+class BackendPool:
+    """
+    モデルごとに複数のエンドポイントを束ね、遅延とエラー率で振り分けるプール
+
+    使用例:
+        pool = load_backend_pool(Path("backends.yaml"))
+        response = pool.call("gpt-4o", lambda client, model: client.chat.completions.create(
+            model=model, messages=messages))
+    """
+
+    def __init__(self, endpoints: List[EndpointConfig], cooldown: float = 30.0, explore: float = 0.05):
+        """
+        Args:
+            endpoints: エンドポイントの設定（記載順は計測値が揃うまでの優先順になる）
+            cooldown: 失敗したエンドポイントを後回しにする時間（秒。連続失敗ごとに2倍、上限300秒）
+            explore: 最速以外のエンドポイントを先に試す確率（遅くなったエンドポイントの回復を検知するため）
+        """
+        if not endpoints:
+            raise ValueError("エンドポイントが1つも指定されていません。")
+        self.endpoints = [Endpoint(config) for config in endpoints]
+        self.cooldown = cooldown
+        self.explore = explore
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: BackendsConfig) -> "BackendPool":
+        return cls(config.endpoints, cooldown=config.cooldown, explore=config.explore)
+
+    def route(self, model: str) -> List[Tuple[Endpoint, str]]:
+        """モデルを扱うエンドポイントを試す順に (エンドポイント, 送信するモデル名) で返す"""
+        candidates = [(e, e.config.served_model(model)) for e in self.endpoints]
+        candidates = [(e, served) for e, served in candidates if served is not None]
+        if not candidates:
+            raise ValueError(f"モデル '{model}' を扱うエンドポイントがありません。")
+        now = time.monotonic()
+        with self._lock:
+            # 稼働中のものをスコア順に、後回し中のものは回復が早い順に最後に並べる
+            healthy = sorted((c for c in candidates if c[0].unhealthy_until <= now), key=lambda c: c[0].score())
+            cooling = sorted((c for c in candidates if c[0].unhealthy_until > now), key=lambda c: c[0].unhealthy_until)
+        if len(healthy) > 1 and random.random() < self.explore:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + cooling
+
+    def _begin(self, endpoint: Endpoint) -> float:
+        with self._lock:
+            endpoint.inflight += 1
+            endpoint.requests += 1
+        return time.monotonic()
+
+    def _succeeded(self, endpoint: Endpoint, started: float) -> None:
+        elapsed = time.monotonic() - started
+        with self._lock:
+            endpoint.inflight -= 1
+            endpoint.latency = elapsed if endpoint.latency is None else (1 - _ALPHA) * endpoint.latency + _ALPHA * elapsed
+            endpoint.error_rate *= 1 - _ALPHA
+            endpoint.consecutive_failures = 0
+            endpoint.unhealthy_until = 0.0
+
+    def _failed(self, endpoint: Endpoint, started: float, error: Exception) -> None:
+        elapsed = time.monotonic() - started
+        with self._lock:
+            endpoint.inflight -= 1
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.error_rate = (1 - _ALPHA) * endpoint.error_rate + _ALPHA
+            # 失敗までの時間も遅延として計上する（タイムアウトするエンドポイントを後回しにするため）
+            if endpoint.latency is None or elapsed > endpoint.latency:
+                endpoint.latency = elapsed if endpoint.latency is None else (1 - _ALPHA) * endpoint.latency + _ALPHA * elapsed
+            cooldown = min(_MAX_COOLDOWN, self.cooldown * 2 ** (endpoint.consecutive_failures - 1))
+            endpoint.unhealthy_until = time.monotonic() + cooldown
+        logger.warning(f"LLMエンドポイント '{endpoint.name}' でエラーが発生しました（{cooldown:.0f}秒後回し）: {error}")
+
+    def _released(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.inflight -= 1
+
+    def call(self, model: str, fn: Callable[[OpenAI, str], T]) -> T:
+        """
+        fn(client, served_model) を最適なエンドポイントで呼ぶ（失敗した場合は次のエンドポイントで呼び直す）
+        """
+        last_error: Optional[Exception] = None
+        for endpoint, served in self.route(model):
+            started = self._begin(endpoint)
+            try:
+                result = fn(endpoint.client, served)
+            except _FAILOVER_ERRORS as e:
+                self._failed(endpoint, started, e)
+                last_error = e
+                continue
+            except BaseException:
+                self._released(endpoint)
+                raise
+            self._succeeded(endpoint, started)
+            return result
+        raise last_error
+
+    async def acall(self, model: str, fn: Callable[[AsyncOpenAI, str], Awaitable[T]]) -> T:
+        """call() の非同期版"""
+        last_error: Optional[Exception] = None
+        for endpoint, served in self.route(model):
+            started = self._begin(endpoint)
+            try:
+                result = await fn(endpoint.async_client, served)
+            except _FAILOVER_ERRORS as e:
+                self._failed(endpoint, started, e)
+                last_error = e
+                continue
+            except BaseException:
+                self._released(endpoint)
+                raise
+            self._succeeded(endpoint, started)
+            return result
+        raise last_error
+
+    def warm_up(self) -> None:
+        """全エンドポイントの非同期クライアント（接続プール）を事前に生成する"""
+        for endpoint in self.endpoints:
+            _ = endpoint.async_client
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """エンドポイントごとの計測値を返す"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": e.name,
+                    "latency_ms": round(e.latency * 1000, 1) if e.latency is not None else None,
+                    "error_rate": round(e.error_rate, 3),
+                    "inflight": e.inflight,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                    "healthy": e.unhealthy_until <= now,
+                }
+                for e in self.endpoints
+            ]
+
+
+def load_backend_pool(path: Path) -> BackendPool:
+    """YAMLファイルからバックエンドプールを作成する"""
+    if not path.exists():
+        raise FileNotFoundError(f"LLMバックエンドの設定ファイルが見つかりません: {path}")
+    with open(path, encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    return BackendPool.from_config(BackendsConfig(**data))
+
+
+_default_pool: Optional[BackendPool] = None
+_default_pool_path: Optional[str] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_backend_pool() -> Optional[BackendPool]:
+    """
+    環境変数 LLM_BACKENDS で指定したプールを返す（未設定の場合はNone）
+
+    計測値をプロセス内の全 LLMClient で共有するため、同じ設定ファイルからは1つだけ作る。
+    """
+    global _default_pool, _default_pool_path
+    path = os.getenv("LLM_BACKENDS", "").strip()
+    if not path:
+        return None
+    with _default_pool_lock:
+        if _default_pool is None or _default_pool_path != path:
+            _default_pool = load_backend_pool(Path(path))
+            _default_pool_path = path
+        return _default_pool
@@ -1,28 +1,130 @@
+import asyncio
+import inspect
 import os
-from typing import Any, List, Optional, Dict
-from openai import OpenAI
+from concurrent.futures import CancelledError
+from typing import Any, Awaitable, Callable, List, Optional, Dict, Tuple, Union
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
 from dotenv import load_dotenv
 
+from .backends import BackendPool, get_backend_pool
+from .llm_cache import (
+    ResponseCache,
+    SingleFlight,
+    create_response_cache_from_env,
+    get_single_flight,
+    make_request_key,
+)
+from .rate_limit import RateLimitScheduler, estimate_tokens, get_rate_limiter, resolve_priority
+
 # Load environment variables
 load_dotenv()
 
+
+class _StreamAssembler:
+    """ストリーミングのチャンクを連結し、非ストリーミング時と同じ ChatCompletion を組み立てる"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.finish_reason: Optional[str] = None
+        self.meta: Dict[str, Any] = {}
+        self.usage: Any = None
+
+    def add(self, chunk: Any) -> str:
+        """チャンクを取り込み、追加されたテキストを返す"""
+        if not self.meta:
+            self.meta = {"id": chunk.id, "created": chunk.created, "model": chunk.model}
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return ""
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta.content or ""
+        if delta:
+            self.parts.append(delta)
+        return delta
+
+    def to_completion(self) -> ChatCompletion:
+        return ChatCompletion.model_validate({
+            **self.meta,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "finish_reason": self.finish_reason or "stop",
+                "message": {"role": "assistant", "content": "".join(self.parts)},
+            }],
+            "usage": self.usage.model_dump() if self.usage is not None else None,
+        })
+
+
 class LLMClient:
     """
     OpenAI APIクライアントのラッパークラス
     """
-    def __init__(self, model: Optional[str] = None):
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        priority: Union[int, str] = "interactive",
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        single_flight: Optional[SingleFlight] = None,
+        backends: Optional[BackendPool] = None,
+    ):
         """
         Args:
             model (str, optional): 使用するモデル名。指定がない場合は環境変数 OPENAI_MODEL または "gpt-4o" を使用
+            cache (ResponseCache, optional): レスポンスキャッシュ。指定がない場合は環境変数 LLM_CACHE の設定に従う（未設定なら無効）
+            priority (int | str, optional): レート制限の枠待ちでの優先度。"interactive"（デフォルト）または "batch"
+            rate_limiter (RateLimitScheduler, optional): 使用するスケジューラー。指定がない場合はプロセス共有のものを使う
+            single_flight (SingleFlight, optional): 実行中の同一リクエストへの相乗り。指定がない場合はプロセス共有のもの
+                （環境変数 LLM_SINGLE_FLIGHT=0 で無効）を使う
+            backends (BackendPool, optional): 複数エンドポイントのプール。指定がない場合は環境変数 LLM_BACKENDS の
+                設定に従う（未設定なら OPENAI_API_KEY の単一クライアントを使う）
         """
+        # バックエンドプールを使う場合は各エンドポイントの設定でキーを持つため OPENAI_API_KEY は不要
+        self.backends = backends if backends is not None else get_backend_pool()
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if not self.api_key and self.backends is None:
             # 警告を出すか、エラーにするか。ここでは実際にコールするまでエラーにしないでおくが、
             # ログを出しておくのが親切。
             print("Warning: OPENAI_API_KEY is not set.")
-            
-        self.client = OpenAI(api_key=self.api_key)
+
+        # 単一クライアントはプールを使わない場合のみ、初回アクセス時に生成する
+        self._client: Optional[OpenAI] = None
+        self._async_client: Optional[AsyncOpenAI] = None
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o")
+        self.cache = cache if cache is not None else create_response_cache_from_env()
+        self.priority = resolve_priority(priority)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self.single_flight = single_flight if single_flight is not None else get_single_flight()
+
+    @property
+    def client(self) -> OpenAI:
+        """同期クライアント（初回アクセス時に生成する）"""
+        if self._client is None:
+            # 429 等の再試行はスケジューラーが行う（SDK側で再試行すると枠の管理から外れるため無効にする）
+            self._client = OpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    @client.setter
+    def client(self, value: OpenAI) -> None:
+        self._client = value
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """非同期クライアント（初回アクセス時に生成し、以降は接続プールを再利用する）"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._async_client
+
+    def warm_up(self) -> None:
+        """非同期クライアント（接続プール）を事前に生成する（バックエンドプールの場合は各エンドポイントの分）"""
+        if self.backends is not None:
+            self.backends.warm_up()
+        else:
+            _ = self.async_client
 
     def chat_completion(
         self, 
@@ -45,16 +147,248 @@ class LLMClient:
         Returns:
             Any: APIレスポンス (ChatCompletion)
         """
+        params = self._build_params(messages, tools, tool_choice, model, response_format)
+        key, cached = self._lookup_cache(params)
+        if cached is not None:
+            return cached
+
+        def fetch() -> Any:
+            tokens = estimate_tokens(params)
+            response = self.rate_limiter.call(
+                params["model"], tokens, self.priority,
+                lambda: self._create(params),
+            )
+            self._reconcile(params, tokens, response)
+            self._store_cache(key, response)
+            return response
+
+        response, _ = self._call_once(params, key, fetch)
+        return response
+
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Any] = None,
+        model: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Chat Completion APIを非同期で呼び出す（引数・戻り値は chat_completion と同じ）
+        """
+        params = self._build_params(messages, tools, tool_choice, model, response_format)
+        key, cached = self._lookup_cache(params)
+        if cached is not None:
+            return cached
+
+        async def fetch() -> Any:
+            tokens = estimate_tokens(params)
+            response = await self.rate_limiter.acall(
+                params["model"], tokens, self.priority,
+                lambda: self._acreate(params),
+            )
+            self._reconcile(params, tokens, response)
+            self._store_cache(key, response)
+            return response
+
+        response, _ = await self._acall_once(params, key, fetch)
+        return response
+
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Callable[[str], Any],
+        model: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> ChatCompletion:
+        """
+        Chat Completion APIをストリーミングで呼び出す
+
+        受信したテキストの差分ごとに on_delta(delta) を呼び、最後に連結した結果を
+        chat_completion と同じ ChatCompletion として返す。キャッシュにヒットした場合と、
+        実行中の同一リクエストに相乗りした場合は全文を1回の on_delta で渡す。
+        """
+        params = self._build_params(messages, None, None, model, response_format)
+        key, cached = self._lookup_cache(params)
+        if cached is not None:
+            on_delta(cached.choices[0].message.content or "")
+            return cached
+
+        def fetch() -> ChatCompletion:
+            assembler = _StreamAssembler()
+            tokens = estimate_tokens(params)
+            stream = self.rate_limiter.call(
+                params["model"], tokens, self.priority,
+                lambda: self._create(params, stream=True, stream_options={"include_usage": True}),
+            )
+            for chunk in stream:
+                delta = assembler.add(chunk)
+                if delta:
+                    on_delta(delta)
+            response = assembler.to_completion()
+            self._reconcile(params, tokens, response)
+            self._store_cache(key, response)
+            return response
+
+        response, joined = self._call_once(params, key, fetch)
+        if joined:
+            on_delta(response.choices[0].message.content or "")
+        return response
+
+    async def astream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        on_delta: Callable[[str], Any],
+        model: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> ChatCompletion:
+        """
+        stream_chat_completion の非同期版（on_delta には async 関数も指定できる）
+        """
+        params = self._build_params(messages, None, None, model, response_format)
+        key, cached = self._lookup_cache(params)
+        if cached is not None:
+            result = on_delta(cached.choices[0].message.content or "")
+            if inspect.isawaitable(result):
+                await result
+            return cached
+
+        async def fetch() -> ChatCompletion:
+            assembler = _StreamAssembler()
+            tokens = estimate_tokens(params)
+            stream = await self.rate_limiter.acall(
+                params["model"], tokens, self.priority,
+                lambda: self._acreate(params, stream=True, stream_options={"include_usage": True}),
+            )
+            async for chunk in stream:
+                delta = assembler.add(chunk)
+                if delta:
+                    result = on_delta(delta)
+                    if inspect.isawaitable(result):
+                        await result
+            response = assembler.to_completion()
+            self._reconcile(params, tokens, response)
+            self._store_cache(key, response)
+            return response
+
+        response, joined = await self._acall_once(params, key, fetch)
+        if joined:
+            result = on_delta(response.choices[0].message.content or "")
+            if inspect.isawaitable(result):
+                await result
+        return response
+
+    def _create(self, params: Dict[str, Any], **options: Any) -> Any:
+        """API を呼ぶ（バックエンドプールがあれば最適なエンドポイントに送り、失敗時は切り替える）"""
+        if self.backends is None:
+            return self.client.chat.completions.create(**params, **options)
+        return self.backends.call(
+            params["model"],
+            lambda client, model: client.chat.completions.create(**{**params, "model": model}, **options),
+        )
+
+    async def _acreate(self, params: Dict[str, Any], **options: Any) -> Any:
+        """_create の非同期版"""
+        if self.backends is None:
+            return await self.async_client.chat.completions.create(**params, **options)
+        return await self.backends.acall(
+            params["model"],
+            lambda client, model: client.chat.completions.create(**{**params, "model": model}, **options),
+        )
+
+    def _call_once(self, params: Dict[str, Any], key: Optional[str], fetch: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        同じリクエストが実行中ならその結果を待ち、そうでなければ fetch() を呼ぶ
+
+        Returns:
+            (レスポンス, 実行中のリクエストに相乗りしたかどうか)
+        """
+        if self.single_flight is None:
+            return fetch(), False
+        key = key or make_request_key(params)
+        while True:
+            future, leader = self.single_flight.join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except CancelledError:
+                # leader が中断された場合は自分で呼び直す
+                continue
+        try:
+            response = fetch()
+        except BaseException as e:
+            self.single_flight.finish(key, error=e)
+            raise
+        self.single_flight.finish(key, response)
+        return response, False
+
+    async def _acall_once(
+        self, params: Dict[str, Any], key: Optional[str], fetch: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """_call_once の非同期版"""
+        if self.single_flight is None:
+            return await fetch(), False
+        key = key or make_request_key(params)
+        while True:
+            future, leader = self.single_flight.join(key)
+            if leader:
+                break
+            try:
+                # 待っている側がキャンセルされても leader の Future はキャンセルしない
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except asyncio.CancelledError:
+                # leader が中断された場合は自分で呼び直す
+                if not future.cancelled():
+                    raise
+        try:
+            response = await fetch()
+        except BaseException as e:
+            self.single_flight.finish(key, error=e)
+            raise
+        self.single_flight.finish(key, response)
+        return response, False
+
+    def _reconcile(self, params: Dict[str, Any], estimated: int, response: Any) -> None:
+        """見積もったトークン数を実際の usage で補正する"""
+        usage = getattr(response, "usage", None)
+        self.rate_limiter.reconcile(params["model"], estimated, getattr(usage, "total_tokens", None))
+
+    def _lookup_cache(self, params: Dict[str, Any]) -> Tuple[Optional[str], Optional[ChatCompletion]]:
+        """キャッシュ済みのレスポンスを探す（キャッシュ無効時は (None, None)）"""
+        if self.cache is None:
+            return None, None
+        key = make_request_key(params)
+        value = self.cache.get(key)
+        if value is None:
+            return key, None
+        return key, ChatCompletion.model_validate_json(value)
+
+    def _store_cache(self, key: Optional[str], response: Any) -> None:
+        # 途中で打ち切られた応答は保存しない
+        if key is None or not isinstance(response, ChatCompletion):
+            return
+        if any(choice.finish_reason == "length" for choice in response.choices):
+            return
+        self.cache.set(key, response.model_dump_json())
+
+    def _build_params(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice: Optional[Any],
+        model: Optional[str],
+        response_format: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
         params = {
             "model": model or self.model,
             "messages": messages,
         }
-        
+
         if tools:
             params["tools"] = tools
         if tool_choice:
             params["tool_choice"] = tool_choice
         if response_format:
             params["response_format"] = response_format
-            
-        return self.client.chat.completions.create(**params)
+        return params
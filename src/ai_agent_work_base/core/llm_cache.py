@@ -0,0 +1,406 @@
+"""
+LLMレスポンスキャッシュ。
+
+正規化したリクエスト（model / messages / tools / response_format など）のハッシュをキーに、
+APIレスポンスをJSON文字列として保存する。バックエンドは差し替え可能で、
+
+- MemoryResponseCache: プロセス内のLRU
+- SQLiteResponseCache: 複数プロセスで共有できるSQLiteファイル
+
+を用意している。LLMClient(cache=...) に渡すか、環境変数 LLM_CACHE で有効化する。
+
+キャッシュとは別に、実行中の同一リクエストへの相乗り（SingleFlight）も同じキーで行う。
+キャッシュが無効でも、同じプロンプトが並行して送られた場合は API 呼び出しを1回にまとめる。
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_SQLITE_PATH = ".cache/llm_responses.sqlite3"
+
+
+def make_request_key(params: Dict[str, Any]) -> str:
+    """chat_completion のリクエストパラメータからキャッシュキー（SHA-256）を作る。"""
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    LLMレスポンスキャッシュの基底クラス
+
+    値はJSON文字列で保存し、ttl（秒）を過ぎたエントリはヒットしない。
+    max_entries を超えた場合は最も古く使われたエントリから削除する。
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """キーに対応する値を返す（ミス・期限切れの場合はNone）"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """値を保存する"""
+        pass
+
+    @abstractmethod
+    def purge(self, expired_only: bool = False) -> int:
+        """エントリを削除し、削除した件数を返す（expired_only=True の場合は期限切れのみ）"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """件数・ヒット数・ミス数などの統計情報を返す"""
+        pass
+
+    def close(self) -> None:
+        """未反映のデータを書き込む（書き込みを溜めないバックエンドでは何もしない）"""
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """プロセス内のLRUキャッシュ"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1000):
+        super().__init__(ttl, max_entries)
+        self._entries: OrderedDict[str, Tuple[Optional[float], str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (self._expires_at(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def purge(self, expired_only: bool = False) -> int:
+        with self._lock:
+            if not expired_only:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            now = time.time()
+            expired = [k for k, (exp, _) in self._entries.items() if exp is not None and exp <= now]
+            for k in expired:
+                del self._entries[k]
+            return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    SQLiteファイルを使った永続キャッシュ
+
+    WALモードで開くため、複数プロセス（CLI・Webhook・スケジューラー等）から同じファイルを共有できる。
+    ヒット数・ミス数もファイルに記録し、CLIの `cache stats` で確認できる。
+
+    get() は読み取りのみ行い、ヒット数・ミス数・最終利用時刻はメモリに溜めて flush_interval 秒ごと
+    （および set() / stats() / close() / プロセス終了時）にまとめて書き込む。読み取りの多い負荷で
+    参照のたびに書き込みトランザクションが発生し、プロセス間で WAL のロックを奪い合うのを避けるため。
+    """
+
+    def __init__(
+        self,
+        path: Path = Path(DEFAULT_SQLITE_PATH),
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+        flush_interval: float = 5.0,
+    ):
+        super().__init__(ttl, max_entries)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending_hits = 0
+        self._pending_misses = 0
+        # キー → 最終利用時刻（未反映の分）
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        _open_sqlite_caches.add(self)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 接続はスレッド間で共有せず、操作ごとに開く
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            if row is not None:
+                self._pending_hits += 1
+                self._touched[key] = now
+            else:
+                self._pending_misses += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+        return row[0] if row is not None else None
+
+    def flush(self) -> None:
+        """メモリに溜めたヒット数・ミス数・最終利用時刻をファイルに書き込む"""
+        with self._lock:
+            hits, misses, touched = self._pending_hits, self._pending_misses, self._touched
+            self._pending_hits = self._pending_misses = 0
+            self._touched = {}
+            self._last_flush = time.monotonic()
+        if not (hits or misses or touched):
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                    [(accessed_at, key) for key, accessed_at in touched.items()],
+                )
+                conn.executemany(
+                    "UPDATE counters SET value = value + ? WHERE name = ?", [(hits, "hits"), (misses, "misses")]
+                )
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self.flush()
+
+    def set(self, key: str, value: str) -> None:
+        # 削除対象（最終利用時刻の古いもの）を正しく選ぶため、先に溜めた最終利用時刻を反映する
+        self.flush()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, self._expires_at(), time.time()),
+                )
+                # 上限を超えた分を最終利用時刻の古い順に削除する
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        finally:
+            conn.close()
+
+    def purge(self, expired_only: bool = False) -> int:
+        self.flush()
+        conn = self._connect()
+        try:
+            with conn:
+                if expired_only:
+                    cursor = conn.execute(
+                        "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+                    )
+                else:
+                    cursor = conn.execute("DELETE FROM responses")
+                    conn.execute("UPDATE counters SET value = 0")
+                count = cursor.rowcount
+        finally:
+            conn.close()
+        if not expired_only:
+            conn = self._connect()
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        conn = self._connect()
+        try:
+            entries, expired = conn.execute(
+                "SELECT COUNT(*), COUNT(CASE WHEN expires_at IS NOT NULL AND expires_at <= ? THEN 1 END) FROM responses",
+                (time.time(),),
+            ).fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        finally:
+            conn.close()
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "entries": entries,
+            "expired": expired,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "size_bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+
+# プロセス終了時に未反映の統計を書き込むため、生成した SQLiteResponseCache を弱参照で保持する
+_open_sqlite_caches: "weakref.WeakSet[SQLiteResponseCache]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_sqlite_caches() -> None:
+    for cache in list(_open_sqlite_caches):
+        try:
+            cache.flush()
+        except sqlite3.Error:
+            pass
+
+
+def create_response_cache_from_env() -> Optional[ResponseCache]:
+    """
+    環境変数からレスポンスキャッシュを作成する（LLM_CACHE が未設定の場合はNone）
+
+    - LLM_CACHE: "memory" または "sqlite"
+    - LLM_CACHE_PATH: SQLiteファイルのパス（デフォルト: .cache/llm_responses.sqlite3）
+    - LLM_CACHE_TTL: 有効期限（秒）。未設定の場合は無期限
+    - LLM_CACHE_MAX_ENTRIES: 最大件数
+    """
+    backend = os.getenv("LLM_CACHE", "").strip().lower()
+    if not backend:
+        return None
+    ttl = float(os.getenv("LLM_CACHE_TTL")) if os.getenv("LLM_CACHE_TTL") else None
+    max_entries = os.getenv("LLM_CACHE_MAX_ENTRIES")
+    if backend == "memory":
+        return MemoryResponseCache(ttl=ttl, max_entries=int(max_entries or 1000))
+    if backend == "sqlite":
+        return SQLiteResponseCache(
+            Path(os.getenv("LLM_CACHE_PATH", DEFAULT_SQLITE_PATH)), ttl=ttl, max_entries=int(max_entries or 10000)
+        )
+    raise ValueError(f"未対応の LLM_CACHE: {backend}（memory / sqlite を指定してください）")
+
+
+class SingleFlight:
+    """
+    実行中の同一リクエストに後続の呼び出しを相乗りさせる
+
+    最初の呼び出し（leader）だけが API を呼び、同じキーで並行して来た呼び出しはその結果（または例外）を受け取る。
+    完了したキーはすぐに忘れるため、保存はしない（保存はレスポンスキャッシュの役割）。
+    スレッド・イベントループをまたいで共有できるよう concurrent.futures.Future で結果を渡す。
+
+    使用例:
+        future, leader = single_flight.join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = call_api()
+        except BaseException as e:
+            single_flight.finish(key, error=e)
+            raise
+        single_flight.finish(key, result)
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        # キー → 相乗りしている呼び出しの数
+        self._waiters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.saved_calls = 0
+
+    def join(self, key: str) -> Tuple[Future, bool]:
+        """キーの Future と、呼び出し元が leader（自分で API を呼ぶ）かどうかを返す"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._waiters[key] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            self._waiters[key] = 0
+            return future, True
+
+    def finish(self, key: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """
+        leader の結果を待っている呼び出しに渡し、キーを解放する
+
+        leader がキャンセル等（Exception 以外）で中断した場合は Future をキャンセルし、
+        待っている呼び出しにはそれぞれ呼び直させる。
+        """
+        with self._lock:
+            future = self._inflight.pop(key, None)
+            waiters = self._waiters.pop(key, 0)
+            if future is not None and (error is None or isinstance(error, Exception)):
+                self.saved_calls += waiters
+        if future is None or future.done():
+            return
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "inflight": len(self._inflight),
+                "waiting": sum(self._waiters.values()),
+                "saved_calls": self.saved_calls,
+            }
+
+
+_default_single_flight: Optional[SingleFlight] = None
+_default_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """
+    プロセス共有の SingleFlight を返す（環境変数 LLM_SINGLE_FLIGHT=0 の場合はNone）
+    """
+    global _default_single_flight
+    if os.getenv("LLM_SINGLE_FLIGHT", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
@@ -0,0 +1,354 @@
+"""
+LLM API のレート制限を考慮したリクエストスケジューラー。
+
+プロセス内の全 LLMClient（Webhook・cronトリガー・Slack・CLI）で1つのスケジューラーを共有し、
+
+- モデルごとに 1分あたりのリクエスト数（RPM）とトークン数（TPM）をトークンバケットで管理する
+- 枠が空くのを待つ呼び出しは優先度順（interactive が batch より先）に実行する
+- 429 が返った場合はそのモデルへの送信をサーバーが示したリセット時間まで止め、バックオフして再試行する
+  （クォータ切れ（insufficient_quota）の 429 は待っても回復しないため再試行せずに送出する）
+
+設定（環境変数）:
+    LLM_RATE_LIMITS: モデルごとの上限 "model=RPM/TPM" をカンマ区切りで指定（例: "gpt-4o=500/30000,gpt-4o-mini=1000/200000"）
+    LLM_RPM / LLM_TPM: LLM_RATE_LIMITS にないモデルの上限（未設定の場合は無制限）
+    LLM_MAX_RETRIES: 429・一時的なエラーの再試行回数（デフォルト: 5）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+_PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+# 応答のトークン数の見積もり（実際の usage で後から補正する）
+_COMPLETION_RESERVE = 256
+# 先頭でない待機中の非同期呼び出しが状態を確認し直す間隔（秒）
+_POLL_INTERVAL = 0.05
+_RETRYABLE = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def resolve_priority(priority: Union[int, str]) -> int:
+    """"interactive" / "batch" または整数の優先度を整数に変換する（小さいほど先に実行する）"""
+    if isinstance(priority, int):
+        return priority
+    if priority not in _PRIORITIES:
+        raise ValueError(f"未対応の優先度: {priority}（interactive / batch または整数を指定してください）")
+    return _PRIORITIES[priority]
+
+
+def estimate_tokens(params: Dict[str, Any]) -> int:
+    """リクエストの消費トークン数を見積もる（プロンプトは4文字≒1トークンとして概算する）"""
+    chars = 0
+    for message in params.get("messages", []):
+        content = message.get("content") if isinstance(message, dict) else None
+        chars += len(content) if isinstance(content, str) else len(json.dumps(content, default=str))
+    if params.get("tools"):
+        chars += len(json.dumps(params["tools"], default=str))
+    reserve = params.get("max_tokens") or params.get("max_completion_tokens") or _COMPLETION_RESERVE
+    return chars // 4 + 4 * len(params.get("messages", [])) + reserve
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """"1m30s" / "250ms" / "2.5" 形式の時間を秒に変換する"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def retry_after_hint(error: Exception) -> Optional[float]:
+    """エラーレスポンスのヘッダーから再試行までの秒数を取り出す（ヒントがなければNone）"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    hints = [
+        _parse_duration(headers[name])
+        for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if headers.get(name)
+    ]
+    hints = [h for h in hints if h is not None]
+    return max(hints) if hints else None
+
+
+def is_quota_exhausted(error: Exception) -> bool:
+    """利用枠（クォータ）を使い切ったことによる 429 か（レート制限と違い、時間が経っても回復しない）"""
+    return isinstance(error, RateLimitError) and getattr(error, "code", None) == "insufficient_quota"
+
+
+class _Bucket:
+    """1分あたりの上限を連続的に補充するトークンバケット"""
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class _ModelState:
+    __slots__ = ("requests", "tokens", "blocked_until", "waiting", "granted", "throttled", "retries")
+
+    def __init__(self, rpm: Optional[int], tpm: Optional[int]):
+        self.requests = _Bucket(rpm) if rpm else None
+        self.tokens = _Bucket(tpm) if tpm else None
+        self.blocked_until = 0.0
+        # 待機中の (優先度, 受付順)
+        self.waiting: List[Tuple[int, int]] = []
+        self.granted = 0
+        self.throttled = 0
+        self.retries = 0
+
+
+class RateLimitScheduler:
+    """
+    モデルごとの RPM / TPM を守って LLM 呼び出しを実行するスケジューラー
+
+    使用例:
+        scheduler = RateLimitScheduler({"gpt-4o": (500, 30000)})
+        response = scheduler.call("gpt-4o", estimate_tokens(params), PRIORITY_INTERACTIVE,
+                                  lambda: client.chat.completions.create(**params))
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+        default_limit: Tuple[Optional[int], Optional[int]] = (None, None),
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        """
+        Args:
+            limits: モデル名 → (RPM, TPM)。None の項目は無制限
+            default_limit: limits にないモデルの (RPM, TPM)
+            max_retries: 429・一時的なエラーの再試行回数
+            base_delay: 再試行の待ち時間の初期値（秒。再試行ごとに2倍にする）
+            max_delay: 再試行の待ち時間の上限（秒）
+        """
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._states: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._seq = itertools.count()
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._states.get(model)
+        if state is None:
+            state = self._states[model] = _ModelState(*self.limits.get(model, self.default_limit))
+        return state
+
+    # ------------------------------------------------------------------
+    # 枠の確保
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, model: str, priority: int) -> Tuple[int, int]:
+        with self._lock:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._state(model).waiting, ticket)
+            return ticket
+
+    def _try_acquire(self, model: str, ticket: Tuple[int, int], tokens: int) -> Optional[float]:
+        """枠を確保できればNone、できなければ再確認までの秒数を返す（_lock を保持して呼ぶ）"""
+        state = self._state(model)
+        if state.waiting[0] != ticket:
+            return _POLL_INTERVAL
+        now = time.monotonic()
+        wait = state.blocked_until - now
+        for bucket, amount in ((state.requests, 1), (state.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amount))
+        if wait > 0:
+            return wait
+        for bucket, amount in ((state.requests, 1), (state.tokens, tokens)):
+            if bucket is not None:
+                bucket.level -= min(amount, bucket.capacity)
+        heapq.heappop(state.waiting)
+        state.granted += 1
+        return None
+
+    def _cancel(self, model: str, ticket: Tuple[int, int]) -> None:
+        with self._cond:
+            state = self._state(model)
+            if ticket in state.waiting:
+                state.waiting.remove(ticket)
+                heapq.heapify(state.waiting)
+            self._cond.notify_all()
+
+    def acquire(self, model: str, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """枠が空くまで待って確保する（優先度が同じなら受付順）"""
+        ticket = self._enqueue(model, priority)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try_acquire(model, ticket, tokens)
+                    if wait is None:
+                        self._cond.notify_all()
+                        return
+                    self._cond.wait(timeout=wait)
+        except BaseException:
+            self._cancel(model, ticket)
+            raise
+
+    async def aacquire(self, model: str, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """acquire() の非同期版（待機中もイベントループを止めない）"""
+        ticket = self._enqueue(model, priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(model, ticket, tokens)
+                    if wait is None:
+                        self._cond.notify_all()
+                        return
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self._cancel(model, ticket)
+            raise
+
+    def reconcile(self, model: str, estimated: int, actual: Any) -> None:
+        """見積もりと実際の消費トークン数の差をバケットに反映する"""
+        if not isinstance(actual, int):
+            return
+        with self._lock:
+            bucket = self._state(model).tokens
+            if bucket is not None:
+                bucket.level = min(bucket.capacity, bucket.level + estimated - actual)
+
+    def _backoff(self, model: str, attempt: int, error: Exception) -> float:
+        """再試行までの秒数を決める。429 の場合はそのモデルへの送信全体を止める"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        hint = retry_after_hint(error)
+        if hint is not None:
+            delay = min(self.max_delay, max(delay, hint))
+        # 同時に待っている呼び出しが一斉に再送しないよう揺らぎを加える
+        delay *= 1 + random.random() * 0.25
+        with self._cond:
+            state = self._state(model)
+            state.retries += 1
+            if isinstance(error, RateLimitError):
+                state.throttled += 1
+                state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        logger.warning(f"LLM API エラーのため {delay:.1f}秒後に再試行します ({model}, {attempt + 1}回目): {error}")
+        return delay
+
+    # ------------------------------------------------------------------
+    # 呼び出し
+    # ------------------------------------------------------------------
+
+    def call(self, model: str, tokens: int, priority: int, fn: Callable[[], T]) -> T:
+        """枠を確保して fn() を呼ぶ。429・一時的なエラーはバックオフして再試行する"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model, tokens, priority)
+            try:
+                return fn()
+            except _RETRYABLE as e:
+                if attempt >= self.max_retries or is_quota_exhausted(e):
+                    raise
+                delay = self._backoff(model, attempt, e)
+                # 429 の場合は次の acquire() が（他の呼び出しと一緒に）blocked_until まで待つ
+                if not isinstance(e, RateLimitError):
+                    time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def acall(self, model: str, tokens: int, priority: int, fn: Callable[[], Awaitable[T]]) -> T:
+        """call() の非同期版"""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(model, tokens, priority)
+            try:
+                return await fn()
+            except _RETRYABLE as e:
+                if attempt >= self.max_retries or is_quota_exhausted(e):
+                    raise
+                delay = self._backoff(model, attempt, e)
+                if not isinstance(e, RateLimitError):
+                    await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """モデルごとの実行数・待機数・429の回数などを返す"""
+        with self._lock:
+            return {
+                model: {
+                    "granted": state.granted,
+                    "waiting": len(state.waiting),
+                    "throttled": state.throttled,
+                    "retries": state.retries,
+                    "rpm": state.requests.capacity if state.requests else None,
+                    "tpm": state.tokens.capacity if state.tokens else None,
+                }
+                for model, state in self._states.items()
+            }
+
+
+def _parse_limits(value: str) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        model, _, spec = item.partition("=")
+        rpm, _, tpm = spec.partition("/")
+        if not model or not spec:
+            raise ValueError(f"LLM_RATE_LIMITS の形式が不正です: {item}（model=RPM/TPM）")
+        limits[model.strip()] = (int(rpm) if rpm.strip() else None, int(tpm) if tpm.strip() else None)
+    return limits
+
+
+_default_scheduler: Optional[RateLimitScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimitScheduler:
+    """プロセス共有のスケジューラーを返す（設定は環境変数から読み込む）"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            rpm, tpm = os.getenv("LLM_RPM"), os.getenv("LLM_TPM")
+            _default_scheduler = RateLimitScheduler(
+                limits=_parse_limits(os.getenv("LLM_RATE_LIMITS", "")),
+                default_limit=(int(rpm) if rpm else None, int(tpm) if tpm else None),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+            )
+        return _default_scheduler
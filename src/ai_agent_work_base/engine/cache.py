@@ -0,0 +1,221 @@
+"""
+ノード実行結果のキャッシュ。
+
+ノード定義・解決済みのプロンプト/パラメータ・モデルから内容アドレス（SHA-256）のキーを作り、
+メモリ上のLRUとディスク上のJSONファイルの2層で結果を保持する。
+
+YAMLでは副作用のないノードに対してのみ有効化できる:
+    - id: "search"
+      type: "skill"
+      skill: "web_search"
+      cache:
+        ttl: 3600
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """JSONに正規化した値からキャッシュキー（SHA-256の16進文字列）を作る。"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class NodeResultCache:
+    """
+    ノード実行結果の2層キャッシュ（メモリLRU + ディスク）。
+
+    使用例:
+        cache = NodeResultCache(directory=Path(".cache/nodes"))
+        hit, value = cache.get(key)
+        if not hit:
+            value = compute()
+            cache.set(key, value, ttl=3600)
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_entries: int = 256,
+        max_disk_bytes: int = 100 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            directory: ディスクキャッシュの保存先（Noneの場合はメモリのみ）
+            max_entries: メモリ上に保持する最大件数（超えた分は最も古く使われたものから破棄）
+            max_disk_bytes: ディスクキャッシュの合計サイズ上限（超えた分は最も古く使われたものから削除）
+        """
+        self._directory = Path(directory) if directory is not None else None
+        self._max_entries = max_entries
+        self._max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, Tuple[Optional[float], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        キャッシュから値を取得する。
+
+        Returns:
+            (ヒットしたか, 値)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    return True, value
+                del self._memory[key]
+
+        value, expires_at = self._read_disk(key, now)
+        if value is _MISSING:
+            return False, None
+        self._remember(key, value, expires_at)
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """値を保存する。ttl（秒）を省略した場合は期限なし。"""
+        expires_at = time.time() + ttl if ttl else None
+        self._remember(key, value, expires_at)
+        self._write_disk(key, value, expires_at)
+
+    def clear(self) -> None:
+        """メモリとディスクのキャッシュを全て削除する。"""
+        with self._lock:
+            self._memory.clear()
+            if self._directory is not None and self._directory.exists():
+                for path in self._directory.glob("*/*.json"):
+                    path.unlink(missing_ok=True)
+            self._disk_bytes = 0
+
+    # ------------------------------------------------------------------
+    # メモリ層
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # ディスク層
+    # ------------------------------------------------------------------
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str, now: float) -> Tuple[Any, Optional[float]]:
+        if self._directory is None:
+            return _MISSING, None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING, None
+
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at <= now:
+            self._delete_file(path)
+            return _MISSING, None
+        # LRU判定のため最終利用時刻を更新する
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value"), expires_at
+
+    def _write_disk(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        if self._directory is None:
+            return
+        try:
+            data = json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # JSONにできない結果はメモリ層にのみ保持する
+            logger.debug(f"JSONに変換できないためディスクキャッシュをスキップ: {key}")
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"ディスクキャッシュの書き込みに失敗しました: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(p.stat().st_size for p in self._directory.glob("*/*.json"))
+            else:
+                self._disk_bytes += len(data.encode("utf-8")) - previous
+            if self._disk_bytes > self._max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """ディスク上のエントリを最終利用時刻の古い順に削除し、サイズ上限内に収める。"""
+        entries = []
+        for path in self._directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self._max_disk_bytes:
+                break
+            self._delete_file(path)
+            total -= size
+        self._disk_bytes = total
+
+    @staticmethod
+    def _delete_file(path: Path) -> None:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+_default_cache: Optional[NodeResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> NodeResultCache:
+    """
+    プロセス共有のデフォルトキャッシュを返す。
+
+    ディスク層の保存先は環境変数 NODE_CACHE_DIR（デフォルト: .cache/nodes）、
+    合計サイズ上限は NODE_CACHE_MAX_MB（デフォルト: 100）で指定する。
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = NodeResultCache(
+                directory=Path(os.getenv("NODE_CACHE_DIR", ".cache/nodes")),
+                max_disk_bytes=int(os.getenv("NODE_CACHE_MAX_MB", "100")) * 1024 * 1024,
+            )
+        return _default_cache
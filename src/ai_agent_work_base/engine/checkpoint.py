@@ -0,0 +1,91 @@
+"""
+ワークフロー実行のチェックポイント。
+
+ノードの完了ごとにコンテキストのスナップショットと次に実行するノードIDを保存し、
+途中で失敗した実行を最後に完了したノードの次から再開できるようにする。
+
+保存形式（<directory>/<run_id>.json）:
+    {
+      "run_id": "...",
+      "status": "running" | "completed" | "failed",
+      "workflow": {...},          # 実行時のワークフロー定義
+      "context": {...},           # inputs と各ノードの出力
+      "next_node_id": "...",      # 再開時に最初に実行するノード
+      "completed": ["..."],       # DAGモードで区間内の完了済みノード
+      "error": "...",
+      "updated_at": 1700000000.0
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CHECKPOINT_DIR = ".checkpoints"
+
+
+def new_run_id() -> str:
+    """チェックポイント用の実行IDを生成する"""
+    return uuid.uuid4().hex[:12]
+
+
+class CheckpointStore:
+    """
+    チェックポイントをローカルのJSONファイルとして保存するストア
+
+    使用例:
+        store = CheckpointStore()
+        executor = GraphExecutor(workflow, skills, llm, checkpoint_store=store)
+        executor.execute(inputs, run_id="abc")   # 途中で失敗
+        executor.resume("abc")                    # 失敗したノードから再開
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        Args:
+            directory: 保存先ディレクトリ（省略時は環境変数 CHECKPOINT_DIR、デフォルト .checkpoints）
+        """
+        self.directory = Path(directory or os.getenv("CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR))
+
+    def _path(self, run_id: str) -> Path:
+        if not run_id or "/" in run_id or "\\" in run_id or run_id.startswith("."):
+            raise ValueError(f"不正なrun_idです: {run_id}")
+        return self.directory / f"{run_id}.json"
+
+    def save(self, run_id: str, checkpoint: Dict[str, Any]) -> None:
+        """チェックポイントを保存する（一時ファイルに書いてから置き換える）"""
+        path = self._path(run_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {**checkpoint, "run_id": run_id, "updated_at": time.time()}
+        # JSONにできない出力は文字列として保存する
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def load(self, run_id: str) -> Dict[str, Any]:
+        """チェックポイントを読み込む"""
+        path = self._path(run_id)
+        if not path.exists():
+            raise FileNotFoundError(f"チェックポイントが見つかりません: {run_id}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def delete(self, run_id: str) -> None:
+        self._path(run_id).unlink(missing_ok=True)
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """保存済みのチェックポイントを更新日時の新しい順に返す"""
+        if not self.directory.exists():
+            return []
+        runs = []
+        for path in self.directory.glob("*.json"):
+            try:
+                runs.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return sorted(runs, key=lambda r: r.get("updated_at", 0), reverse=True)
@@ -1,15 +1,35 @@
-import re
-from typing import Any, Dict, List, Union
+from collections import ChainMap
+from typing import Any, Dict, MutableMapping
+
+from .template import CompiledValue, compile_template, lookup, parse_path
 
 class WorkflowContext:
     """
     ワークフロー実行中の状態（変数）を管理するクラス
     """
     def __init__(self, initial_inputs: Dict[str, Any] = None):
-        self._data: Dict[str, Any] = {}
+        self._data: MutableMapping[str, Any] = {}
         if initial_inputs:
             self._data["inputs"] = initial_inputs
 
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "WorkflowContext":
+        """保存済みのスナップショット（inputs と各ノードの出力）からコンテキストを復元する"""
+        context = cls()
+        context._data = dict(data)
+        return context
+
+    def child(self, **values: Any) -> "WorkflowContext":
+        """
+        親コンテキストを下層に持つ子コンテキストを作成する（foreachの要素ごとのコンテキスト用）
+
+        読み込みは親にフォールスルーし、書き込み（item など）は子にのみ反映される。
+        親のデータはコピーしないため、作成コストは親の変数の数によらず一定。
+        """
+        child = WorkflowContext()
+        child._data = ChainMap(values, self._data)
+        return child
+
     def set(self, key: str, value: Any):
         """変数を設定する (dot notation supported for top-level keys)"""
         # 現状は単純なキー設定のみだが、必要に応じてネスト対応
@@ -24,22 +44,8 @@ class WorkflowContext:
         self._data[node_id] = {"output": output}
 
     def get(self, key: str) -> Any:
-        """変数を取得する (dot notation supported)"""
-        parts = key.split(".")
-        current = self._data
-        
-        try:
-            for part in parts:
-                if isinstance(current, dict):
-                    current = current.get(part)
-                else:
-                    return None
-                
-                if current is None:
-                    return None
-            return current
-        except Exception:
-            return None
+        """変数を取得する (dot notation / list index supported: "plan.output.queries[0]")"""
+        return lookup(self._data, parse_path(key))
 
     def resolve_template(self, text: str) -> str:
         """
@@ -48,15 +54,7 @@ class WorkflowContext:
         """
         if not isinstance(text, str):
             return text
-
-        pattern = r"\{\{\s*([a-zA-Z0-9_.]+)\s*\}\}"
-        
-        def replace_match(match):
-            key = match.group(1)
-            value = self.get(key)
-            return str(value) if value is not None else match.group(0)
-
-        return re.sub(pattern, replace_match, text)
+        return compile_template(text).render(self._data)
 
     def resolve_value(self, value: Any) -> Any:
         """
@@ -65,18 +63,11 @@ class WorkflowContext:
         if isinstance(value, str):
             # 文字列全体が変数参照のみの場合は、型を維持して返す
             # "{{inputs.value}}" -> int(10) のように
-            pattern_full = r"^\{\{\s*([a-zA-Z0-9_.]+)\s*\}\}$"
-            match = re.match(pattern_full, value)
-            if match:
-                key = match.group(1)
-                val = self.get(key)
-                return val if val is not None else value
-            return self.resolve_template(value)
-        
-        if isinstance(value, dict):
-            return {k: self.resolve_value(v) for k, v in value.items()}
-            
-        if isinstance(value, list):
-            return [self.resolve_value(v) for v in value]
-            
+            return compile_template(value).resolve(self._data)
+        if isinstance(value, (dict, list)):
+            return CompiledValue(value).resolve(self._data)
         return value
+
+    def resolve_compiled(self, compiled: CompiledValue) -> Any:
+        """コンパイル済みの値を現在のコンテキストで解決する"""
+        return compiled.resolve(self._data)
@@ -0,0 +1,103 @@
+"""
+データ依存に基づくDAGスケジューリングの補助関数。
+
+プロンプト・パラメータ中の {{node_id.output}} 参照からノード間の依存関係を推定し、
+condition / end ノードを区切りとした「必ず実行される区間（セグメント）」ごとに
+依存グラフを組み立てる。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..schemas.workflow import InlineNodeDefinition, NodeDefinition
+from .template import top_level_references
+
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    """値に含まれる文字列を再帰的に列挙する。"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _iter_strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _iter_strings(v)
+
+
+def _inline_strings(inline: Optional[InlineNodeDefinition]) -> Iterator[str]:
+    if inline is None:
+        return
+    if inline.prompt:
+        yield inline.prompt
+    yield from _iter_strings(inline.params or {})
+
+
+def node_references(node: NodeDefinition) -> Set[str]:
+    """
+    ノードがテンプレートで参照している変数のトップレベル名を返す。
+
+    例: "{{plan.output.queries}}" と "{{inputs.topic}}" を含むノード → {"plan", "inputs"}
+    """
+    texts: List[str] = []
+    if node.prompt:
+        texts.append(node.prompt)
+    if node.items:
+        texts.append(node.items)
+    texts.extend(_iter_strings(node.params or {}))
+
+    refs = {name for text in texts for name in top_level_references(text)}
+    # foreach / parallel の子ノードでは {{item}} はループ変数なので依存先に含めない
+    refs |= {name for text in _inline_strings(node.node) for name in top_level_references(text)} - {"item"}
+    # condition ノードは params.source でノードIDを直接指定する
+    if node.type == "condition" and (node.params or {}).get("source"):
+        refs.add(node.params["source"])
+    return refs
+
+
+def build_segment(
+    node_map: Dict[str, NodeDefinition], start_id: Optional[str]
+) -> Tuple[List[NodeDefinition], Optional[NodeDefinition]]:
+    """
+    start_id から next を辿り、condition / end ノードの手前までの区間を返す。
+
+    Returns:
+        (区間内のノードのリスト（実行順）, 区間を終わらせた condition / end ノード。終端ならNone)
+    """
+    segment: List[NodeDefinition] = []
+    seen: Set[str] = set()
+    current_id = start_id
+    while current_id and current_id != "end":
+        node = node_map.get(current_id)
+        if not node:
+            raise ValueError(f"Node {current_id} not found")
+        if node.type in ("condition", "end"):
+            return segment, node
+        if node.id in seen:
+            raise ValueError(f"next の遷移が循環しています: {node.id}")
+        seen.add(node.id)
+        segment.append(node)
+        current_id = node.next
+    return segment, None
+
+
+def segment_dependencies(segment: List[NodeDefinition]) -> Dict[str, Set[str]]:
+    """
+    区間内の各ノードが完了を待つ必要のあるノードIDを返す。
+
+    - 後のノードが前のノードの出力を参照している場合（読み込み前に書き込みが必要）
+    - 前のノードが後のノードの出力を参照している場合（逐次実行と同じく、上書き前の値を読ませる）
+    """
+    position = {node.id: idx for idx, node in enumerate(segment)}
+    deps: Dict[str, Set[str]] = {node.id: set() for node in segment}
+    for idx, node in enumerate(segment):
+        for ref in node_references(node):
+            ref_idx = position.get(ref)
+            if ref_idx is None or ref_idx == idx:
+                continue
+            if ref_idx < idx:
+                deps[node.id].add(ref)
+            else:
+                deps[ref].add(node.id)
+    return deps
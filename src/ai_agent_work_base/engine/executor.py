@@ -1,101 +1,688 @@
+import asyncio
+import contextvars
+import functools
+import inspect
 import json
 import logging
-from typing import Dict, Any, List, Optional, Callable
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Iterable, Iterator, List, Literal, NamedTuple, Optional, Callable, Awaitable, Sequence, Set, Tuple, Union
 from ..schemas.workflow import WorkflowDefinition, NodeDefinition, InlineNodeDefinition
+from .cache import NodeResultCache, get_default_cache, make_cache_key
+from .checkpoint import CheckpointStore, new_run_id
 from .context import WorkflowContext
+from .dag import build_segment, node_references, segment_dependencies
+from .template import CompiledValue, compile_template
 from ..skills.base import BaseSkill
+from ..skills.registry import SkillRegistry
 from ..core.llm import LLMClient
 
 logger = logging.getLogger(__name__)
 
+# aexecute() で同期スキルを実行する共有スレッドプール（プロセス内の全Executorで共有）
+_skill_pool: Optional[ThreadPoolExecutor] = None
+_skill_pool_lock = threading.Lock()
+
+
+def _shared_skill_pool() -> ThreadPoolExecutor:
+    """同期スキル用の共有スレッドプールを返す（サイズは環境変数 SKILL_POOL_SIZE、デフォルト16）"""
+    global _skill_pool
+    with _skill_pool_lock:
+        if _skill_pool is None:
+            size = int(os.getenv("SKILL_POOL_SIZE", "16"))
+            _skill_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="skill")
+        return _skill_pool
+
+
+# 先行実行中のノードが呼ぶはずだったコールバック（名前, 引数）を溜めておくバッファ
+# （採用されたノードの分だけ後から呼ぶ。不採用の分岐のイベントは外に出さない）
+_speculative_events: contextvars.ContextVar[Optional[List[Tuple[str, tuple]]]] = contextvars.ContextVar(
+    "speculative_events", default=None
+)
+
+
+async def _maybe_await(value: Any) -> Any:
+    """コールバック等の戻り値がawaitableならawaitする"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class BatchResult(NamedTuple):
+    """execute_many() の1件分の結果"""
+    index: int                        # inputs_iter 内での位置（0始まり）
+    inputs: Dict[str, Any]
+    outputs: Optional[Dict[str, Any]]  # 失敗した場合はNone
+    error: Optional[Exception] = None
+
+
 class GraphExecutor:
     """
     ワークフローグラフを実行するエンジン
     """
     def __init__(
-        self, 
-        workflow: WorkflowDefinition, 
-        skills: List[BaseSkill], 
+        self,
+        workflow: WorkflowDefinition,
+        skills: Union[List[BaseSkill], Mapping[str, BaseSkill]],
         llm_client: LLMClient,
         on_node_start: Optional[Callable[[NodeDefinition], None]] = None,
         on_node_end: Optional[Callable[[NodeDefinition, Any], None]] = None,
         on_foreach_item_start: Optional[Callable[[NodeDefinition, int, int, Any], None]] = None,
-        on_foreach_item_end: Optional[Callable[[NodeDefinition, int, int, Any, Any], None]] = None
+        on_foreach_item_end: Optional[Callable[[NodeDefinition, int, int, Any, Any], None]] = None,
+        on_node_token: Optional[Callable[[NodeDefinition, str], None]] = None,
+        max_concurrency: int = 1,
+        skill_pool: Optional[Executor] = None,
+        scheduler: Literal["sequential", "dag"] = "sequential",
+        cache: Optional[NodeResultCache] = None,
+        checkpoint_store: Optional[CheckpointStore] = None
     ):
+        """
+        Args:
+            skills: スキルのリスト、またはスキル名 → スキルのマッピング（SkillRegistry など。スキルは使用時に取得する）
+            on_node_token: llmノードの出力をストリーミングで受け取るコールバック（受信した差分ごとに呼ばれる）。
+                foreach / parallel の子ノードはストリーミングしない
+            max_concurrency: foreachノードの同時実行数のデフォルト上限（ノードのconcurrencyが優先）
+            skill_pool: aexecute() で同期スキルを実行するExecutor（省略時はプロセス共有のスレッドプール）
+            scheduler: "sequential" は next を1つずつ辿る。"dag" は {{node_id.output}} 参照から
+                データ依存を推定し、依存を満たしたノードを同時に実行する（condition / end は区切りとして逐次評価）
+            cache: cache が設定されたノードの結果を保存するキャッシュ（省略時はプロセス共有のデフォルトキャッシュ）
+            checkpoint_store: 指定するとノードの完了ごとにチェックポイントを保存し、resume() で再開できる
+
+        aexecute() ではコールバックに async 関数も指定できる（戻り値がawaitableならawaitされる）。
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency は1以上を指定してください: {max_concurrency}")
         self.workflow = workflow
-        self.skills = {s.name: s for s in skills}
+        self.skills = skills if isinstance(skills, Mapping) else {s.name: s for s in skills}
         self.llm = llm_client
         self.node_map = {n.id: n for n in workflow.nodes}
+        # テンプレートはノードごとに一度だけコンパイルし、実行時はレンダリングのみ行う
+        self._compiled_params: Dict[int, CompiledValue] = {}
+        for n in workflow.nodes:
+            for definition in (n, n.node):
+                if definition is None:
+                    continue
+                self._compiled_params[id(definition)] = CompiledValue(definition.params or {})
+                if definition.prompt:
+                    compile_template(definition.prompt)
         self.on_node_start = on_node_start
         self.on_node_end = on_node_end
         self.on_foreach_item_start = on_foreach_item_start
         self.on_foreach_item_end = on_foreach_item_end
+        self.on_node_token = on_node_token
+        self.max_concurrency = max_concurrency
+        self._skill_pool = skill_pool
+        if scheduler not in ("sequential", "dag"):
+            raise ValueError(f"未対応のscheduler: {scheduler}")
+        self.scheduler = scheduler
+        self._cache = cache
+        self.checkpoint_store = checkpoint_store
+        self.last_run_id: Optional[str] = None
+        # cache 設定があっても副作用のあるノードはキャッシュしない（定義時に一度だけ判定する）
+        self._cacheable = {n.id for n in workflow.nodes if n.cache is not None and self._is_side_effect_free(n)}
+        for n in workflow.nodes:
+            if n.cache is not None and n.id not in self._cacheable:
+                logger.warning(f"ノード '{n.id}' は副作用のないノードではないため cache 設定を無視します")
 
-    def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def execute(self, inputs: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
         """
         ワークフローを実行する
+
+        checkpoint_store を指定した場合はノードの完了ごとにチェックポイントを保存する。
+        run_id を省略した場合は自動生成し、self.last_run_id で参照できる。
         """
         context = WorkflowContext(inputs)
-        
+
         # 開始ノードを見つける (現在はリストの最初のノードを開始とする)
         # 将来的には start_node 指定などに対応
         if not self.workflow.nodes:
             return {}
-            
-        current_node_id = self.workflow.nodes[0].id
-        
-        while current_node_id:
-            if current_node_id == "end":
-                break
-
-            logger.info(f"Executing node: {current_node_id}")
-            node = self.node_map.get(current_node_id)
-            if not node:
-                raise ValueError(f"Node {current_node_id} not found")
-            
-            # コールバック: 開始
-            if self.on_node_start:
-                self.on_node_start(node)
-
-            # ノード実行
-            output = self._execute_node(node, context)
-            
-            # コールバック: 終了
-            if self.on_node_end:
-                self.on_node_end(node, output)
-
-            # 結果をコンテキストに保存
-            context.set_step_output(node.id, output)
-            
-            # 次のノード決定
-            if node.type == "end":
-                break
-                
-            if node.type == "condition":
-                # sourceパラメータで指定したノードの出力をブランチキーとして使用
-                source_key = (node.params or {}).get("source")
-                if source_key:
-                    branch_value = str(context.get(f"{source_key}.output") or "").strip()
-                else:
-                    branch_value = str(output or "").strip()
-                next_id = node.branches.get(branch_value)
-                if next_id is None:
-                    logger.warning(f"condition node '{node.id}': branch '{branch_value}' not found in {list(node.branches.keys())}")
-                current_node_id = next_id
+
+        run_id = self._start_run(run_id)
+        return self._run(self.workflow.nodes[0].id, context, run_id)
+
+    async def aexecute(self, inputs: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        ワークフローをイベントループ上で非同期に実行する
+
+        LLM呼び出しは LLMClient.achat_completion を await し、async def のスキルはそのまま await、
+        同期スキルは上限付きスレッドプールで実行する。結果は execute() と同じ形式で返す。
+        """
+        context = WorkflowContext(inputs)
+
+        if not self.workflow.nodes:
+            return {}
+
+        run_id = self._start_run(run_id)
+        return await self._arun(self.workflow.nodes[0].id, context, run_id)
+
+    def resume(self, run_id: str) -> Dict[str, Any]:
+        """
+        チェックポイントから実行を再開する
+
+        保存されたコンテキストを復元し、最後に完了したノードの次（失敗したノード）から実行する。
+        完了済みの実行の場合は保存された結果をそのまま返す。
+        """
+        checkpoint = self._load_checkpoint(run_id)
+        context = WorkflowContext.from_snapshot(checkpoint["context"])
+        if checkpoint.get("status") == "completed":
+            return context._data
+        self.last_run_id = run_id
+        return self._run(checkpoint.get("next_node_id"), context, run_id, checkpoint.get("completed") or [])
+
+    async def aresume(self, run_id: str) -> Dict[str, Any]:
+        """resume() の非同期版"""
+        checkpoint = self._load_checkpoint(run_id)
+        context = WorkflowContext.from_snapshot(checkpoint["context"])
+        if checkpoint.get("status") == "completed":
+            return context._data
+        self.last_run_id = run_id
+        return await self._arun(checkpoint.get("next_node_id"), context, run_id, checkpoint.get("completed") or [])
+
+    def execute_many(self, inputs_iter: Iterable[Dict[str, Any]], concurrency: int = 4) -> Iterator[BatchResult]:
+        """
+        複数の入力に対してワークフローを並行実行し、完了した順に結果を返す
+
+        全ての実行で同じ LLMClient（レスポンスキャッシュ・接続プール）とノード結果キャッシュを共有する。
+        入力は必要な分だけ読み進めるため、大きなJSONLをそのまま渡してもよい。
+        1件の失敗で全体は止めず、BatchResult.error に例外を入れて返す。
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency は1以上を指定してください")
+        rows = enumerate(inputs_iter)
+        pending: Dict[Future, Tuple[int, Dict[str, Any]]] = {}
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            def submit_next() -> bool:
+                row = next(rows, None)
+                if row is None:
+                    return False
+                pending[pool.submit(self.execute, row[1])] = row
+                return True
+
+            while len(pending) < concurrency and submit_next():
+                pass
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, inputs = pending.pop(future)
+                    error = future.exception()
+                    yield BatchResult(index, inputs, None if error else future.result(), error)
+                    submit_next()
+
+    def _run(self, start_id: Optional[str], context: WorkflowContext, run_id: Optional[str], completed: Sequence[str] = ()) -> Dict[str, Any]:
+        try:
+            if self.scheduler == "dag":
+                self._execute_dag(context, start_id, run_id, completed)
             else:
-                # 通常遷移
-                current_node_id = node.next
-                
+                self._execute_sequential(context, start_id, run_id)
+        except Exception as e:
+            self._mark_failed(run_id, e)
+            raise
         # 最終的なコンテキストの状態を返す（あるいは特定の出力を返す）
         return context._data
 
+    async def _arun(self, start_id: Optional[str], context: WorkflowContext, run_id: Optional[str], completed: Sequence[str] = ()) -> Dict[str, Any]:
+        try:
+            if self.scheduler == "dag":
+                await self._aexecute_dag(context, start_id, run_id, completed)
+            else:
+                await self._aexecute_sequential(context, start_id, run_id)
+        except Exception as e:
+            self._mark_failed(run_id, e)
+            raise
+        return context._data
+
+    def _execute_sequential(self, context: WorkflowContext, start_id: Optional[str], run_id: Optional[str]) -> None:
+        current_node_id = start_id
+        self._save_checkpoint(run_id, context, current_node_id)
+        # speculate 指定の condition ノードの分岐先として先行実行中のノード
+        speculative: Dict[str, Future] = {}
+
+        try:
+            while current_node_id:
+                if current_node_id == "end":
+                    break
+
+                node = self._get_node(current_node_id)
+
+                if node.id in speculative:
+                    # 先行実行の結果を採用する（コールバックはここで呼ぶ）
+                    output = self._adopt_speculative(node, speculative.pop(node.id))
+                else:
+                    speculative.update(self._start_speculation(self._next_condition(node), {node.id}, context))
+                    # ノード実行（開始/終了コールバックを含む）
+                    output = self._execute_with_callbacks(node, context)
+
+                # 結果をコンテキストに保存
+                context.set_step_output(node.id, output)
+
+                # 次のノード決定
+                current_node_id = None if node.type == "end" else self._next_node_id(node, output, context)
+                if node.type == "condition":
+                    self._discard_speculative(speculative, keep=current_node_id)
+                self._save_checkpoint(run_id, context, current_node_id)
+        finally:
+            self._discard_speculative(speculative)
+
+    async def _aexecute_sequential(self, context: WorkflowContext, start_id: Optional[str], run_id: Optional[str]) -> None:
+        current_node_id = start_id
+        self._save_checkpoint(run_id, context, current_node_id)
+        speculative: Dict[str, asyncio.Task] = {}
+
+        try:
+            while current_node_id:
+                if current_node_id == "end":
+                    break
+
+                node = self._get_node(current_node_id)
+                if node.id in speculative:
+                    output = await self._aadopt_speculative(node, speculative.pop(node.id))
+                else:
+                    speculative.update(self._astart_speculation(self._next_condition(node), {node.id}, context))
+                    output = await self._aexecute_with_callbacks(node, context)
+                context.set_step_output(node.id, output)
+
+                current_node_id = None if node.type == "end" else self._next_node_id(node, output, context)
+                if node.type == "condition":
+                    self._discard_speculative(speculative, keep=current_node_id)
+                self._save_checkpoint(run_id, context, current_node_id)
+        finally:
+            self._discard_speculative(speculative)
+
+    def _execute_with_callbacks(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        # コールバック: 開始
+        if self.on_node_start:
+            self.on_node_start(node)
+
+        output = self._execute_node(node, context)
+
+        # コールバック: 終了
+        if self.on_node_end:
+            self.on_node_end(node, output)
+        return output
+
+    async def _aexecute_with_callbacks(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        if self.on_node_start:
+            await _maybe_await(self.on_node_start(node))
+
+        output = await self._aexecute_node(node, context)
+
+        if self.on_node_end:
+            await _maybe_await(self.on_node_end(node, output))
+        return output
+
+    # ------------------------------------------------------------------
+    # 分岐の先行実行（condition ノードの speculate）
+    # ------------------------------------------------------------------
+
+    def _speculation_targets(self, condition: Optional[NodeDefinition], pending: Set[str]) -> List[NodeDefinition]:
+        """
+        speculate 指定の condition ノードについて、判定の確定前に先行実行できる分岐先のノードを返す
+
+        先行実行できるのは副作用がなく、未完了のノード（pending）の出力を参照しないノードのみ。
+        """
+        if condition is None or condition.type != "condition" or not condition.speculate:
+            return []
+        pending = pending | {condition.id}
+        keys = condition.branches.keys() if condition.speculate is True else condition.speculate
+        targets: List[NodeDefinition] = []
+        for key in keys:
+            target = self.node_map.get((condition.branches or {}).get(key))
+            if target is None or target.id in pending or target in targets:
+                continue
+            if target.type not in ("llm", "skill", "foreach", "parallel") or not self._is_side_effect_free(target):
+                continue
+            if node_references(target) & pending:
+                continue
+            targets.append(target)
+        return targets
+
+    def _next_condition(self, node: NodeDefinition) -> Optional[NodeDefinition]:
+        """node の次のノードが condition ノードならそれを返す"""
+        if node.type in ("condition", "end"):
+            return None
+        return self.node_map.get(node.next)
+
+    def _start_speculation(
+        self, condition: Optional[NodeDefinition], pending: Set[str], context: WorkflowContext
+    ) -> Dict[str, Future]:
+        targets = self._speculation_targets(condition, pending)
+        if not targets:
+            return {}
+        logger.info(f"Speculatively executing: {[t.id for t in targets]}")
+        pool = ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix=f"speculate-{condition.id}")
+        futures = {t.id: pool.submit(self._run_speculative, t, context) for t in targets}
+        # 不採用のノードは結果を破棄するだけなので、終了を待たずにプールを手放す
+        pool.shutdown(wait=False)
+        return futures
+
+    def _astart_speculation(
+        self, condition: Optional[NodeDefinition], pending: Set[str], context: WorkflowContext
+    ) -> Dict[str, asyncio.Task]:
+        targets = self._speculation_targets(condition, pending)
+        if targets:
+            logger.info(f"Speculatively executing: {[t.id for t in targets]}")
+        return {t.id: asyncio.create_task(self._arun_speculative(t, context)) for t in targets}
+
+    def _run_speculative(self, node: NodeDefinition, context: WorkflowContext) -> Tuple[Any, List[Tuple[str, tuple]]]:
+        """コールバックを呼ばずにノードを実行し、(出力, 溜めたコールバック) を返す"""
+        token = _speculative_events.set([])
+        try:
+            return self._execute_node(node, context), _speculative_events.get()
+        finally:
+            _speculative_events.reset(token)
+
+    async def _arun_speculative(self, node: NodeDefinition, context: WorkflowContext) -> Tuple[Any, List[Tuple[str, tuple]]]:
+        token = _speculative_events.set([])
+        try:
+            return await self._aexecute_node(node, context), _speculative_events.get()
+        finally:
+            _speculative_events.reset(token)
+
+    def _adopt_speculative(self, node: NodeDefinition, future: Future) -> Any:
+        """先行実行したノードの結果を採用し、通常の実行と同じ順序でコールバックを呼ぶ"""
+        logger.info(f"Adopting speculative result: {node.id}")
+        if self.on_node_start:
+            self.on_node_start(node)
+        output, events = future.result()
+        for name, args in events:
+            getattr(self, name)(*args)
+        if self.on_node_end:
+            self.on_node_end(node, output)
+        return output
+
+    async def _aadopt_speculative(self, node: NodeDefinition, task: asyncio.Task) -> Any:
+        logger.info(f"Adopting speculative result: {node.id}")
+        if self.on_node_start:
+            await _maybe_await(self.on_node_start(node))
+        output, events = await task
+        for name, args in events:
+            await _maybe_await(getattr(self, name)(*args))
+        if self.on_node_end:
+            await _maybe_await(self.on_node_end(node, output))
+        return output
+
+    def _discard_speculative(self, speculative: Dict[str, Union[Future, asyncio.Task]], keep: Optional[str] = None) -> None:
+        """採用しない先行実行をキャンセルする（実行中の同期ノードは完了後に結果を捨てる）"""
+        for node_id in [k for k in speculative if k != keep]:
+            handle = speculative.pop(node_id)
+            handle.cancel()
+            if isinstance(handle, asyncio.Task):
+                # 不採用のタスクの例外は参照済みにして警告を抑える
+                handle.add_done_callback(lambda t: t.cancelled() or t.exception())
+            logger.info(f"Discarded speculative execution: {node_id}")
+
+    def _emit(self, name: str, *args: Any) -> Any:
+        """ノード実行中のコールバック（on_node_token / on_foreach_item_*）を呼ぶ（先行実行中はバッファに溜める）"""
+        callback = getattr(self, name)
+        if callback is None:
+            return None
+        buffer = _speculative_events.get()
+        if buffer is not None:
+            buffer.append((name, args))
+            return None
+        return callback(*args)
+
+    # ------------------------------------------------------------------
+    # チェックポイント
+    # ------------------------------------------------------------------
+
+    def _start_run(self, run_id: Optional[str]) -> Optional[str]:
+        if self.checkpoint_store is None:
+            return None
+        self.last_run_id = run_id or new_run_id()
+        logger.info(f"Checkpoint run_id: {self.last_run_id}")
+        return self.last_run_id
+
+    def _save_checkpoint(
+        self, run_id: Optional[str], context: WorkflowContext, next_node_id: Optional[str], completed: Sequence[str] = ()
+    ) -> None:
+        """コンテキストと次に実行するノードIDを保存する（next_node_id が None / "end" なら完了扱い）"""
+        if run_id is None:
+            return
+        finished = next_node_id in (None, "end")
+        self.checkpoint_store.save(run_id, {
+            "status": "completed" if finished else "running",
+            "workflow": self.workflow.model_dump(),
+            "context": dict(context._data),
+            "next_node_id": None if finished else next_node_id,
+            "completed": list(completed),
+            "error": None,
+        })
+
+    def _mark_failed(self, run_id: Optional[str], error: Exception) -> None:
+        if run_id is None:
+            return
+        try:
+            checkpoint = self.checkpoint_store.load(run_id)
+        except FileNotFoundError:
+            return
+        checkpoint.update(status="failed", error=f"{type(error).__name__}: {error}")
+        self.checkpoint_store.save(run_id, checkpoint)
+        logger.info(f"Execution failed. Resume with run_id: {run_id}")
+
+    def _load_checkpoint(self, run_id: str) -> Dict[str, Any]:
+        if self.checkpoint_store is None:
+            raise RuntimeError("再開するには checkpoint_store を指定してください")
+        checkpoint = self.checkpoint_store.load(run_id)
+        name = checkpoint.get("workflow", {}).get("name")
+        if name != self.workflow.name:
+            raise ValueError(f"チェックポイントのワークフロー '{name}' と実行中のワークフロー '{self.workflow.name}' が一致しません")
+        return checkpoint
+
+    # ------------------------------------------------------------------
+    # DAGスケジューラ
+    # ------------------------------------------------------------------
+
+    def _execute_dag(
+        self, context: WorkflowContext, start_id: Optional[str], run_id: Optional[str] = None, completed: Sequence[str] = ()
+    ) -> None:
+        """
+        区間ごとにデータ依存を満たしたノードから同時に実行し、condition / end で次の区間を決める
+
+        チェックポイントは区間の開始ノードと区間内の完了済みノードを記録し、再開時は完了済みノードを飛ばす。
+        区間の終わりが speculate 指定の condition ノードの場合は、区間の実行と並行して分岐先を先行実行する。
+        """
+        current_node_id = start_id
+        self._save_checkpoint(run_id, context, current_node_id, completed)
+        adopted: Dict[str, Future] = {}
+        speculative: Dict[str, Future] = {}
+        try:
+            while current_node_id and current_node_id != "end":
+                segment, stop_node = build_segment(self.node_map, current_node_id)
+                segment_start = current_node_id
+                speculative = self._start_speculation(stop_node, {n.id for n in segment}, context)
+                self._run_segment(
+                    segment, context, completed,
+                    on_progress=lambda done: self._save_checkpoint(run_id, context, segment_start, done),
+                    adopted=adopted,
+                )
+                completed = ()
+                if stop_node is None:
+                    self._save_checkpoint(run_id, context, None)
+                    return
+                self._save_checkpoint(run_id, context, stop_node.id)
+                output = self._execute_with_callbacks(stop_node, context)
+                context.set_step_output(stop_node.id, output)
+                current_node_id = None if stop_node.type == "end" else self._next_node_id(stop_node, output, context)
+                self._discard_speculative(speculative, keep=current_node_id)
+                adopted, speculative = speculative, {}
+                self._save_checkpoint(run_id, context, current_node_id)
+        finally:
+            self._discard_speculative(adopted)
+            self._discard_speculative(speculative)
+
+    async def _aexecute_dag(
+        self, context: WorkflowContext, start_id: Optional[str], run_id: Optional[str] = None, completed: Sequence[str] = ()
+    ) -> None:
+        current_node_id = start_id
+        self._save_checkpoint(run_id, context, current_node_id, completed)
+        adopted: Dict[str, asyncio.Task] = {}
+        speculative: Dict[str, asyncio.Task] = {}
+        try:
+            while current_node_id and current_node_id != "end":
+                segment, stop_node = build_segment(self.node_map, current_node_id)
+                segment_start = current_node_id
+                speculative = self._astart_speculation(stop_node, {n.id for n in segment}, context)
+                await self._arun_segment(
+                    segment, context, completed,
+                    on_progress=lambda done: self._save_checkpoint(run_id, context, segment_start, done),
+                    adopted=adopted,
+                )
+                completed = ()
+                if stop_node is None:
+                    self._save_checkpoint(run_id, context, None)
+                    return
+                self._save_checkpoint(run_id, context, stop_node.id)
+                output = await self._aexecute_with_callbacks(stop_node, context)
+                context.set_step_output(stop_node.id, output)
+                current_node_id = None if stop_node.type == "end" else self._next_node_id(stop_node, output, context)
+                self._discard_speculative(speculative, keep=current_node_id)
+                adopted, speculative = speculative, {}
+                self._save_checkpoint(run_id, context, current_node_id)
+        finally:
+            self._discard_speculative(adopted)
+            self._discard_speculative(speculative)
+
+    def _run_segment(
+        self,
+        segment: List[NodeDefinition],
+        context: WorkflowContext,
+        completed: Sequence[str] = (),
+        on_progress: Optional[Callable[[List[str]], None]] = None,
+        adopted: Optional[Dict[str, Future]] = None,
+    ) -> None:
+        """
+        区間内のノードを依存関係に従ってスレッドプールで実行する（コンテキストへの書き込みは呼び出し元スレッドで行う）
+
+        completed のノードは実行済みとして扱い、ノードが完了するたびに on_progress に完了済みIDを渡す。
+        adopted に含まれるノードは先行実行の結果を採用する。
+        """
+        adopted = adopted if adopted is not None else {}
+        completed = set(completed)
+        pending = {node.id: node for node in segment if node.id not in completed}
+        if not pending:
+            return
+        deps = segment_dependencies(segment)
+        running: Dict[Future, NodeDefinition] = {}
+        pool = ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="dag")
+        try:
+            while pending or running:
+                for node in [n for n in pending.values() if deps[n.id] <= completed]:
+                    del pending[node.id]
+                    logger.info(f"Executing node: {node.id}")
+                    if node.id in adopted:
+                        running[pool.submit(self._adopt_speculative, node, adopted.pop(node.id))] = node
+                    else:
+                        running[pool.submit(self._execute_with_callbacks, node, context)] = node
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                # 同時に完了したノードは、失敗があっても成功分を先に記録してから例外を送出する
+                for future in sorted(done, key=lambda f: f.exception() is not None):
+                    node = running.pop(future)
+                    context.set_step_output(node.id, future.result())
+                    completed.add(node.id)
+                    if on_progress:
+                        on_progress(sorted(completed))
+        finally:
+            # 失敗時は実行中のノードの完了を待ち、未着手のノードは実行しない
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _arun_segment(
+        self,
+        segment: List[NodeDefinition],
+        context: WorkflowContext,
+        completed: Sequence[str] = (),
+        on_progress: Optional[Callable[[List[str]], None]] = None,
+        adopted: Optional[Dict[str, asyncio.Task]] = None,
+    ) -> None:
+        adopted = adopted if adopted is not None else {}
+        completed = set(completed)
+        pending = {node.id: node for node in segment if node.id not in completed}
+        if not pending:
+            return
+        deps = segment_dependencies(segment)
+        running: Dict[asyncio.Task, NodeDefinition] = {}
+        try:
+            while pending or running:
+                for node in [n for n in pending.values() if deps[n.id] <= completed]:
+                    del pending[node.id]
+                    logger.info(f"Executing node: {node.id}")
+                    if node.id in adopted:
+                        coro = self._aadopt_speculative(node, adopted.pop(node.id))
+                    else:
+                        coro = self._aexecute_with_callbacks(node, context)
+                    running[asyncio.create_task(coro)] = node
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    node = running.pop(task)
+                    context.set_step_output(node.id, task.result())
+                    completed.add(node.id)
+                    if on_progress:
+                        on_progress(sorted(completed))
+        except BaseException:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+
+    def _get_node(self, node_id: str) -> NodeDefinition:
+        logger.info(f"Executing node: {node_id}")
+        node = self.node_map.get(node_id)
+        if not node:
+            raise ValueError(f"Node {node_id} not found")
+        return node
+
+    def _next_node_id(self, node: NodeDefinition, output: Any, context: WorkflowContext) -> Optional[str]:
+        """実行済みノードの次に実行するノードIDを決定する"""
+        if node.type == "condition":
+            # sourceパラメータで指定したノードの出力をブランチキーとして使用
+            source_key = (node.params or {}).get("source")
+            if source_key:
+                branch_value = str(context.get(f"{source_key}.output") or "").strip()
+            else:
+                branch_value = str(output or "").strip()
+            next_id = node.branches.get(branch_value)
+            if next_id is None:
+                logger.warning(f"condition node '{node.id}': branch '{branch_value}' not found in {list(node.branches.keys())}")
+            return next_id
+        # 通常遷移
+        return node.next
+
     def _execute_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        key = self._cache_key(node, context)
+        if key is not None:
+            hit, value = self.cache.get(key)
+            if hit:
+                logger.info(f"Cache hit: {node.id}")
+                return value
+        output = self._dispatch_node(node, context)
+        if key is not None and self._should_store(node, output):
+            self.cache.set(key, output, ttl=node.cache.ttl)
+        return output
+
+    async def _aexecute_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        key = self._cache_key(node, context)
+        if key is not None:
+            hit, value = self.cache.get(key)
+            if hit:
+                logger.info(f"Cache hit: {node.id}")
+                return value
+        output = await self._adispatch_node(node, context)
+        if key is not None and self._should_store(node, output):
+            self.cache.set(key, output, ttl=node.cache.ttl)
+        return output
+
+    def _dispatch_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
         if node.type == "llm":
             return self._execute_llm_node(node, context)
         elif node.type == "skill":
             return self._execute_skill_node(node, context)
         elif node.type == "foreach":
             return self._execute_foreach_node(node, context)
+        elif node.type == "parallel":
+            return self._execute_parallel_node(node, context)
         elif node.type == "end":
             return None
         elif node.type == "condition":
@@ -104,85 +691,355 @@ class GraphExecutor:
         else:
             raise ValueError(f"Unknown node type: {node.type}")
 
-    def _execute_llm_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+    async def _adispatch_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        if node.type == "llm":
+            return await self._aexecute_llm_node(node, context)
+        elif node.type == "skill":
+            return await self._aexecute_skill_node(node, context)
+        elif node.type == "foreach":
+            return await self._aexecute_foreach_node(node, context)
+        elif node.type == "parallel":
+            return await self._aexecute_parallel_node(node, context)
+        elif node.type in ("end", "condition"):
+            return None
+        else:
+            raise ValueError(f"Unknown node type: {node.type}")
+
+    # ------------------------------------------------------------------
+    # ノード結果キャッシュ
+    # ------------------------------------------------------------------
+
+    @property
+    def cache(self) -> NodeResultCache:
+        if self._cache is None:
+            self._cache = get_default_cache()
+        return self._cache
+
+    def _is_side_effect_free(self, node: Union[NodeDefinition, InlineNodeDefinition]) -> bool:
+        """同じ入力なら結果を再利用してよいノードかどうか（LLMと side_effect_free なスキルのみ）"""
+        if node.type == "llm":
+            return True
+        if node.type == "skill":
+            # レジストリの場合はスキルを生成せずにマニフェストの情報で判定する
+            if isinstance(self.skills, SkillRegistry):
+                return self.skills.is_side_effect_free(node.skill)
+            skill = self.skills.get(node.skill)
+            return skill is not None and skill.side_effect_free
+        if node.type in ("foreach", "parallel"):
+            return node.node is not None and self._is_side_effect_free(node.node)
+        return False
+
+    def _cache_key(self, node: NodeDefinition, context: WorkflowContext) -> Optional[str]:
+        """
+        ノード定義・解決済みの入力・モデルからキャッシュキーを作る（キャッシュ対象外ならNone）
+
+        ノードIDや遷移先は結果に影響しないためキーに含めない。
+        """
+        if node.id not in self._cacheable:
+            return None
+        definition = node.model_dump(exclude={"id", "name", "next", "cache"})
+        if node.type in ("foreach", "parallel"):
+            # インラインノードが参照する値（{{inputs.topic}} 等）も結果に影響するため、要素ごとに解決した
+            # プロンプト/パラメータをキーに含める
+            items = context.resolve_value(node.items)
+            if not isinstance(items, list) or node.node is None:
+                return make_cache_key(definition, {"items": items})
+            request = [self._cache_request(node.node, self._make_item_context(context, item)) for item in items]
+        else:
+            request = self._cache_request(node, context)
+        return make_cache_key(definition, request)
+
+    def _cache_request(self, node: Union[NodeDefinition, InlineNodeDefinition], context: WorkflowContext) -> Dict[str, Any]:
+        """LLM・スキルノードの解決済みの入力（キャッシュキーの材料）を返す"""
+        if node.type == "llm":
+            request = self._build_llm_request(node, context)
+            request["model"] = request["model"] or self.llm.model
+            return request
+        return self._resolve_params(node, context)
+
+    def _should_store(self, node: NodeDefinition, output: Any) -> bool:
+        # on_error: collect で失敗した要素を含む結果は次回に再実行させる
+        if node.on_error == "collect" and isinstance(output, list):
+            return not any(isinstance(r, dict) and set(r) == {"error"} for r in output)
+        return True
+
+    # ------------------------------------------------------------------
+    # llm
+    # ------------------------------------------------------------------
+
+    def _build_llm_request(self, node: Union[NodeDefinition, InlineNodeDefinition], context: WorkflowContext) -> Dict[str, Any]:
+        """LLMノードのプロンプトを解決して chat_completion の引数を組み立てる"""
         # プロンプト内の変数を解決
         prompt = context.resolve_template(node.prompt)
-        
+
         # LLM実行（ノードでmodelが指定されていればそれを使用）
         kwargs = {"messages": [{"role": "user", "content": prompt}], "model": node.model}
-        if node.output_format == "json":
+        if getattr(node, "output_format", None) == "json":
             kwargs["response_format"] = {"type": "json_object"}
-        
-        response = self.llm.chat_completion(**kwargs)
+        return kwargs
+
+    def _parse_llm_output(self, node: Union[NodeDefinition, InlineNodeDefinition], response: Any) -> Any:
         content = response.choices[0].message.content
-        
+
         # JSON出力の場合はパースして返す
-        if node.output_format == "json":
+        if getattr(node, "output_format", None) == "json":
             try:
                 return json.loads(content)
             except json.JSONDecodeError as e:
                 raise ValueError(f"LLMのJSON出力のパースに失敗しました (node: {node.id}): {e}\n出力: {content}")
-        
+
         return content
 
-    def _execute_foreach_node(self, node: NodeDefinition, context: WorkflowContext) -> List[Any]:
-        # itemsテンプレートを解決してリストを取得
+    def _execute_llm_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        request = self._build_llm_request(node, context)
+        if self.on_node_token:
+            response = self.llm.stream_chat_completion(
+                **request, on_delta=lambda delta: self._emit("on_node_token", node, delta)
+            )
+        else:
+            response = self.llm.chat_completion(**request)
+        return self._parse_llm_output(node, response)
+
+    async def _aexecute_llm_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        request = self._build_llm_request(node, context)
+        if self.on_node_token:
+            response = await self.llm.astream_chat_completion(
+                **request, on_delta=lambda delta: self._emit("on_node_token", node, delta)
+            )
+        else:
+            response = await self.llm.achat_completion(**request)
+        return self._parse_llm_output(node, response)
+
+    # ------------------------------------------------------------------
+    # skill
+    # ------------------------------------------------------------------
+
+    def _get_skill(self, skill_name: str) -> BaseSkill:
+        if skill_name not in self.skills:
+            raise ValueError(f"Skill {skill_name} not found")
+        return self.skills[skill_name]
+
+    def _resolve_params(self, node: Union[NodeDefinition, InlineNodeDefinition], context: WorkflowContext) -> Dict[str, Any]:
+        """コンパイル済みのparamsを現在のコンテキストで解決する"""
+        compiled = self._compiled_params.get(id(node))
+        if compiled is None:
+            compiled = self._compiled_params[id(node)] = CompiledValue(node.params or {})
+        return context.resolve_compiled(compiled)
+
+    def _call_skill(self, skill: BaseSkill, params: Dict[str, Any]) -> Any:
+        """スキルを同期実行する（async def のスキルは新しいイベントループで実行する）"""
+        result = skill.execute(**params)
+        if inspect.isawaitable(result):
+            return asyncio.run(result)
+        return result
+
+    async def _acall_skill(self, skill: BaseSkill, params: Dict[str, Any]) -> Any:
+        """スキルを非同期実行する（同期スキルはスレッドプールで実行する）"""
+        if inspect.iscoroutinefunction(skill.execute):
+            return await skill.execute(**params)
+        loop = asyncio.get_running_loop()
+        pool = self._skill_pool or _shared_skill_pool()
+        return await loop.run_in_executor(pool, functools.partial(skill.execute, **params))
+
+    def _execute_skill_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        skill = self._get_skill(node.skill)
+
+        # パラメータの変数解決
+        resolved_params = self._resolve_params(node, context)
+
+        # スキル実行
+        return self._call_skill(skill, resolved_params)
+
+    async def _aexecute_skill_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
+        skill = self._get_skill(node.skill)
+        resolved_params = self._resolve_params(node, context)
+        return await self._acall_skill(skill, resolved_params)
+
+    # ------------------------------------------------------------------
+    # foreach / parallel
+    # ------------------------------------------------------------------
+
+    def _resolve_items(self, node: NodeDefinition, context: WorkflowContext) -> List[Any]:
+        """foreach / parallel ノードのitemsテンプレートを解決してリストを取得する"""
         items = context.resolve_value(node.items)
         if not isinstance(items, list):
-            raise ValueError(f"foreachノード '{node.id}' のitemsがリストではありません: {type(items).__name__}")
-        
+            raise ValueError(f"{node.type}ノード '{node.id}' のitemsがリストではありません: {type(items).__name__}")
+
         if node.node is None:
-            raise ValueError(f"foreachノード '{node.id}' にnodeが定義されていません")
-        
+            raise ValueError(f"{node.type}ノード '{node.id}' にnodeが定義されていません")
+        return items
+
+    def _execute_foreach_node(self, node: NodeDefinition, context: WorkflowContext) -> List[Any]:
+        items = self._resolve_items(node, context)
+        total = len(items)
+        workers = min(node.concurrency or self.max_concurrency, total)
+        if workers <= 1:
+            return [self._run_foreach_item(node, idx, total, item, context) for idx, item in enumerate(items)]
+
+        # 上限付きワーカープールで並行実行し、結果は入力順で返す
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"foreach-{node.id}")
+        try:
+            # 先行実行中のバッファをワーカーに引き継ぐため、コンテキスト変数をコピーして実行する
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._run_foreach_item, node, idx, total, item, context)
+                for idx, item in enumerate(items)
+            ]
+            return [f.result() for f in futures]
+        finally:
+            # 失敗時は未着手のitemを実行しない
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _aexecute_foreach_node(self, node: NodeDefinition, context: WorkflowContext) -> List[Any]:
+        items = self._resolve_items(node, context)
+        total = len(items)
+        return await self._gather_items(
+            node,
+            items,
+            lambda idx, item: self._arun_foreach_item(node, idx, total, item, context),
+            limit=node.concurrency or self.max_concurrency,
+        )
+
+    def _execute_parallel_node(self, node: NodeDefinition, context: WorkflowContext) -> List[Any]:
+        """
+        parallelノードを asyncio.gather 相当で並列実行する。
+
+        - concurrency: 同時実行数の上限（省略時は全要素を同時に実行）
+        - timeout: 要素ごとのタイムアウト秒数
+        - on_error: "fail_fast" は最初の失敗で残りをキャンセルして例外を送出、
+          "collect" は失敗した要素を {"error": "..."} として結果に含める
+
+        内部で asyncio.run() を使うため、実行中のイベントループがあるスレッドからは呼べない（aexecute() を使う）。
+        タイムアウトした要素を実行しているスレッドはキャンセルされず、処理が終わるまでバックグラウンドで動き続ける。
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                f"parallelノード '{node.id}' は実行中のイベントループ上では execute() で実行できません。"
+                "aexecute() を使用してください。"
+            )
+        items = self._resolve_items(node, context)
         total = len(items)
-        results = []
-        for idx, item in enumerate(items):
-            # コールバック: item開始
-            if self.on_foreach_item_start:
-                self.on_foreach_item_start(node, idx, total, item)
-
-            # {{item}} を解決するための一時コンテキストを作成
-            item_context = WorkflowContext()
-            item_context._data = dict(context._data)  # 現在のコンテキストをコピー
-            item_context._data["item"] = item
-            
-            result = self._execute_inline_node(node.node, item_context)
-            results.append(result)
-
-            # コールバック: item終了
-            if self.on_foreach_item_end:
-                self.on_foreach_item_end(node, idx, total, item, result)
-        
-        return results
+        if total == 0:
+            return []
+        # 同期スキル/LLM呼び出しは専用スレッドで実行する。タイムアウトした要素の結果は破棄するが、
+        # 実行中のスレッド自体は止められないため、終了を待たずにプールを手放す
+        pool = ThreadPoolExecutor(max_workers=total, thread_name_prefix=f"parallel-{node.id}")
+
+        async def run_item(idx: int, item: Any) -> Any:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                pool, contextvars.copy_context().run, self._run_foreach_item, node, idx, total, item, context
+            )
+
+        try:
+            return asyncio.run(self._gather_items(
+                node, items, run_item, limit=node.concurrency or total, timeout=node.timeout, on_error=node.on_error
+            ))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _aexecute_parallel_node(self, node: NodeDefinition, context: WorkflowContext) -> List[Any]:
+        items = self._resolve_items(node, context)
+        total = len(items)
+        return await self._gather_items(
+            node,
+            items,
+            lambda idx, item: self._arun_foreach_item(node, idx, total, item, context),
+            limit=node.concurrency or total,
+            timeout=node.timeout,
+            on_error=node.on_error,
+        )
+
+    async def _gather_items(
+        self,
+        node: NodeDefinition,
+        items: List[Any],
+        run_item: Callable[[int, Any], Awaitable[Any]],
+        limit: int,
+        timeout: Optional[float] = None,
+        on_error: str = "fail_fast",
+    ) -> List[Any]:
+        """要素ごとのコルーチンを同時実行数・タイムアウト付きで実行し、結果を入力順で返す"""
+        if not items:
+            return []
+        semaphore = asyncio.Semaphore(limit)
+
+        async def guarded(idx: int, item: Any) -> Any:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(run_item(idx, item), timeout=timeout)
+                except TimeoutError:
+                    if timeout is None:
+                        raise
+                    raise TimeoutError(
+                        f"{node.type}ノード '{node.id}' の要素[{idx}]が{timeout}秒以内に完了しませんでした"
+                    ) from None
+
+        tasks = [asyncio.create_task(guarded(idx, item)) for idx, item in enumerate(items)]
+
+        if on_error == "collect":
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            return [
+                {"error": f"{type(r).__name__}: {r}"} if isinstance(r, Exception) else r
+                for r in results
+            ]
+
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in tasks:
+            if task in done and task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+
+    def _make_item_context(self, context: WorkflowContext, item: Any) -> WorkflowContext:
+        """{{item}} を解決するための一時コンテキストを作成する（親コンテキストはコピーせず参照する）"""
+        return context.child(item=item)
+
+    def _run_foreach_item(self, node: NodeDefinition, idx: int, total: int, item: Any, context: WorkflowContext) -> Any:
+        """foreach / parallel の1要素を実行する（コールバックはitemごとに1回ずつ呼ばれる）"""
+        # コールバック: item開始
+        self._emit("on_foreach_item_start", node, idx, total, item)
+
+        result = self._execute_inline_node(node.node, self._make_item_context(context, item))
+
+        # コールバック: item終了
+        self._emit("on_foreach_item_end", node, idx, total, item, result)
+
+        return result
+
+    async def _arun_foreach_item(self, node: NodeDefinition, idx: int, total: int, item: Any, context: WorkflowContext) -> Any:
+        await _maybe_await(self._emit("on_foreach_item_start", node, idx, total, item))
+
+        result = await self._aexecute_inline_node(node.node, self._make_item_context(context, item))
+
+        await _maybe_await(self._emit("on_foreach_item_end", node, idx, total, item, result))
+
+        return result
 
     def _execute_inline_node(self, inline: InlineNodeDefinition, context: WorkflowContext) -> Any:
-        """foreachの子ノードを実行する"""
+        """foreach / parallel の子ノードを実行する"""
         if inline.type == "skill":
-            skill_name = inline.skill
-            if skill_name not in self.skills:
-                raise ValueError(f"Skill {skill_name} not found")
-            skill = self.skills[skill_name]
-            resolved_params = context.resolve_value(inline.params or {})
-            return skill.execute(**resolved_params)
+            skill = self._get_skill(inline.skill)
+            resolved_params = self._resolve_params(inline, context)
+            return self._call_skill(skill, resolved_params)
         elif inline.type == "llm":
-            prompt = context.resolve_template(inline.prompt)
-            response = self.llm.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
-                model=inline.model
-            )
-            return response.choices[0].message.content
+            response = self.llm.chat_completion(**self._build_llm_request(inline, context))
+            return self._parse_llm_output(inline, response)
         else:
             raise ValueError(f"インラインノードの未対応タイプ: {inline.type}")
 
-    def _execute_skill_node(self, node: NodeDefinition, context: WorkflowContext) -> Any:
-        skill_name = node.skill
-        if skill_name not in self.skills:
-            raise ValueError(f"Skill {skill_name} not found")
-            
-        skill = self.skills[skill_name]
-        
-        # パラメータの変数解決
-        resolved_params = context.resolve_value(node.params or {})
-        
-        # スキル実行
-        return skill.execute(**resolved_params)
+    async def _aexecute_inline_node(self, inline: InlineNodeDefinition, context: WorkflowContext) -> Any:
+        if inline.type == "skill":
+            skill = self._get_skill(inline.skill)
+            resolved_params = self._resolve_params(inline, context)
+            return await self._acall_skill(skill, resolved_params)
+        elif inline.type == "llm":
+            response = await self.llm.achat_completion(**self._build_llm_request(inline, context))
+            return self._parse_llm_output(inline, response)
+        else:
+            raise ValueError(f"インラインノードの未対応タイプ: {inline.type}")
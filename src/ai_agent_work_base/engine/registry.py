@@ -0,0 +1,260 @@
+"""
+ワークフローレジストリ。
+
+workflows/ 配下のYAMLを一度だけ読み込んでバリデーション済みの定義を保持し、
+ファイルの更新日時・サイズが変わった場合のみ再読み込みする（内容のハッシュが同じなら再パースしない）。
+ワークフロー名・ファイル名からの解決は辞書引きで行う。
+
+一覧表示用のカタログ（名前・説明・入力）も変更があったときだけ作り直し、
+内容から計算した ETag と合わせて保持する（Webhook・Slack・CLI で共有する）。
+
+使用例:
+    registry = get_registry(Path("workflows"))
+    workflow = registry.get("deep_research")
+    catalog = registry.catalog()   # catalog.etag, catalog.entries
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from ..schemas.workflow import WorkflowDefinition
+
+logger = logging.getLogger(__name__)
+
+_PATTERNS = ("*.yaml", "*.yml")
+# ディレクトリの mtime の分解能の余裕（ナノ秒）。走査の時点からこれ以内に更新されたディレクトリは、
+# 分解能の粗いファイルシステムでは mtime が変わらないまま更新されうるため、変更ありとみなす
+_MTIME_RACY_NS = 2_000_000_000
+
+
+class WorkflowEntry:
+    """レジストリに登録された1ファイル分の情報"""
+
+    __slots__ = ("path", "mtime_ns", "size", "digest", "definition", "error")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.mtime_ns = -1
+        self.size = -1
+        self.digest = ""
+        self.definition: Optional[WorkflowDefinition] = None
+        self.error: Optional[str] = None
+
+
+class WorkflowCatalog:
+    """
+    ワークフロー一覧のスナップショット
+
+    entries の各要素: {"name", "file", "stem", "description", "inputs": [{"name", "type", "description"}], "error"}
+    （読み込みに失敗したファイルは name が拡張子なしのファイル名、error にエラー内容が入る）
+    """
+
+    __slots__ = ("generation", "etag", "entries")
+
+    def __init__(self, generation: int, entries: List[WorkflowEntry]):
+        self.generation = generation
+        self.entries: List[Dict[str, Any]] = [self._summarize(e) for e in entries]
+        digest = hashlib.sha256()
+        for entry in entries:
+            digest.update(f"{entry.path.name}\0{entry.digest}\0{entry.error or ''}\n".encode("utf-8"))
+        self.etag = f'"{digest.hexdigest()[:32]}"'
+
+    @staticmethod
+    def _summarize(entry: WorkflowEntry) -> Dict[str, Any]:
+        wf = entry.definition
+        return {
+            "name": wf.name if wf is not None else entry.path.stem,
+            "file": entry.path.name,
+            "stem": entry.path.stem,
+            "description": (wf.description or "") if wf is not None else "",
+            "inputs": [
+                {"name": i.name, "type": i.type, "description": i.description or ""}
+                for i in ((wf.inputs or []) if wf is not None else [])
+            ],
+            "error": entry.error if wf is None else None,
+        }
+
+    def workflows(self) -> List[Dict[str, Any]]:
+        """読み込みに成功したワークフローのみを返す"""
+        return [e for e in self.entries if e["error"] is None]
+
+
+class WorkflowRegistry:
+    """
+    ディレクトリ単位のワークフロー定義キャッシュ
+
+    ディレクトリの走査は refresh_interval 秒に1回まで。未知の名前を引いた場合は、前回の走査以降に
+    ディレクトリの mtime が変わっていれば（ファイルの追加・削除・名前変更があれば）即座に再走査する。
+    """
+
+    def __init__(self, directory: Path, refresh_interval: float = 1.0):
+        """
+        Args:
+            directory: workflows/ ディレクトリのパス
+            refresh_interval: ファイルの変更を確認する最短間隔（秒）。0 の場合は参照のたびに確認する
+        """
+        self.directory = Path(directory)
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[Path, WorkflowEntry] = {}
+        self._index: Dict[str, WorkflowEntry] = {}
+        self._lock = threading.RLock()
+        self._checked_at: Optional[float] = None
+        # 前回の走査時のディレクトリの mtime と走査した時刻（time.time_ns()）
+        self._dir_mtime_ns: Optional[int] = None
+        self._scanned_ns = 0
+        self._catalog = WorkflowCatalog(0, [])
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        ディレクトリを走査し、変更のあったファイルのみ再読み込みする
+
+        Returns:
+            定義の追加・変更・削除があった場合はTrue
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+                return False
+            self._checked_at = now
+            # 走査中の変更を見逃さないよう、mtime は走査の前に記録する
+            self._dir_mtime_ns = self._directory_mtime_ns()
+            self._scanned_ns = time.time_ns()
+
+            paths = set()
+            if self.directory.exists():
+                for pattern in _PATTERNS:
+                    paths.update(self.directory.glob(pattern))
+
+            changed = False
+            for path in paths:
+                entry = self._entries.get(path)
+                if entry is None:
+                    entry = self._entries[path] = WorkflowEntry(path)
+                changed |= self._reload_if_modified(entry)
+            for path in set(self._entries) - paths:
+                del self._entries[path]
+                changed = True
+
+            if changed:
+                self._rebuild_index()
+            return changed
+
+    def _directory_mtime_ns(self) -> Optional[int]:
+        try:
+            return self.directory.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _directory_changed(self) -> bool:
+        """前回の走査以降にディレクトリのファイル構成が変わった可能性があるか"""
+        with self._lock:
+            mtime_ns = self._directory_mtime_ns()
+            if mtime_ns != self._dir_mtime_ns:
+                return True
+            return mtime_ns is not None and self._scanned_ns - mtime_ns < _MTIME_RACY_NS
+
+    def _reload_if_modified(self, entry: WorkflowEntry) -> bool:
+        try:
+            stat = entry.path.stat()
+        except OSError:
+            return False
+        if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+            return False
+        entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+
+        try:
+            raw = entry.path.read_bytes()
+        except OSError as e:
+            entry.definition, entry.error = None, str(e)
+            return True
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == entry.digest:
+            # touch されただけで内容は同じ
+            return False
+        entry.digest = digest
+
+        try:
+            entry.definition = WorkflowDefinition(**yaml.safe_load(raw))
+            entry.error = None
+            logger.info(f"ワークフロー読み込み: {entry.definition.name} ({entry.path.name})")
+        except Exception as e:
+            entry.definition, entry.error = None, str(e)
+            logger.warning(f"ワークフロー読み込みエラー {entry.path}: {e}")
+        return True
+
+    def _rebuild_index(self) -> None:
+        """名前 → エントリの索引を作り直す（ファイル名・拡張子なしのファイル名・ワークフロー名で引ける）"""
+        index: Dict[str, WorkflowEntry] = {}
+        for entry in sorted(self._entries.values(), key=lambda e: e.path.name):
+            if entry.definition is not None:
+                index.setdefault(entry.definition.name, entry)
+        # ファイル名による指定はワークフロー名より優先する
+        for entry in self._entries.values():
+            index[entry.path.name] = entry
+            index[entry.path.stem] = entry
+        self._index = index
+        self._catalog = WorkflowCatalog(
+            self._catalog.generation + 1, sorted(self._entries.values(), key=lambda e: e.path.name)
+        )
+
+    def find(self, name: str) -> Optional[WorkflowEntry]:
+        """名前（ファイル名・拡張子なしのファイル名・ワークフロー名）からエントリを返す（見つからなければNone）"""
+        self.refresh()
+        entry = self._index.get(name)
+        # 存在しない名前での参照が続いても、ファイルが増えていなければ走査し直さない
+        if entry is None and self._directory_changed() and self.refresh(force=True):
+            entry = self._index.get(name)
+        return entry
+
+    def resolve_path(self, name: str) -> Path:
+        """名前からYAMLファイルのパスを返す"""
+        entry = self.find(name)
+        if entry is None:
+            raise FileNotFoundError(f"ワークフローが見つかりません: {name}")
+        return entry.path
+
+    def get(self, name: str) -> WorkflowDefinition:
+        """名前からバリデーション済みのワークフロー定義を返す"""
+        entry = self.find(name)
+        if entry is None:
+            raise FileNotFoundError(f"ワークフローが見つかりません: {name}")
+        if entry.definition is None:
+            raise ValueError(f"ワークフロー '{name}' の読み込みに失敗しました: {entry.error}")
+        return entry.definition
+
+    def entries(self) -> List[WorkflowEntry]:
+        """全エントリをファイル名順に返す（読み込みに失敗したものも含む）"""
+        self.refresh()
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e.path.name)
+
+    def workflows(self) -> List[Tuple[Path, WorkflowDefinition]]:
+        """読み込みに成功した (パス, 定義) をファイル名順に返す"""
+        return [(e.path, e.definition) for e in self.entries() if e.definition is not None]
+
+    def catalog(self) -> WorkflowCatalog:
+        """一覧表示用のカタログを返す（変更がなければ前回と同じオブジェクト・同じ ETag）"""
+        self.refresh()
+        return self._catalog
+
+
+_registries: Dict[Path, WorkflowRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(directory: Path) -> WorkflowRegistry:
+    """ディレクトリごとにプロセス内で共有されるレジストリを返す"""
+    key = Path(directory).resolve()
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = WorkflowRegistry(directory)
+        return registry
@@ -8,6 +8,12 @@ Socket Modeで動作するため、パブリックなURLは不要。
     SLACK_BOT_TOKEN: xoxb- で始まるBotトークン
     SLACK_APP_TOKEN: xapp- で始まるApp-Level Token（Socket Mode用）
 
+同時実行の制御（省略可）:
+    SLACK_MAX_CONCURRENCY: 全体で同時に実行するワークフロー数（デフォルト: 4）
+    SLACK_MAX_PER_USER: 1ユーザーあたりの同時実行数（デフォルト: 1）
+    SLACK_MAX_PER_CHANNEL: 1チャンネルあたりの同時実行数（デフォルト: 2）
+    SLACK_QUEUE_SIZE: 実行待ちの最大件数（デフォルト: 20）
+
 Slack App設定:
     - Socket Mode: 有効
     - Event Subscriptions: message.channels または message.im を購読
@@ -16,16 +22,36 @@ Slack App設定:
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import re
 import threading
+from collections import Counter
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import make_cache_key
+from .registry import get_registry
 
 logger = logging.getLogger(__name__)
 
 
+class _SlackRun:
+    """/run で受け付けた1件の実行"""
+
+    __slots__ = ("workflow_name", "inputs", "say", "user", "channel", "key")
+
+    def __init__(self, workflow_name: str, inputs: Dict[str, str], say: Any, user: Optional[str], channel: Optional[str]):
+        self.workflow_name = workflow_name
+        self.inputs = inputs
+        self.say = say
+        self.user = user
+        self.channel = channel
+        # 同じチャンネルでの同一リクエストの判定に使うキー
+        self.key = make_cache_key(workflow_name, inputs, channel)
+
+
 class SlackTriggerApp:
     """
     Slack Boltを使用してSlackメッセージからワークフローを起動するアプリ。
@@ -51,6 +77,10 @@ class SlackTriggerApp:
         skills: List[Any],
         bot_token: Optional[str] = None,
         app_token: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        max_per_channel: Optional[int] = None,
+        max_queue: Optional[int] = None,
     ) -> None:
         """
         Args:
@@ -59,12 +89,166 @@ class SlackTriggerApp:
             skills: 利用可能なスキルのリスト
             bot_token: Slack Bot Token（省略時は環境変数SLACK_BOT_TOKENを使用）
             app_token: Slack App Token（省略時は環境変数SLACK_APP_TOKENを使用）
+            max_concurrency: 全体の同時実行数（省略時は環境変数SLACK_MAX_CONCURRENCY、デフォルト4）
+            max_per_user: ユーザーごとの同時実行数（省略時は環境変数SLACK_MAX_PER_USER、デフォルト1）
+            max_per_channel: チャンネルごとの同時実行数（省略時は環境変数SLACK_MAX_PER_CHANNEL、デフォルト2）
+            max_queue: 実行待ちの最大件数（省略時は環境変数SLACK_QUEUE_SIZE、デフォルト20）
         """
         self._workflows_dir = workflows_dir
+        self._registry = get_registry(workflows_dir)
         self._llm_client = llm_client
         self._skills = skills
         self._bot_token = bot_token or os.getenv("SLACK_BOT_TOKEN")
         self._app_token = app_token or os.getenv("SLACK_APP_TOKEN")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+        self._max_concurrency = max_concurrency or int(os.getenv("SLACK_MAX_CONCURRENCY", "4"))
+        self._max_per_user = max_per_user or int(os.getenv("SLACK_MAX_PER_USER", "1"))
+        self._max_per_channel = max_per_channel or int(os.getenv("SLACK_MAX_PER_CHANNEL", "2"))
+        self._max_queue = max_queue or int(os.getenv("SLACK_QUEUE_SIZE", "20"))
+        # 実行待ち（受け付け順）と実行中の件数。_runs_lock で保護する
+        self._pending: List[_SlackRun] = []
+        self._running: List[_SlackRun] = []
+        self._runs_lock = threading.Lock()
+        # ワークフロー名 → (生成に使った定義, GraphExecutor)
+        self._executors: Dict[str, Tuple[Any, Any]] = {}
+        # /workflows の返信 (カタログのETag, メッセージ)
+        self._workflow_list: Optional[Tuple[str, str]] = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """ワークフロー実行用のイベントループ（専用スレッド1本で全実行を処理する）を返す。"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="slack-workflows", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit_run(
+        self,
+        workflow_name: str,
+        inputs: Dict[str, str],
+        say: Any,
+        user: Optional[str] = None,
+        channel: Optional[str] = None,
+    ) -> str:
+        """
+        ワークフローの実行を受け付け、Slackに返す受付メッセージを返す。
+
+        全体・ユーザー・チャンネルの同時実行数に空きがあれば即座に開始し、なければ実行待ちに積む。
+        同じチャンネルで同じワークフロー・入力が実行中または実行待ちの場合は受け付けない。
+        """
+        run = _SlackRun(workflow_name, inputs, say, user, channel)
+        with self._runs_lock:
+            if any(r.key == run.key for r in self._running + self._pending):
+                return f"ℹ️ 同じ入力の `{workflow_name}` は既に実行中または実行待ちです。"
+            if len(self._pending) >= self._max_queue:
+                return (
+                    f"🚫 実行待ちが上限（{self._max_queue}件）に達しているため受け付けられません。"
+                    "しばらくしてから再度実行してください。"
+                )
+            self._pending.append(run)
+            self._dispatch_locked()
+            if run in self._pending:
+                position = self._pending.index(run) + 1
+                return f"🕒 queued (#{position}): ワークフロー `{workflow_name}` は実行待ちです。順番が来たら開始します。"
+        return f"⏳ ワークフロー `{workflow_name}` を実行中... 入力: {inputs or '(なし)'}"
+
+    def queue_status(self) -> Dict[str, int]:
+        """実行中・実行待ちの件数を返す"""
+        with self._runs_lock:
+            return {"running": len(self._running), "queued": len(self._pending)}
+
+    def _can_start(self, run: _SlackRun) -> bool:
+        if len(self._running) >= self._max_concurrency:
+            return False
+        if run.user and Counter(r.user for r in self._running)[run.user] >= self._max_per_user:
+            return False
+        if run.channel and Counter(r.channel for r in self._running)[run.channel] >= self._max_per_channel:
+            return False
+        return True
+
+    def _dispatch_locked(self) -> List[_SlackRun]:
+        """上限に空きのある実行待ちを受け付け順に開始する（_runs_lock を保持して呼ぶ）"""
+        started = []
+        for run in list(self._pending):
+            if len(self._running) >= self._max_concurrency:
+                break
+            if not self._can_start(run):
+                continue
+            self._pending.remove(run)
+            self._running.append(run)
+            started.append(run)
+            asyncio.run_coroutine_threadsafe(self._execute(run), self._get_loop())
+        return started
+
+    async def _execute(self, run: _SlackRun) -> None:
+        try:
+            await self._run_workflow(run.workflow_name, run.inputs, run.say)
+        finally:
+            with self._runs_lock:
+                self._running.remove(run)
+                started = self._dispatch_locked()
+            for queued in started:
+                await asyncio.to_thread(
+                    queued.say, f"⏳ 実行待ちだったワークフロー `{queued.workflow_name}` を開始しました。"
+                )
+
+    def _executor(self, workflow_name: str) -> Any:
+        """ワークフローの GraphExecutor を返す（定義が変わらない限り同じインスタンスを再利用する）"""
+        from .executor import GraphExecutor
+
+        workflow = self._registry.get(workflow_name)
+        cached = self._executors.get(workflow_name)
+        if cached is not None and cached[0] is workflow:
+            return cached[1]
+        executor = GraphExecutor(workflow, self._skills, self._llm_client)
+        self._executors[workflow_name] = (workflow, executor)
+        return executor
+
+    async def _run_workflow(self, workflow_name: str, inputs: dict[str, str], say: Any) -> None:
+        """ワークフローを非同期実行し、最終ノードの出力をSlackに返信する。"""
+        try:
+            try:
+                executor = self._executor(workflow_name)
+            except FileNotFoundError:
+                await asyncio.to_thread(say, f"❌ ワークフロー `{workflow_name}` が見つかりません。")
+                return
+
+            workflow = executor.workflow
+            result = await executor.aexecute(inputs)
+
+            # 最終ノードの出力を取得して返信
+            last_output = ""
+            for node in reversed(workflow.nodes):
+                val = result.get(node.id, {}).get("output")
+                if val:
+                    last_output = str(val)[:500]
+                    break
+
+            await asyncio.to_thread(say, f"✅ `{workflow_name}` 完了！\n```\n{last_output}\n```")
+
+        except Exception as e:
+            logger.exception(f"ワークフロー実行エラー: {e}")
+            await asyncio.to_thread(say, f"❌ 実行エラー: {e}")
+
+    def format_workflow_list(self) -> str:
+        """/workflows の返信メッセージを返す（カタログが変わらない限り前回の文字列を再利用する）"""
+        catalog = self._registry.catalog()
+        cached = self._workflow_list
+        if cached is not None and cached[0] == catalog.etag:
+            return cached[1]
+        lines = ["📋 *利用可能なワークフロー:*"]
+        for wf in catalog.entries:
+            if wf["error"] is not None:
+                lines.append(f"• `{wf['stem']}` (読み込みエラー)")
+                continue
+            inputs_str = ", ".join(i["name"] for i in wf["inputs"])
+            lines.append(f"• `{wf['stem']}` — {wf['description'] or wf['name']} (入力: {inputs_str or 'なし'})")
+        text = "\n".join(lines)
+        self._workflow_list = (catalog.etag, text)
+        return text
 
     def _build_app(self) -> Any:
         """Slack Boltアプリを構築する。"""
@@ -101,55 +285,12 @@ class SlackTriggerApp:
             for pair in re.findall(r"(\w+)=([^\s]+)", args_str):
                 inputs[pair[0]] = pair[1]
 
-            say(f"⏳ ワークフロー `{workflow_name}` を実行中... 入力: {inputs or '(なし)'}")
-
-            def run_in_thread() -> None:
-                try:
-                    from .loader import WorkflowLoader
-                    from .executor import GraphExecutor
-
-                    workflow_path = self._workflows_dir / f"{workflow_name}.yaml"
-                    if not workflow_path.exists():
-                        say(f"❌ ワークフロー `{workflow_name}` が見つかりません。")
-                        return
-
-                    workflow = WorkflowLoader.load(workflow_path)
-                    executor = GraphExecutor(workflow, self._skills, self._llm_client)
-                    result = executor.execute(inputs)
-
-                    # 最終ノードの出力を取得して返信
-                    last_output = ""
-                    for node in reversed(workflow.nodes):
-                        val = result.get(node.id, {}).get("output")
-                        if val:
-                            last_output = str(val)[:500]
-                            break
-
-                    say(f"✅ `{workflow_name}` 完了！\n```\n{last_output}\n```")
-
-                except Exception as e:
-                    logger.exception(f"ワークフロー実行エラー: {e}")
-                    say(f"❌ 実行エラー: {e}")
-
-            thread = threading.Thread(target=run_in_thread, daemon=True)
-            thread.start()
+            say(self.submit_run(workflow_name, inputs, say, message.get("user"), message.get("channel")))
 
         @app.message(re.compile(r"^/workflows$"))
         def handle_list_workflows(message: dict, say: Any) -> None:
             """利用可能なワークフロー一覧を返す。"""
-            from .loader import WorkflowLoader
-
-            lines = ["📋 *利用可能なワークフロー:*"]
-            for path in sorted(self._workflows_dir.glob("*.yaml")):
-                try:
-                    wf = WorkflowLoader.load(path)
-                    inputs_str = ", ".join(
-                        i.name for i in (wf.inputs or [])
-                    )
-                    lines.append(f"• `{path.stem}` — {wf.description or wf.name} (入力: {inputs_str or 'なし'})")
-                except Exception:
-                    lines.append(f"• `{path.stem}` (読み込みエラー)")
-            say("\n".join(lines))
+            say(self.format_workflow_list())
 
         return app, SocketModeHandler
 
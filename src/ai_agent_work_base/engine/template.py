@@ -0,0 +1,158 @@
+"""
+テンプレート変数（{{ key.subkey }}）のコンパイルとレンダリング。
+
+テンプレート文字列は一度だけ解析し、固定テキスト部分と分割済みのアクセスパスを保持する。
+同じプロンプトを foreach の要素ごとに何度もレンダリングしても正規表現の再解析は発生しない。
+
+対応する参照形式:
+    {{inputs.topic}}               辞書のキーを辿る
+    {{plan.output.queries[0]}}     リストのインデックス指定（負のインデックスも可）
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Callable, Set, Tuple, Union
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([a-zA-Z0-9_.\[\]-]+)\s*\}\}")
+_FULL_PATTERN = re.compile(r"^\{\{\s*([a-zA-Z0-9_.\[\]-]+)\s*\}\}$")
+_PATH_TOKEN_PATTERN = re.compile(r"\[(-?\d+)\]|([^.\[\]]+)")
+
+PathPart = Union[str, int]
+
+
+@lru_cache(maxsize=4096)
+def parse_path(key: str) -> Tuple[PathPart, ...]:
+    """
+    ドット区切りのキーをアクセスパスに分割する。
+
+    例: "plan.output.queries[0]" → ("plan", "output", "queries", 0)
+    """
+    return tuple(
+        name if name else int(index)
+        for index, name in _PATH_TOKEN_PATTERN.findall(key)
+    )
+
+
+def top_level_references(text: str) -> Set[str]:
+    """
+    テンプレート文字列が参照している変数のトップレベル名を返す（レンダリング時と同じ規則で解析する）。
+
+    例: "{{step-a.output}} と {{inputs.topic}}" → {"step-a", "inputs"}
+    """
+    names = set()
+    for match in _PLACEHOLDER_PATTERN.finditer(text):
+        path = parse_path(match.group(1))
+        if path and isinstance(path[0], str):
+            names.add(path[0])
+    return names
+
+
+def lookup(data: Any, path: Tuple[PathPart, ...]) -> Any:
+    """アクセスパスを辿って値を取得する。途中で見つからない場合は None を返す。"""
+    current = data
+    for part in path:
+        if isinstance(part, int):
+            if not isinstance(current, (list, tuple)) or not -len(current) <= part < len(current):
+                return None
+            current = current[part]
+        elif isinstance(current, Mapping):
+            current = current.get(part)
+        else:
+            return None
+
+        if current is None:
+            return None
+    return current
+
+
+class Template:
+    """
+    コンパイル済みテンプレート。
+
+    固定テキストと (アクセスパス, 元のプレースホルダ文字列) の列を保持する。
+    値が見つからないプレースホルダは元の文字列のまま残す。
+    """
+
+    __slots__ = ("source", "is_static", "_parts", "_full_path")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: list = []
+        pos = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(source):
+            if match.start() > pos:
+                parts.append(source[pos:match.start()])
+            parts.append((parse_path(match.group(1)), match.group(0)))
+            pos = match.end()
+        if pos < len(source):
+            parts.append(source[pos:])
+
+        self._parts = tuple(parts)
+        self.is_static = all(isinstance(p, str) for p in parts)
+        # 文字列全体が単一の変数参照の場合は型を保ったまま値を返せるようにする
+        full = _FULL_PATTERN.match(source)
+        self._full_path = parse_path(full.group(1)) if full else None
+
+    def render(self, data: Mapping) -> str:
+        """変数を文字列として埋め込んだ結果を返す。"""
+        if self.is_static:
+            return self.source
+        out = []
+        for part in self._parts:
+            if isinstance(part, str):
+                out.append(part)
+            else:
+                value = lookup(data, part[0])
+                out.append(str(value) if value is not None else part[1])
+        return "".join(out)
+
+    def resolve(self, data: Mapping) -> Any:
+        """
+        文字列全体が変数参照のみの場合は型を維持して返し、それ以外は render() と同じ結果を返す。
+
+        "{{inputs.value}}" -> int(10) のように
+        """
+        if self._full_path is not None:
+            value = lookup(data, self._full_path)
+            return value if value is not None else self.source
+        return self.render(data)
+
+
+@lru_cache(maxsize=2048)
+def compile_template(text: str) -> Template:
+    """テンプレート文字列をコンパイルする（同じ文字列は再解析しない）。"""
+    return Template(text)
+
+
+class CompiledValue:
+    """
+    パラメータ等の入れ子構造（dict / list / str）をコンパイルしたもの。
+
+    テンプレートを含まない値は解決時にそのまま返し、テンプレート部分だけを評価する。
+    """
+
+    __slots__ = ("_resolve",)
+
+    def __init__(self, value: Any):
+        self._resolve = _compile_value(value)
+
+    def resolve(self, data: Mapping) -> Any:
+        return self._resolve(data)
+
+
+def _compile_value(value: Any) -> Callable[[Mapping], Any]:
+    if isinstance(value, str):
+        template = compile_template(value)
+        if template.is_static:
+            return lambda data: value
+        return template.resolve
+    if isinstance(value, dict):
+        entries = [(k, _compile_value(v)) for k, v in value.items()]
+        return lambda data: {k: resolve(data) for k, resolve in entries}
+    if isinstance(value, list):
+        elements = [_compile_value(v) for v in value]
+        return lambda data: [resolve(data) for resolve in elements]
+    return lambda data: value
@@ -3,23 +3,42 @@
 
 triggers/配下のYAMLを読み込み、cronスケジュールやSlack/Webhookイベントに
 応じてワークフローを自動実行する。
+
+トリガー定義とワークフローは起動時にまとめて読み込み（GraphExecutor まで生成）、名前で索引する。
+スケジューラー稼働中は triggers/ と workflows/ を定期的に確認し、変更のあったトリガーのジョブだけを
+登録し直す（ワークフローのみ変更された場合は GraphExecutor を作り直すだけでスケジュールは変えない）。
 """
 
 from __future__ import annotations
 
 import logging
+import os
 import threading
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import yaml
 
-from ..schemas.trigger import TriggerDefinition
-from .loader import WorkflowLoader
+from ..schemas.trigger import CronTriggerConfig, TriggerDefinition
+from ..schemas.workflow import WorkflowDefinition
 from .executor import GraphExecutor
+from .registry import get_registry
 
 logger = logging.getLogger(__name__)
 
+_WATCH_JOB_ID = "__trigger_watcher__"
+
+
+class _TriggerFile:
+    """triggers/ 配下の1ファイル分の読み込み状態"""
+
+    __slots__ = ("mtime_ns", "size", "trigger")
+
+    def __init__(self) -> None:
+        self.mtime_ns = -1
+        self.size = -1
+        self.trigger: Optional[TriggerDefinition] = None
+
 
 class TriggerRunner:
     """
@@ -43,6 +62,8 @@ class TriggerRunner:
         skills: List[Any],
         on_workflow_start: Optional[Callable[[str, str], None]] = None,
         on_workflow_end: Optional[Callable[[str, str, Any], None]] = None,
+        max_workers: Optional[int] = None,
+        watch_interval: Optional[float] = None,
     ) -> None:
         """
         Args:
@@ -52,32 +73,110 @@ class TriggerRunner:
             skills: 利用可能なスキルのリスト
             on_workflow_start: ワークフロー開始時コールバック(trigger_name, workflow_name)
             on_workflow_end: ワークフロー終了時コールバック(trigger_name, workflow_name, result)
+            max_workers: cronトリガーを同時に実行するスレッド数（省略時は環境変数 TRIGGER_WORKERS、デフォルト10）
+            watch_interval: triggers/ と workflows/ の変更を確認する間隔（秒）。
+                省略時は環境変数 TRIGGER_WATCH_INTERVAL（デフォルト5）。0 の場合は確認しない
         """
         self._triggers_dir = triggers_dir
         self._workflows_dir = workflows_dir
+        self._registry = get_registry(workflows_dir)
         self._llm_client = llm_client
         self._skills = skills
         self._on_workflow_start = on_workflow_start
         self._on_workflow_end = on_workflow_end
-        self._cron_threads: List[threading.Timer] = []
+        self._max_workers = max_workers or int(os.getenv("TRIGGER_WORKERS", "10"))
+        if watch_interval is None:
+            watch_interval = float(os.getenv("TRIGGER_WATCH_INTERVAL", "5"))
+        self._watch_interval = watch_interval
+        self._files: Dict[Path, _TriggerFile] = {}
+        self._triggers: Dict[str, TriggerDefinition] = {}
+        # トリガー名 → (生成に使ったワークフロー定義, GraphExecutor)
+        self._executors: Dict[str, Tuple[WorkflowDefinition, GraphExecutor]] = {}
+        self._lock = threading.RLock()
+        self._scheduler: Any = None
         self._running = False
 
     def load_triggers(self) -> List[TriggerDefinition]:
-        """triggers/配下の全YAMLファイルを読み込む。"""
-        triggers = []
-        if not self._triggers_dir.exists():
-            return triggers
-        for path in sorted(self._triggers_dir.glob("*.yaml")):
+        """triggers/配下の有効なトリガーを返す（変更のあったYAMLファイルのみ読み込み直す）。"""
+        self.refresh_triggers()
+        with self._lock:
+            return list(self._triggers.values())
+
+    def refresh_triggers(self) -> Set[str]:
+        """
+        triggers/ を走査し、更新日時・サイズが変わったファイルのみ読み込み直す。
+
+        Returns:
+            追加・変更・削除されたトリガー名
+        """
+        with self._lock:
+            paths = set(self._triggers_dir.glob("*.yaml")) if self._triggers_dir.exists() else set()
+            changed: Set[str] = set()
+            for path in sorted(paths):
+                entry = self._files.setdefault(path, _TriggerFile())
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+                    continue
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                previous = entry.trigger
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        data = yaml.safe_load(f)
+                    entry.trigger = TriggerDefinition(**data)
+                    logger.info(f"トリガー読み込み: {entry.trigger.name} ({path.name})")
+                except Exception as e:
+                    entry.trigger = None
+                    logger.error(f"トリガー読み込みエラー {path.name}: {e}")
+                if entry.trigger != previous:
+                    changed.update(t.name for t in (previous, entry.trigger) if t is not None)
+            for path in set(self._files) - paths:
+                removed = self._files.pop(path)
+                if removed.trigger is not None:
+                    changed.add(removed.trigger.name)
+
+            if changed or not self._triggers:
+                triggers: Dict[str, TriggerDefinition] = {}
+                for path in sorted(self._files):
+                    trigger = self._files[path].trigger
+                    if trigger is not None and trigger.enabled:
+                        triggers.setdefault(trigger.name, trigger)
+                self._triggers = triggers
+                for name in changed:
+                    self._executors.pop(name, None)
+            return changed
+
+    def get_trigger(self, trigger_name: str) -> Optional[TriggerDefinition]:
+        """名前から有効なトリガーを返す（見つからなければNone）"""
+        with self._lock:
+            return self._triggers.get(trigger_name)
+
+    def compile(self) -> None:
+        """
+        全トリガーとそのワークフローを読み込み、GraphExecutor を事前に生成する。
+
+        ワークフローの読み込みに失敗したトリガーはログを出してスキップする（実行時に改めてエラーになる）。
+        """
+        self.refresh_triggers()
+        self._registry.refresh(force=True)
+        for trigger in self.load_triggers():
             try:
-                with open(path, encoding="utf-8") as f:
-                    data = yaml.safe_load(f)
-                trigger = TriggerDefinition(**data)
-                if trigger.enabled:
-                    triggers.append(trigger)
-                    logger.info(f"トリガー読み込み: {trigger.name} ({path.name})")
-            except Exception as e:
-                logger.error(f"トリガー読み込みエラー {path.name}: {e}")
-        return triggers
+                self._executor(trigger)
+            except (ValueError, FileNotFoundError) as e:
+                logger.error(f"トリガー '{trigger.name}' のワークフローを読み込めません: {e}")
+
+    def _executor(self, trigger: TriggerDefinition) -> GraphExecutor:
+        with self._lock:
+            cached = self._executors.get(trigger.name)
+        if cached is not None:
+            return cached[1]
+        workflow = self._registry.get(trigger.workflow)
+        executor = GraphExecutor(workflow, self._skills, self._llm_client)
+        with self._lock:
+            self._executors[trigger.name] = (workflow, executor)
+        return executor
 
     def run_workflow(self, trigger: TriggerDefinition) -> Any:
         """
@@ -89,16 +188,12 @@ class TriggerRunner:
         Returns:
             ワークフロー実行結果
         """
-        workflow_path = self._workflows_dir / f"{trigger.workflow}.yaml"
-        if not workflow_path.exists():
-            raise FileNotFoundError(f"ワークフローが見つかりません: {workflow_path}")
-
-        workflow = WorkflowLoader.load(workflow_path)
+        # 事前に生成した GraphExecutor を使う（ワークフローの変更は監視ジョブが反映する）
+        executor = self._executor(trigger)
 
         if self._on_workflow_start:
             self._on_workflow_start(trigger.name, trigger.workflow)
 
-        executor = GraphExecutor(workflow, self._skills, self._llm_client)
         result = executor.execute(trigger.inputs)
 
         if self._on_workflow_end:
@@ -110,10 +205,14 @@ class TriggerRunner:
         """
         cronトリガーをバックグラウンドスレッドで開始する。
         apschedulerが利用可能な場合はそれを使用し、なければ警告を出す。
+
+        ワークフローは max_workers 個のスレッドプールで実行する（LLMクライアント等を共有するため
+        プロセスプールは使わない）。トリガーごとの max_instances / coalesce / misfire_grace_time / jitter は
+        YAMLの trigger 設定で指定する。
         """
         try:
+            from apscheduler.executors.pool import ThreadPoolExecutor
             from apscheduler.schedulers.background import BackgroundScheduler
-            from apscheduler.triggers.cron import CronTrigger as APCronTrigger
         except ImportError:
             logger.warning(
                 "apschedulerがインストールされていません。"
@@ -121,46 +220,111 @@ class TriggerRunner:
             )
             return
 
-        triggers = self.load_triggers()
-        cron_triggers = [t for t in triggers if t.trigger.get("type") == "cron"]
+        self.compile()
+        cron_triggers = [t for t in self.load_triggers() if t.trigger.get("type") == "cron"]
 
         if not cron_triggers:
             logger.info("cronトリガーが定義されていません。")
             return
 
-        scheduler = BackgroundScheduler()
+        scheduler = BackgroundScheduler(executors={"default": ThreadPoolExecutor(self._max_workers)})
+        self._scheduler = scheduler
         for trigger in cron_triggers:
-            schedule = trigger.trigger.get("schedule")
-            if not schedule:
-                continue
-            # cron式をパース（分 時 日 月 曜日）
-            parts = schedule.split()
-            if len(parts) != 5:
-                logger.error(f"無効なcron式: {schedule} (トリガー: {trigger.name})")
-                continue
-
-            minute, hour, day, month, day_of_week = parts
+            self._schedule(trigger)
+        if self._watch_interval > 0:
             scheduler.add_job(
-                func=self.run_workflow,
-                trigger=APCronTrigger(
-                    minute=minute,
-                    hour=hour,
-                    day=day,
-                    month=month,
-                    day_of_week=day_of_week,
-                ),
-                args=[trigger],
-                id=trigger.name,
-                name=trigger.name,
-                replace_existing=True,
+                func=self.watch,
+                trigger="interval",
+                seconds=self._watch_interval,
+                id=_WATCH_JOB_ID,
+                name="trigger watcher",
+                max_instances=1,
+                coalesce=True,
             )
-            logger.info(f"cronスケジュール登録: {trigger.name} ({schedule})")
 
         scheduler.start()
         self._running = True
         logger.info(f"{len(cron_triggers)}件のcronトリガーを開始しました。")
         return scheduler
 
+    def _schedule(self, trigger: TriggerDefinition) -> bool:
+        """cronトリガーをスケジューラーに登録する（同名のジョブは置き換える）"""
+        from apscheduler.triggers.cron import CronTrigger as APCronTrigger
+
+        try:
+            config = CronTriggerConfig(**trigger.trigger)
+        except Exception as e:
+            logger.error(f"無効なcron設定 (トリガー: {trigger.name}): {e}")
+            return False
+        schedule = config.schedule
+        # cron式をパース（分 時 日 月 曜日）
+        parts = schedule.split()
+        if len(parts) != 5:
+            logger.error(f"無効なcron式: {schedule} (トリガー: {trigger.name})")
+            return False
+
+        minute, hour, day, month, day_of_week = parts
+        self._scheduler.add_job(
+            func=self.run_workflow,
+            trigger=APCronTrigger(
+                minute=minute,
+                hour=hour,
+                day=day,
+                month=month,
+                day_of_week=day_of_week,
+                jitter=config.jitter,
+            ),
+            args=[trigger],
+            id=trigger.name,
+            name=trigger.name,
+            replace_existing=True,
+            max_instances=config.max_instances,
+            coalesce=config.coalesce,
+            misfire_grace_time=config.misfire_grace_time,
+        )
+        logger.info(f"cronスケジュール登録: {trigger.name} ({schedule})")
+        return True
+
+    def watch(self) -> Set[str]:
+        """
+        triggers/ と workflows/ の変更を反映する（スケジューラーの監視ジョブから定期的に呼ばれる）。
+
+        定義が変更されたトリガーのジョブのみ登録し直す。ワークフローだけが変更されたトリガーは
+        GraphExecutor を作り直すのみで、ジョブ（次回実行時刻・jitter）はそのまま残す。
+
+        Returns:
+            反映したトリガー名（ジョブを登録し直したものと GraphExecutor を作り直したものの両方）
+        """
+        changed = self.refresh_triggers()
+        self._registry.refresh(force=True)
+        rebuild: Set[str] = set()
+        with self._lock:
+            for name, (workflow, _) in list(self._executors.items()):
+                trigger = self._triggers.get(name)
+                entry = self._registry.find(trigger.workflow) if trigger is not None else None
+                if entry is None or entry.definition is not workflow:
+                    del self._executors[name]
+                    rebuild.add(name)
+        rebuild -= changed
+
+        for name in sorted(changed):
+            trigger = self.get_trigger(name)
+            if self._scheduler is not None:
+                is_cron = trigger is not None and trigger.trigger.get("type") == "cron"
+                if not is_cron or not self._schedule(trigger):
+                    if self._scheduler.get_job(name) is not None:
+                        self._scheduler.remove_job(name)
+                        logger.info(f"cronスケジュール解除: {name}")
+
+        for name in sorted(changed | rebuild):
+            trigger = self.get_trigger(name)
+            if trigger is not None:
+                try:
+                    self._executor(trigger)
+                except (ValueError, FileNotFoundError) as e:
+                    logger.error(f"トリガー '{name}' のワークフローを読み込めません: {e}")
+        return changed | rebuild
+
     def run_once(self, trigger_name: str) -> Any:
         """
         指定名のトリガーを即時1回実行する（テスト・手動実行用）。
@@ -171,9 +335,9 @@ class TriggerRunner:
         Returns:
             ワークフロー実行結果
         """
-        triggers = self.load_triggers()
-        for trigger in triggers:
-            if trigger.name == trigger_name:
-                logger.info(f"手動実行: {trigger_name}")
-                return self.run_workflow(trigger)
-        raise ValueError(f"トリガーが見つかりません: {trigger_name}")
+        self.refresh_triggers()
+        trigger = self.get_trigger(trigger_name)
+        if trigger is None:
+            raise ValueError(f"トリガーが見つかりません: {trigger_name}")
+        logger.info(f"手動実行: {trigger_name}")
+        return self.run_workflow(trigger)
@@ -0,0 +1,368 @@
+"""
+Webhookサーバー用のジョブキュー。
+
+受け付けたワークフロー実行を上限付きのキューに積み、N個のワーカーで順に処理する。
+同時に実行されるワークフロー（＝LLM呼び出し）の数を workers 以下に抑え、
+キューが満杯の場合は QueueFullError を送出する（Webhookでは429 + Retry-After を返す）。
+
+重複リクエストの抑制:
+- ワークフロー名と入力（キーをソートしたJSON）が同じジョブが実行待ち・実行中の場合は、
+  新しいジョブを作らずそのジョブを返す（single-flight）
+- idempotency_key を指定した場合は、idempotency_ttl 秒の間は同じキーに対して同じジョブを返す
+  （完了済みの場合はその結果。失敗したジョブは再実行できるよう記録しない）。
+  同じキーが別のワークフロー・入力で使われた場合は IdempotencyKeyConflictError を送出する
+
+進捗イベント:
+- ハンドラー内では current_job からジョブを参照でき、Job.emit() で進捗イベントを発行する
+  （別スレッドから呼んでもよい）。Job.events() で途中から購読しても過去のイベントから受け取れる
+- 完了したジョブの履歴からは token イベントを削除する（ノード単位・完了のイベントのみ保持する）
+
+使用例:
+    queue = JobQueue(handler=run_workflow, workers=4, maxsize=100)
+    job = queue.submit("deep_research", {"topic": "..."})   # イベントループ上で呼ぶ
+    await queue.wait(job)
+    print(job.status, job.result)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .engine.cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# ワーカーが実行中のジョブ（ハンドラー内から進捗イベントを発行するために参照する）
+current_job: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+
+# 完了時間の実績がない場合に Retry-After の計算に使う1ジョブあたりの所要時間（秒）
+_DEFAULT_JOB_SECONDS = 5.0
+
+
+class QueueFullError(RuntimeError):
+    """キューが満杯でジョブを受け付けられない"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"ジョブキューが満杯です。{retry_after}秒後に再試行してください。")
+        self.retry_after = retry_after
+
+
+class IdempotencyKeyConflictError(ValueError):
+    """同じ idempotency_key が別のワークフロー・入力で使われた"""
+
+    def __init__(self, idempotency_key: str):
+        super().__init__(
+            f"Idempotency-Key '{idempotency_key}' は別のワークフローまたは入力で既に使われています。"
+        )
+        self.idempotency_key = idempotency_key
+
+
+class Job:
+    """キューに投入された1件のワークフロー実行"""
+
+    __slots__ = (
+        "id", "workflow", "inputs", "key", "requests", "status", "result", "error",
+        "created_at", "started_at", "finished_at", "_done", "_loop", "_events", "_subscribers",
+    )
+
+    def __init__(self, workflow: str, inputs: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.workflow = workflow
+        self.inputs = inputs
+        # 同一リクエストの判定に使うキー（ワークフロー名 + 正規化した入力）
+        self.key = make_cache_key(workflow, inputs)
+        # このジョブに割り当てられたリクエスト数（重複リクエストが合流すると増える）
+        self.requests = 1
+        self.status = "queued"  # queued / running / completed / failed
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "workflow": self.workflow,
+            "status": self.status,
+            "requests": self.requests,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """
+        進捗イベントを発行する（スレッドセーフ）
+
+        イベントループ以外のスレッドから呼ばれた場合はループ上で発行し直す。
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._publish(event, data)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._publish, event, data)
+
+    def _publish(self, event: str, data: Dict[str, Any]) -> None:
+        if event in ("completed", "failed"):
+            # 完了後は保持期間中のメモリを抑えるため token を捨てる（全文は node_end の output にある）
+            self._events = [e for e in self._events if e[0] != "token"]
+        self._events.append((event, data))
+        for queue in self._subscribers:
+            queue.put_nowait((event, data))
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """発行済みのイベントから順に、ジョブの完了（completed / failed イベント）まで返す"""
+        queue: asyncio.Queue = asyncio.Queue()
+        history = list(self._events)
+        self._subscribers.append(queue)
+        try:
+            for event, data in history:
+                yield event, data
+                if event in ("completed", "failed"):
+                    return
+            if self.finished and not history:
+                return
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event in ("completed", "failed"):
+                    return
+        finally:
+            self._subscribers.remove(queue)
+
+
+class JobQueue:
+    """
+    上限付きキューと固定数のワーカーによるジョブ実行
+
+    キューとワーカーは最初に submit() されたイベントループ上に生成する。
+    完了したジョブは max_finished 件まで保持し、古いものから破棄する。
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        workers: int = 4,
+        maxsize: int = 100,
+        max_finished: int = 1000,
+        idempotency_ttl: float = 86400,
+    ):
+        """
+        Args:
+            handler: (ワークフロー名, 入力) を受け取り結果を返すコルーチン関数
+            workers: 同時に実行するジョブの最大数
+            maxsize: 実行待ちのジョブの最大数
+            max_finished: 結果を保持する完了済みジョブの最大数
+            idempotency_ttl: idempotency_key に対応するジョブ（結果）を保持する秒数
+        """
+        if workers < 1:
+            raise ValueError("workers は1以上を指定してください")
+        if maxsize < 1:
+            raise ValueError("maxsize は1以上を指定してください")
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.max_finished = max_finished
+        self.idempotency_ttl = idempotency_ttl
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._inflight: Dict[str, Job] = {}
+        # idempotency_key → (有効期限, ジョブのキー（ワークフロー・入力のハッシュ）, ジョブ)
+        self._idempotency: Dict[str, Tuple[float, str, Job]] = {}
+        self.coalesced = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = 0
+        self._avg_seconds: Optional[float] = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        """現在のイベントループ上でキューとワーカーを用意する"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._running = 0
+            # 以前のループで積まれた未完了のジョブには合流させない
+            self._inflight.clear()
+            self._idempotency = {k: v for k, v in self._idempotency.items() if v[2].finished}
+            self._tasks = [loop.create_task(self._worker(i)) for i in range(self.workers)]
+        return self._queue
+
+    def submit(self, workflow: str, inputs: Dict[str, Any], idempotency_key: Optional[str] = None) -> Job:
+        """
+        ジョブをキューに積む（イベントループ上で呼ぶ）
+
+        同一のジョブが実行待ち・実行中の場合、または idempotency_key に対応するジョブがある場合は
+        キューに積まずにそのジョブを返す（Job.requests が増える）。
+
+        Raises:
+            QueueFullError: 実行待ちのジョブが maxsize に達している場合
+            IdempotencyKeyConflictError: idempotency_key が別のワークフロー・入力で使われている場合
+        """
+        queue = self._ensure_started()
+        existing = self._find_existing(make_cache_key(workflow, inputs), idempotency_key)
+        if existing is not None:
+            existing.requests += 1
+            self.coalesced += 1
+            # キーなしで投入された実行中のジョブに合流した場合も、完了後の再送を同じジョブに返すため記録する
+            self._remember(idempotency_key, existing)
+            return existing
+
+        job = Job(workflow, inputs)
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.retry_after())
+        self._jobs[job.id] = job
+        self._inflight[job.key] = job
+        self._remember(idempotency_key, job)
+        self._prune()
+        return job
+
+    def _remember(self, idempotency_key: Optional[str], job: Job) -> None:
+        if idempotency_key and idempotency_key not in self._idempotency:
+            self._idempotency[idempotency_key] = (time.monotonic() + self.idempotency_ttl, job.key, job)
+
+    def _find_existing(self, key: str, idempotency_key: Optional[str]) -> Optional[Job]:
+        if idempotency_key:
+            now = time.monotonic()
+            for k in [k for k, (expires_at, _, _) in self._idempotency.items() if expires_at <= now]:
+                del self._idempotency[k]
+            entry = self._idempotency.get(idempotency_key)
+            if entry is not None:
+                _, job_key, job = entry
+                if job_key != key:
+                    raise IdempotencyKeyConflictError(idempotency_key)
+                return job
+        job = self._inflight.get(key)
+        if job is not None and not job.finished:
+            return job
+        return None
+
+    async def wait(self, job: Job) -> Job:
+        """ジョブの完了を待つ"""
+        await job._done.wait()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def retry_after(self) -> int:
+        """キューが空くまでのおおよその秒数（平均所要時間 × 待ち件数 / ワーカー数）"""
+        pending = self._queue.qsize() if self._queue is not None else 0
+        per_job = self._avg_seconds or _DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(per_job * max(pending, 1) / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "maxsize": self.maxsize,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            "coalesced": self.coalesced,
+        }
+
+    async def stop(self) -> None:
+        """ワーカーを停止する（実行中のジョブはキャンセルされる）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._queue = None
+        self._inflight.clear()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    async def _worker(self, index: int) -> None:
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            job._loop = asyncio.get_running_loop()
+            job.emit("started", {"job_id": job.id, "workflow": job.workflow})
+            token = current_job.set(job)
+            try:
+                job.result = await self.handler(job.workflow, job.inputs)
+                job.status = "completed"
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"ジョブ {job.id} ({job.workflow}) が失敗しました: {e}")
+                job.status, job.error = "failed", str(e)
+            finally:
+                current_job.reset(token)
+                if job.status == "completed":
+                    job.emit("completed", {"job_id": job.id, "result": job.result})
+                else:
+                    job.emit("failed", {"job_id": job.id, "error": job.error})
+                job.finished_at = time.time()
+                self._record_duration(job.finished_at - job.started_at)
+                self._running -= 1
+                self._release(job)
+                job._done.set()
+                queue.task_done()
+
+    def _release(self, job: Job) -> None:
+        """完了したジョブを実行中の一覧から外す（失敗したジョブは冪等キーからも外す）"""
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        if job.status == "failed":
+            for k in [k for k, (_, _, j) in self._idempotency.items() if j is job]:
+                del self._idempotency[k]
+
+    def _record_duration(self, seconds: float) -> None:
+        # 直近のジョブを重視した移動平均
+        if self._avg_seconds is None:
+            self._avg_seconds = seconds
+        else:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+
+
+def create_job_queue_from_env(handler: JobHandler) -> JobQueue:
+    """
+    環境変数からジョブキューを作成する
+
+    - WEBHOOK_WORKERS: 同時に実行するワークフローの最大数（デフォルト: 4）
+    - WEBHOOK_QUEUE_SIZE: 実行待ちのジョブの最大数（デフォルト: 100）
+    - WEBHOOK_IDEMPOTENCY_TTL: Idempotency-Key の結果を保持する秒数（デフォルト: 86400）
+    """
+    return JobQueue(
+        handler,
+        workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+        maxsize=int(os.getenv("WEBHOOK_QUEUE_SIZE", "100")),
+        idempotency_ttl=float(os.getenv("WEBHOOK_IDEMPOTENCY_TTL", "86400")),
+    )
@@ -0,0 +1,164 @@
+"""
+サーバー用の共有ランタイム。
+
+Webhookサーバーなど長時間動作するプロセスで、リクエストごとに作り直していた
+LLMクライアント（HTTP接続プール）・スキルのインスタンス・ワークフロー定義・GraphExecutor を
+起動時に一度だけ用意し、全リクエストで共有する。
+
+使用例:
+    runtime = Runtime(Path("workflows"))
+    runtime.warm_up()                       # 起動時（バックグラウンド）に実行
+    executor = runtime.executor("deep_research")
+    result = await executor.aexecute(inputs)
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .core.llm import LLMClient
+from .engine.executor import GraphExecutor
+from .engine.registry import WorkflowRegistry, get_registry
+from .schemas.workflow import WorkflowDefinition
+from .skills import get_skill_registry
+from .skills.base import BaseSkill
+
+logger = logging.getLogger(__name__)
+
+
+def _skill_names(workflow: WorkflowDefinition) -> Set[str]:
+    """ワークフローで使用するスキル名を返す（foreach / parallel の子ノードを含む）"""
+    names = set()
+    for node in workflow.nodes:
+        for definition in (node, node.node):
+            if definition is not None and definition.type == "skill" and definition.skill:
+                names.add(definition.skill)
+    return names
+
+
+def _chain(first: Optional[Callable[..., None]], second: Callable[..., None]) -> Callable[..., None]:
+    if first is None:
+        return second
+
+    def chained(*args: Any) -> None:
+        first(*args)
+        second(*args)
+
+    return chained
+
+
+class Runtime:
+    """
+    プロセス内で共有する実行時リソース
+
+    - llm: 接続プールを共有する LLMClient（同期・非同期クライアントとも使い回す）
+    - skills: スキルレジストリ（インスタンスは一度だけ生成する）
+    - workflows: パース済みのワークフロー定義（ファイル更新時のみ再読み込み）
+    - executor(): ワークフローごとにキャッシュした GraphExecutor（定義が更新されたら作り直す）
+    """
+
+    def __init__(
+        self,
+        workflows_dir: Path,
+        llm_client: Optional[LLMClient] = None,
+        skills: Optional[Mapping[str, BaseSkill]] = None,
+        workflows: Optional[WorkflowRegistry] = None,
+        callbacks: Optional[Callable[[str], Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Args:
+            workflows_dir: workflows/ ディレクトリのパス
+            llm_client: 共有するLLMクライアント（省略時は初回利用時に生成）
+            skills: スキルのマッピング（省略時はプロセス共有のスキルレジストリ）
+            workflows: ワークフローレジストリ（省略時は workflows_dir の共有レジストリ）
+            callbacks: ワークフロー名を受け取り、GraphExecutor に渡すコールバック
+                （on_node_start など）の辞書を返す関数
+        """
+        self.workflows = workflows or get_registry(workflows_dir)
+        self.skills = skills if skills is not None else get_skill_registry()
+        self._llm = llm_client
+        self._callbacks = callbacks
+        self._executors: Dict[str, Tuple[WorkflowDefinition, GraphExecutor]] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    @property
+    def llm(self) -> LLMClient:
+        with self._lock:
+            if self._llm is None:
+                self._llm = LLMClient()
+            return self._llm
+
+    @property
+    def ready(self) -> bool:
+        """warm_up() が完了しているか"""
+        return self._ready.is_set()
+
+    def executor(self, workflow_name: str, **callbacks: Callable[..., None]) -> GraphExecutor:
+        """
+        ワークフローの GraphExecutor を返す（同じ定義に対しては同じインスタンスを再利用する）
+
+        GraphExecutor は実行ごとに新しいコンテキストを使うため、同時実行で共有しても問題ない。
+        callbacks（on_node_start など。同期関数のみ）を指定した場合は、共有インスタンスの浅いコピーに
+        既定のコールバックに続けて呼ばれるよう追加して返す（1回の実行専用）。
+        """
+        executor = self._shared_executor(workflow_name)
+        if not callbacks:
+            return executor
+        executor = copy.copy(executor)
+        for name, callback in callbacks.items():
+            setattr(executor, name, _chain(getattr(executor, name), callback))
+        return executor
+
+    def _shared_executor(self, workflow_name: str) -> GraphExecutor:
+        workflow = self.workflows.get(workflow_name)
+        with self._lock:
+            cached = self._executors.get(workflow_name)
+            if cached is not None and cached[0] is workflow:
+                return cached[1]
+        callbacks = self._callbacks(workflow_name) if self._callbacks else {}
+        executor = GraphExecutor(workflow, self.skills, self.llm, **callbacks)
+        with self._lock:
+            self._executors[workflow_name] = (workflow, executor)
+        return executor
+
+    def warm_up(self) -> None:
+        """
+        LLMクライアント・ワークフローで使うスキル・GraphExecutor を事前に生成する
+
+        各準備に失敗してもログ（スタックトレース付き）を出して残りの準備を続け、最後に ready にする
+        （失敗したものは初回リクエスト時に改めて生成を試みる）。
+        """
+        try:
+            # 非同期クライアント（接続プール）も先に作っておく
+            self.llm.warm_up()
+        except Exception:
+            logger.exception("LLMクライアントの準備に失敗しました")
+
+        try:
+            workflows = self.workflows.workflows()
+        except Exception:
+            logger.exception("ワークフロー定義の読み込みに失敗しました")
+            workflows = []
+
+        for path, workflow in workflows:
+            for name in sorted(_skill_names(workflow)):
+                if name not in self.skills:
+                    logger.warning(f"[{path.name}] 未登録のスキル: {name}")
+                    continue
+                try:
+                    self.skills[name]
+                except Exception:
+                    logger.exception(f"スキルの初期化に失敗しました {name}")
+            try:
+                self.executor(path.stem)
+            except Exception:
+                logger.exception(f"GraphExecutorの準備に失敗しました {path.name}")
+
+        self._ready.set()
+        logger.info("ランタイムのウォームアップが完了しました。")
@@ -0,0 +1,70 @@
+"""
+LLMバックエンド（OpenAI互換エンドポイント）定義のスキーマ。
+
+環境変数 LLM_BACKENDS で指定したYAMLファイルを読み込むためのPydanticモデル。
+
+例:
+    endpoints:
+      - name: openai-primary
+        api_key_env: OPENAI_API_KEY
+      - name: openai-secondary
+        api_key_env: OPENAI_API_KEY_2
+        models: [gpt-4o, gpt-4o-mini]
+      - name: local-vllm
+        base_url: http://localhost:8000/v1
+        api_key: dummy
+        models:
+          gpt-4o-mini: Qwen/Qwen2.5-7B-Instruct
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class EndpointConfig(BaseModel):
+    """OpenAI互換エンドポイント1つ分の設定。"""
+
+    name: str = Field(..., description="エンドポイント名（ログ・統計の表示に使う）")
+    base_url: Optional[str] = Field(None, description="APIのベースURL（省略時は OpenAI の既定値）")
+    api_key: Optional[str] = Field(None, description="APIキー（api_key_env より優先）")
+    api_key_env: Optional[str] = Field(None, description="APIキーを読み込む環境変数名")
+    models: Optional[Union[List[str], Dict[str, str]]] = Field(
+        None,
+        description="扱うモデル名のリスト。辞書の場合は ワークフローでのモデル名 → このエンドポイントでのモデル名。"
+        "省略時は全モデルをそのままの名前で扱う",
+    )
+    timeout: float = Field(60.0, gt=0, description="リクエストのタイムアウト（秒）")
+
+    def resolve_api_key(self) -> Optional[str]:
+        if self.api_key:
+            return self.api_key
+        return os.getenv(self.api_key_env) if self.api_key_env else None
+
+    def served_model(self, model: str) -> Optional[str]:
+        """モデルを扱う場合はこのエンドポイントでのモデル名を、扱わない場合はNoneを返す"""
+        if self.models is None:
+            return model
+        if isinstance(self.models, dict):
+            return self.models.get(model)
+        return model if model in self.models else None
+
+
+class BackendsConfig(BaseModel):
+    """LLMバックエンドプール全体の設定。"""
+
+    endpoints: List[EndpointConfig] = Field(..., min_length=1)
+    cooldown: float = Field(30.0, ge=0, description="失敗したエンドポイントを後回しにする時間（秒。連続失敗ごとに2倍）")
+    explore: float = Field(
+        0.05, ge=0, le=1, description="最速以外のエンドポイントを試す確率（遅延の計測値を更新し続けるため）"
+    )
+
+    @model_validator(mode="after")
+    def _unique_names(self) -> "BackendsConfig":
+        names = [e.name for e in self.endpoints]
+        if len(names) != len(set(names)):
+            raise ValueError(f"エンドポイント名が重複しています: {names}")
+        return self
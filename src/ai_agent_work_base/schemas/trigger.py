@@ -16,6 +16,14 @@ class CronTriggerConfig(BaseModel):
 
     type: Literal["cron"]
     schedule: str = Field(..., description="cron式 (例: '0 7 * * *' = 毎朝7時)")
+    max_instances: int = Field(1, ge=1, description="同時に実行できる数（前回の実行が終わっていない場合はスキップ）")
+    coalesce: bool = Field(True, description="停止中などで実行しそびれた回をまとめて1回だけ実行する")
+    misfire_grace_time: Optional[int] = Field(
+        300, ge=1, description="予定時刻から遅れても実行する猶予（秒）。nullの場合は無制限"
+    )
+    jitter: Optional[int] = Field(
+        None, ge=1, description="実行時刻を最大この秒数だけランダムに遅らせる（同時刻のトリガーを分散させる）"
+    )
 
 
 class SlackTriggerConfig(BaseModel):
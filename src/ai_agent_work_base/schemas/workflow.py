@@ -6,6 +6,10 @@ class InputDefinition(BaseModel):
     type: str
     description: Optional[str] = None
 
+class NodeCacheConfig(BaseModel):
+    """ノード実行結果キャッシュの設定（副作用のないノードでのみ有効）"""
+    ttl: Optional[float] = Field(None, gt=0)  # キャッシュの有効期限（秒）。省略時は無期限
+
 class InlineNodeDefinition(BaseModel):
     """foreachノード内で使用するインラインノード定義（idなし）"""
     type: Literal["llm", "skill"]
@@ -16,7 +20,7 @@ class InlineNodeDefinition(BaseModel):
 
 class NodeDefinition(BaseModel):
     id: str
-    type: Literal["llm", "skill", "condition", "foreach", "end"]
+    type: Literal["llm", "skill", "condition", "foreach", "parallel", "end"]
     name: Optional[str] = None
     next: Optional[str] = None
     
@@ -31,10 +35,20 @@ class NodeDefinition(BaseModel):
     
     # Condition Node specific
     branches: Optional[Dict[str, str]] = None # value -> next_node_id
+    # 判定の確定前に分岐先の最初のノード（副作用なしのもの）を先行実行する。True: 全ブランチ / リスト: 指定したブランチのみ
+    speculate: Union[bool, List[str]] = False
 
-    # foreach Node specific
+    # foreach / parallel Node specific
     items: Optional[str] = None              # リストを参照するテンプレート変数 e.g. "{{plan.output.queries}}"
     node: Optional[InlineNodeDefinition] = None  # 各要素に対して実行するノード定義
+    concurrency: Optional[int] = Field(None, ge=1)  # 同時実行数の上限（foreachの省略時はExecutorのmax_concurrency）
+
+    # parallel Node specific
+    timeout: Optional[float] = Field(None, gt=0)  # 要素ごとのタイムアウト秒数
+    on_error: Literal["fail_fast", "collect"] = "fail_fast"  # 失敗時に即中断するか、エラーを結果に含めて続行するか
+
+    # llm / skill / foreach / parallel: 同じ入力での再実行時に結果を再利用する
+    cache: Optional[NodeCacheConfig] = None
 
 class WorkflowDefinition(BaseModel):
     name: str
@@ -1,31 +1,33 @@
-from typing import List
+import importlib
+from typing import Any, List
+
 from .base import BaseSkill
-from .basic import EchoSkill, ReverseSkill
-from .file import FileWriteSkill, FileReadSkill
-from .math import CalculatorSkill
-from .research import WebSearchSkill
-from .presentation import SlideGenerationSkill
-from .pptx_generation import PptxGenerationSkill
-from .pptxjs_generation import PptxJsGenerationSkill
-from .slack import SlackNotifySkill
-from .push_notify import PushNotifySkill
-from .email_send import EmailSendSkill
-from .self_debug import SelfDebugSkill
+from .manifest import SKILL_MANIFEST
+from .registry import SkillRegistry, SkillSpec, get_skill_registry
+
+
+# スキルクラス名 → モジュール名（`from ai_agent_work_base.skills import EchoSkill` は参照時にimportする）
+_SKILL_CLASSES = {entry["class"]: entry["module"] for entry in SKILL_MANIFEST.values()}
+
+__all__ = [
+    "BaseSkill",
+    "SKILL_MANIFEST",
+    "SkillRegistry",
+    "SkillSpec",
+    "get_skill_registry",
+    "load_all_skills",
+    *_SKILL_CLASSES,
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _SKILL_CLASSES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__name__}.{module}"), name)
+
 
 def load_all_skills() -> List[BaseSkill]:
-    """全ての利用可能なスキルをインスタンス化して返す"""
-    return [
-        EchoSkill(),
-        ReverseSkill(),
-        FileWriteSkill(),
-        FileReadSkill(),
-        CalculatorSkill(),
-        WebSearchSkill(),
-        SlideGenerationSkill(),
-        PptxGenerationSkill(),
-        PptxJsGenerationSkill(),
-        SlackNotifySkill(),
-        PushNotifySkill(),
-        EmailSendSkill(),
-        SelfDebugSkill(),
-    ]
+    """全ての利用可能なスキルをインスタンス化して返す（共有レジストリのインスタンスを再利用する）"""
+    registry = get_skill_registry()
+    return [registry[name] for name in registry]
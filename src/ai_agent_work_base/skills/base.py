@@ -7,6 +7,10 @@ class BaseSkill(ABC):
     BaseToolと同様だが、概念に合わせて名称変更
     """
 
+    # 外部に副作用を持たない（同じ入力なら結果を再利用してよい）スキルはTrueにする。
+    # ノードの cache 設定はこの値がTrueのスキルでのみ有効になる
+    side_effect_free: bool = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -2,6 +2,8 @@ from typing import Any, Dict
 from .base import BaseSkill
 
 class EchoSkill(BaseSkill):
+    side_effect_free = True
+
     @property
     def name(self) -> str:
         return "echo"
@@ -27,6 +29,8 @@ class EchoSkill(BaseSkill):
         return message
 
 class ReverseSkill(BaseSkill):
+    side_effect_free = True
+
     @property
     def name(self) -> str:
         return "reverse"
@@ -38,6 +38,8 @@ class FileWriteSkill(BaseSkill):
             return f"Error writing to file: {str(e)}"
 
 class FileReadSkill(BaseSkill):
+    side_effect_free = True
+
     @property
     def name(self) -> str:
         return "file_read"
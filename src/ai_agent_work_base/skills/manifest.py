@@ -0,0 +1,315 @@
+"""
+スキルのマニフェスト。
+
+スキルのモジュールをimportせずに名前・説明・パラメータを参照するための一覧。
+SkillRegistry はこの情報だけで一覧表示・存在確認を行い、実際に使われたスキルだけをimportする。
+
+スキルを追加・変更した場合はここも更新すること（tests/test_skill_registry.py で実装との差分を検出する）。
+"""
+
+from typing import Any, Dict
+
+SKILL_MANIFEST: Dict[str, Dict[str, Any]] = {
+    "echo": {
+        "module": "basic",
+        "class": "EchoSkill",
+        "side_effect_free": True,
+        "description": "入力されたメッセージをそのまま返します。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "message": {
+                    "type": "string",
+                    "description": "The message to echo back."
+                }
+            },
+            "required": [
+                "message"
+            ]
+        }
+    },
+    "reverse": {
+        "module": "basic",
+        "class": "ReverseSkill",
+        "side_effect_free": True,
+        "description": "入力された文字列を反転して返します。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "text": {
+                    "type": "string",
+                    "description": "The text to reverse."
+                }
+            },
+            "required": [
+                "text"
+            ]
+        }
+    },
+    "file_write": {
+        "module": "file",
+        "class": "FileWriteSkill",
+        "side_effect_free": False,
+        "description": "指定されたファイルにテキストを書き込みます。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "file_path": {
+                    "type": "string",
+                    "description": "The path to the file to write to."
+                },
+                "content": {
+                    "type": "string",
+                    "description": "The content to write to the file."
+                }
+            },
+            "required": [
+                "file_path",
+                "content"
+            ]
+        }
+    },
+    "file_read": {
+        "module": "file",
+        "class": "FileReadSkill",
+        "side_effect_free": True,
+        "description": "指定されたファイルの内容を読み込みます。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "file_path": {
+                    "type": "string",
+                    "description": "The path to the file to read."
+                }
+            },
+            "required": [
+                "file_path"
+            ]
+        }
+    },
+    "calculator": {
+        "module": "math",
+        "class": "CalculatorSkill",
+        "side_effect_free": True,
+        "description": "数式の計算を行います。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "expression": {
+                    "type": "string",
+                    "description": "The mathematical expression to evaluate."
+                }
+            },
+            "required": [
+                "expression"
+            ]
+        }
+    },
+    "web_search": {
+        "module": "research",
+        "class": "WebSearchSkill",
+        "side_effect_free": True,
+        "description": "指定されたクエリでWeb検索を行い、結果のサマリーを返します。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query."
+                }
+            },
+            "required": [
+                "query"
+            ]
+        }
+    },
+    "generate_slides": {
+        "module": "presentation",
+        "class": "SlideGenerationSkill",
+        "side_effect_free": False,
+        "description": "指定された構成案に基づいて、Marp対応のMarkdown形式でスライドを生成し、ファイルに保存します。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "Presentation title."
+                },
+                "content_plan": {
+                    "type": "string",
+                    "description": "Outline or content plan for the presentation."
+                },
+                "file_path": {
+                    "type": "string",
+                    "description": "Output file path (e.g., slides.md)."
+                }
+            },
+            "required": [
+                "title",
+                "content_plan",
+                "file_path"
+            ]
+        }
+    },
+    "generate_pptx": {
+        "module": "pptx_generation",
+        "class": "PptxGenerationSkill",
+        "side_effect_free": False,
+        "description": "JSON形式のスライド定義に基づいて、編集可能なPowerPoint(.pptx)ファイルを生成します。棒グラフ・折れ線グラフ・円グラフ・テーブルなどの図表も埋め込み可能です。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "プレゼンテーションのタイトル"
+                },
+                "slides": {
+                    "type": "string",
+                    "description": "スライド定義のJSON文字列。各要素は以下のフィールドを持つ:\n  type: 'title' | 'content' | 'bullets' | 'chart' | 'table' | 'two_column'\n  title: スライドタイトル\n  subtitle: サブタイトル (typeがtitleの場合)\n  body: 本文テキスト (typeがcontentの場合)\n  bullets: 箇条書きリスト (typeがbulletsの場合)\n  notes: 発表者ノート\n  chart: チャート定義 (typeがchartの場合)\n    chart_type: 'bar'|'line'|'pie'|'doughnut'|'area'|'bar_horizontal'\n    categories: カテゴリラベルのリスト\n    series: [{name, values}] のリスト\n  table: テーブル定義 (typeがtableの場合)\n    headers: ヘッダー行のリスト\n    rows: データ行のリスト（各行はリスト）\n  columns: two_columnの場合の左右カラム定義 [{title, bullets}]\n"
+                },
+                "file_path": {
+                    "type": "string",
+                    "description": "出力ファイルパス (例: output/presentation.pptx)"
+                },
+                "footer": {
+                    "type": "string",
+                    "description": "フッターに表示するテキスト（省略可）"
+                }
+            },
+            "required": [
+                "title",
+                "slides",
+                "file_path"
+            ]
+        }
+    },
+    "generate_pptx_js": {
+        "module": "pptxjs_generation",
+        "class": "PptxJsGenerationSkill",
+        "side_effect_free": False,
+        "description": "pptxgenjsのNode.jsスクリプトを受け取り、実行してPowerPoint(.pptx)ファイルを生成します。LLMが生成したスクリプトをそのまま実行するため、自由度の高いデザインが可能です。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "script": {
+                    "type": "string",
+                    "description": "pptxgenjsを使用したNode.jsスクリプト文字列。pres.writeFile()で指定パスに保存すること。require('pptxgenjs')で読み込み可能。"
+                },
+                "file_path": {
+                    "type": "string",
+                    "description": "出力ファイルパス (例: output/presentation.pptx)"
+                }
+            },
+            "required": [
+                "script",
+                "file_path"
+            ]
+        }
+    },
+    "slack_notify": {
+        "module": "slack",
+        "class": "SlackNotifySkill",
+        "side_effect_free": False,
+        "description": "指定されたメッセージをSlackチャンネルに送信します。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "message": {
+                    "type": "string",
+                    "description": "送信するメッセージ本文"
+                },
+                "title": {
+                    "type": "string",
+                    "description": "メッセージのタイトル（省略可）"
+                },
+                "channel": {
+                    "type": "string",
+                    "description": "送信先チャンネル（省略時はWebhookのデフォルトチャンネル）"
+                }
+            },
+            "required": [
+                "message"
+            ]
+        }
+    },
+    "push_notify": {
+        "module": "push_notify",
+        "class": "PushNotifySkill",
+        "side_effect_free": False,
+        "description": "LINE Messaging APIのBroadcast APIを使用してLINEに通知を送信します。LINE_CHANNEL_ACCESS_TOKEN環境変数が必要です（無料プラン対応）。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "message": {
+                    "type": "string",
+                    "description": "送信するメッセージ本文"
+                },
+                "title": {
+                    "type": "string",
+                    "description": "メッセージの先頭に付けるタイトル（省略可）"
+                }
+            },
+            "required": [
+                "message"
+            ]
+        }
+    },
+    "email_send": {
+        "module": "email_send",
+        "class": "EmailSendSkill",
+        "side_effect_free": False,
+        "description": "SMTPを使用してメールを送信します。EMAIL_ADDRESS / EMAIL_PASSWORD / EMAIL_SMTP_HOST 環境変数が必要です。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "to": {
+                    "type": "string",
+                    "description": "送信先メールアドレス（複数の場合はカンマ区切り）"
+                },
+                "subject": {
+                    "type": "string",
+                    "description": "メール件名"
+                },
+                "body": {
+                    "type": "string",
+                    "description": "メール本文（Markdown可）"
+                },
+                "is_html": {
+                    "type": "boolean",
+                    "description": "本文をHTMLとして送信するか（デフォルト: false）"
+                }
+            },
+            "required": [
+                "to",
+                "subject",
+                "body"
+            ]
+        }
+    },
+    "self_debug": {
+        "module": "self_debug",
+        "class": "SelfDebugSkill",
+        "side_effect_free": False,
+        "description": "Pythonコードとエラーメッセージを受け取り、LLMによる修正→再実行を繰り返す自己デバッグループを実行します。修正済みコードと実行結果を返します。",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "code": {
+                    "type": "string",
+                    "description": "デバッグ対象のPythonコード。"
+                },
+                "error": {
+                    "type": "string",
+                    "description": "最初に発生したエラーメッセージ（省略時は空文字）。"
+                },
+                "max_iterations": {
+                    "type": "integer",
+                    "description": "最大デバッグ試行回数（デフォルト: 5）。"
+                }
+            },
+            "required": [
+                "code"
+            ]
+        }
+    }
+}
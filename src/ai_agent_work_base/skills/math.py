@@ -2,6 +2,8 @@ from typing import Any, Dict
 from .base import BaseSkill
 
 class CalculatorSkill(BaseSkill):
+    side_effect_free = True
+
     @property
     def name(self) -> str:
         return "calculator"
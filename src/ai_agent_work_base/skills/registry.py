@@ -0,0 +1,111 @@
+"""
+スキルレジストリ。
+
+マニフェストを元にスキル名・説明・パラメータを保持し、スキルのモジュールは初回利用時にimportする。
+生成したインスタンスはキャッシュし、以降の実行で再利用する。
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+from .base import BaseSkill
+from .manifest import SKILL_MANIFEST
+
+
+class SkillSpec:
+    """importせずに参照できるスキルの情報"""
+
+    __slots__ = ("name", "module", "class_name", "description", "parameters", "side_effect_free")
+
+    def __init__(self, name: str, entry: Dict[str, Any]):
+        self.name = name
+        self.module = entry["module"]
+        self.class_name = entry["class"]
+        self.description = entry["description"]
+        self.parameters = entry["parameters"]
+        self.side_effect_free = entry.get("side_effect_free", False)
+
+
+class SkillRegistry(Mapping):
+    """
+    スキル名 → スキルインスタンスのマッピング（インスタンスは初回アクセス時に生成する）
+
+    GraphExecutor には List[BaseSkill] の代わりにそのまま渡せる。
+
+    使用例:
+        registry = get_skill_registry()
+        "web_search" in registry     # importせずに判定
+        registry["web_search"]       # 初回のみ import + インスタンス化
+    """
+
+    def __init__(self, manifest: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._specs = {name: SkillSpec(name, entry) for name, entry in (manifest or SKILL_MANIFEST).items()}
+        self._instances: Dict[str, BaseSkill] = {}
+        self._lock = threading.Lock()
+
+    def specs(self) -> List[SkillSpec]:
+        """全スキルの情報を返す（スキルのモジュールはimportしない）"""
+        return list(self._specs.values())
+
+    def register(self, skill: BaseSkill) -> None:
+        """インスタンス化済みのスキルを登録する（マニフェストにないスキルやテスト用）"""
+        with self._lock:
+            self._instances[skill.name] = skill
+
+    def is_side_effect_free(self, name: str) -> bool:
+        """スキルが副作用を持たないか（マニフェストから判定し、スキルは生成しない）"""
+        skill = self._instances.get(name)
+        if skill is not None:
+            return skill.side_effect_free
+        spec = self._specs.get(name)
+        return spec is not None and spec.side_effect_free
+
+    def load_class(self, name: str) -> type:
+        """スキルのクラスをimportして返す"""
+        spec = self._specs[name]
+        module = importlib.import_module(f"{__package__}.{spec.module}")
+        return getattr(module, spec.class_name)
+
+    def __getitem__(self, name: str) -> BaseSkill:
+        skill = self._instances.get(name)
+        if skill is not None:
+            return skill
+        if name not in self._specs:
+            raise KeyError(name)
+        with self._lock:
+            # 他のスレッドが先に生成していればそれを使う
+            skill = self._instances.get(name)
+            if skill is None:
+                skill = self._instances[name] = self.load_class(name)()
+            return skill
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs or name in self._instances
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._specs
+        yield from (name for name in self._instances if name not in self._specs)
+
+    def __len__(self) -> int:
+        return len(self._specs.keys() | self._instances.keys())
+
+    def loaded(self) -> List[str]:
+        """インスタンス化済みのスキル名を返す"""
+        return list(self._instances)
+
+
+_default_registry: Optional[SkillRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_skill_registry() -> SkillRegistry:
+    """プロセス内で共有されるスキルレジストリを返す"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = SkillRegistry()
+        return _default_registry
@@ -1,7 +1,6 @@
 import os
 from typing import Any, Dict
 from dotenv import load_dotenv
-from tavily import TavilyClient
 from .base import BaseSkill
 
 load_dotenv()
@@ -13,12 +12,21 @@ class WebSearchSkill(BaseSkill):
     TAVILY_API_KEY環境変数が必要。
     """
 
+    side_effect_free = True
+
     def __init__(self):
-        """Tavily APIクライアントを初期化する。"""
-        api_key = os.getenv("TAVILY_API_KEY")
-        if not api_key:
-            raise RuntimeError("TAVILY_API_KEY が設定されていません。.envファイルに追加してください。")
-        self._client = TavilyClient(api_key=api_key)
+        self._tavily = None
+
+    @property
+    def _client(self):
+        """Tavily APIクライアント（初回の検索時に生成し、以降は再利用する）。"""
+        if self._tavily is None:
+            api_key = os.getenv("TAVILY_API_KEY")
+            if not api_key:
+                raise RuntimeError("TAVILY_API_KEY が設定されていません。.envファイルに追加してください。")
+            from tavily import TavilyClient
+            self._tavily = TavilyClient(api_key=api_key)
+        return self._tavily
 
     @property
     def name(self) -> str:
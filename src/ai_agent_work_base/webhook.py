@@ -8,31 +8,94 @@ Webhook サーバー
     uv run uvicorn ai_agent_work_base.webhook:app --reload --port 8001
 """
 import asyncio
+import json
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from .core.llm import LLMClient
-from .engine.executor import GraphExecutor
-from .engine.loader import WorkflowLoader
-from .skills import load_all_skills
+from .jobs import IdempotencyKeyConflictError, Job, QueueFullError, create_job_queue_from_env, current_job
+from .runtime import Runtime
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+WORKFLOW_DIR = Path("workflows")
+
+
+def _log_callbacks(workflow_name: str) -> Dict[str, Any]:
+    """ノードの開始・終了をログに出すコールバックを返す。"""
+
+    def on_start(node):
+        logger.info(f"[{workflow_name}] → [{node.type}] {node.id}")
+
+    def on_end(node, output):
+        preview = str(output)[:100].replace("\n", " ")
+        logger.info(f"[{workflow_name}] ✓ {node.id}: {preview}")
+
+    return {"on_node_start": on_start, "on_node_end": on_end}
+
+
+def _event_callbacks(job: Job) -> Dict[str, Any]:
+    """ノードの進捗をジョブのイベント（GET /jobs/{job_id}/events）として発行するコールバックを返す。"""
+
+    def on_node_start(node):
+        job.emit("node_start", {"node_id": node.id, "type": node.type})
+
+    def on_node_end(node, output):
+        job.emit("node_end", {"node_id": node.id, "output": output})
+
+    def on_foreach_item_start(node, idx, total, item):
+        job.emit("foreach_item_start", {"node_id": node.id, "index": idx, "total": total})
+
+    def on_foreach_item_end(node, idx, total, item, result):
+        job.emit("foreach_item_end", {"node_id": node.id, "index": idx, "total": total, "result": result})
+
+    def on_node_token(node, delta):
+        job.emit("token", {"node_id": node.id, "delta": delta})
+
+    return {
+        "on_node_start": on_node_start,
+        "on_node_end": on_node_end,
+        "on_foreach_item_start": on_foreach_item_start,
+        "on_foreach_item_end": on_foreach_item_end,
+        "on_node_token": on_node_token,
+    }
+
+
+# LLMクライアント・スキル・ワークフロー定義・GraphExecutor をプロセス内で共有する
+runtime = Runtime(WORKFLOW_DIR, callbacks=_log_callbacks)
+
+
+def _log_warm_up_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("ランタイムのウォームアップに失敗しました", exc_info=task.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時にバックグラウンドでウォームアップを行う（完了までは /ready が503を返す）"""
+    task = asyncio.create_task(asyncio.to_thread(runtime.warm_up))
+    task.add_done_callback(_log_warm_up_failure)
+    yield
+    if not task.done():
+        task.cancel()
+    await jobs.stop()
+
+
 app = FastAPI(
     title="AI Agent Webhook Server",
     description="外部イベントでワークフローを自動起動するWebhookサーバー",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-WORKFLOW_DIR = Path("workflows")
-
 
 # -----------------------------------------------------------------------
 # リクエスト / レスポンス スキーマ
@@ -50,6 +113,8 @@ class WebhookResponse(BaseModel):
     status: str
     workflow: str
     message: str
+    job_id: Optional[str] = None
+    coalesced: bool = False
     result: Optional[Dict[str, Any]] = None
 
 
@@ -65,36 +130,44 @@ class WorkflowResult(BaseModel):
 
 def _resolve_workflow_path(workflow_name: str) -> Path:
     """ワークフロー名からYAMLファイルパスを解決する。"""
-    candidates = [
-        WORKFLOW_DIR / workflow_name,
-        WORKFLOW_DIR / f"{workflow_name}.yaml",
-        WORKFLOW_DIR / f"{workflow_name}.yml",
-    ]
-    for path in candidates:
-        if path.exists():
-            return path
-    raise HTTPException(
-        status_code=404,
-        detail=f"ワークフロー '{workflow_name}' が見つかりません。workflows/ ディレクトリを確認してください。"
-    )
+    try:
+        return runtime.workflows.resolve_path(workflow_name)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"ワークフロー '{workflow_name}' が見つかりません。workflows/ ディレクトリを確認してください。"
+        )
 
 
-def _run_workflow(workflow_name: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
-    """ワークフローを同期実行して結果を返す。"""
-    path = _resolve_workflow_path(workflow_name)
-    workflow = WorkflowLoader.load(path)
-    llm = LLMClient()
-    skills = load_all_skills()
+async def _run_workflow(workflow_name: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """ワークフローをイベントループ上で非同期実行して結果を返す。"""
+    _resolve_workflow_path(workflow_name)
+    # 共有のLLMクライアント・スキル・GraphExecutor を再利用する（定義が更新された場合のみ作り直す）
+    job = current_job.get()
+    if job is None:
+        executor = runtime.executor(workflow_name)
+    else:
+        executor = runtime.executor(workflow_name, **_event_callbacks(job))
+    return await executor.aexecute(inputs)
 
-    def on_start(node):
-        logger.info(f"[{workflow_name}] → [{node.type}] {node.id}")
 
-    def on_end(node, output):
-        preview = str(output)[:100].replace("\n", " ")
-        logger.info(f"[{workflow_name}] ✓ {node.id}: {preview}")
+# 同時実行数と待ち件数に上限を設けたジョブキュー（テストで差し替えられるよう実行時に _run_workflow を参照する）
+jobs = create_job_queue_from_env(lambda workflow_name, inputs: _run_workflow(workflow_name, inputs))
+
 
-    executor = GraphExecutor(workflow, skills, llm, on_node_start=on_start, on_node_end=on_end)
-    return executor.execute(inputs)
+def _submit(workflow_name: str, inputs: Dict[str, Any], idempotency_key: Optional[str] = None):
+    """
+    ジョブをキューに積む（満杯の場合は429 + Retry-After）
+
+    同じワークフロー・入力のジョブが実行中の場合や、Idempotency-Key が一致する場合は既存のジョブを返す。
+    Idempotency-Key が別のワークフロー・入力で使われている場合は422を返す。
+    """
+    try:
+        return jobs.submit(workflow_name, inputs, idempotency_key=idempotency_key)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except IdempotencyKeyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 # -----------------------------------------------------------------------
@@ -107,68 +180,94 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """レディネスチェック（ウォームアップ完了までは503を返す）"""
+    if not runtime.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match（カンマ区切りのリスト・W/ 付きの弱い ETag・"*"）が ETag に一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in tags:
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in tags}
+
+
 @app.get("/workflows")
-async def list_workflows():
-    """利用可能なワークフロー一覧を返す"""
-    result = []
-    for path in sorted(WORKFLOW_DIR.glob("*.yaml")):
-        try:
-            wf = WorkflowLoader.load(path)
-            result.append({
-                "name": wf.name,
-                "file": path.name,
-                "description": wf.description or "",
-                "inputs": [
-                    {"name": i.name, "type": i.type, "description": i.description or ""}
-                    for i in (wf.inputs or [])
-                ],
-            })
-        except Exception as e:
-            logger.warning(f"ワークフロー読み込みエラー {path}: {e}")
-    return {"workflows": result}
+async def list_workflows(if_none_match: Optional[str] = Header(default=None)):
+    """
+    利用可能なワークフロー一覧を返す
+
+    一覧は変更があったときだけ作り直したカタログから返す。`If-None-Match` のいずれかが ETag と一致する場合
+    （弱い比較。`*` は常に一致）は304を返す。
+    """
+    catalog = runtime.workflows.catalog()
+    headers = {"ETag": catalog.etag}
+    if _etag_matches(if_none_match, catalog.etag):
+        return Response(status_code=304, headers=headers)
+    result = [
+        {"name": w["name"], "file": w["file"], "description": w["description"], "inputs": w["inputs"]}
+        for w in catalog.workflows()
+    ]
+    return JSONResponse(content={"workflows": result}, headers=headers)
 
 
 @app.post("/webhook", response_model=WebhookResponse, status_code=202)
 async def trigger_workflow(
     req: WebhookRequest,
-    background_tasks: BackgroundTasks,
     x_webhook_secret: Optional[str] = Header(default=None),
+    idempotency_key: Optional[str] = Header(default=None),
 ):
     """
     外部イベントを受け取りワークフローを起動する。
 
-    - `async_run=true`（デフォルト）: バックグラウンドで実行し即座に202を返す
+    - `async_run=true`（デフォルト）: ジョブキューに積み即座に202と job_id を返す（結果は GET /jobs/{job_id}）
     - `async_run=false`: 実行完了まで待機して結果を返す（同期実行）
+
+    どちらもジョブキューのワーカーで実行され、キューが満杯の場合は429を返す。
+    同じワークフロー・入力のジョブが実行中の場合や `Idempotency-Key` ヘッダーが一致する場合は
+    新しく実行せず既存のジョブに合流する（`coalesced=true`）。
+    `Idempotency-Key` が別のワークフロー・入力で使われている場合は422を返す。
     """
     # ワークフローの存在確認（404を早期に返すため）
     _resolve_workflow_path(req.workflow)
 
+    job = _submit(req.workflow, req.inputs, idempotency_key)
+    coalesced = job.requests > 1
     if req.async_run:
-        background_tasks.add_task(_run_workflow, req.workflow, req.inputs)
         return WebhookResponse(
             status="accepted",
             workflow=req.workflow,
-            message=f"ワークフロー '{req.workflow}' をバックグラウンドで起動しました。",
+            message=(
+                f"実行中のワークフロー '{req.workflow}' に合流しました。" if coalesced
+                else f"ワークフロー '{req.workflow}' をバックグラウンドで起動しました。"
+            ),
+            job_id=job.id,
+            coalesced=coalesced,
         )
     else:
-        try:
-            result = await asyncio.get_event_loop().run_in_executor(
-                None, _run_workflow, req.workflow, req.inputs
-            )
-            return WebhookResponse(
-                status="completed",
-                workflow=req.workflow,
-                message=f"ワークフロー '{req.workflow}' が完了しました。",
-                result=result,
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        await jobs.wait(job)
+        if job.status == "failed":
+            raise HTTPException(status_code=500, detail=job.error)
+        return WebhookResponse(
+            status="completed",
+            workflow=req.workflow,
+            message=f"ワークフロー '{req.workflow}' が完了しました。",
+            job_id=job.id,
+            coalesced=coalesced,
+            result=job.result,
+        )
 
 
 @app.post("/webhook/inquiry", response_model=WebhookResponse, status_code=202)
 async def trigger_inquiry(
     body: Dict[str, Any],
-    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(default=None),
 ):
     """
     問い合わせフォームからのWebhookを受け取り、inquiry_responseワークフローを起動する。
@@ -190,9 +289,45 @@ async def trigger_inquiry(
         "inquiry": inquiry,
         "channel": body.get("channel", ""),
     }
-    background_tasks.add_task(_run_workflow, "inquiry_response", inputs)
+    job = _submit("inquiry_response", inputs, idempotency_key)
     return WebhookResponse(
         status="accepted",
         workflow="inquiry_response",
         message=f"問い合わせを受け付けました。送信者: {sender}",
+        job_id=job.id,
+        coalesced=job.requests > 1,
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """ジョブの状態と結果を返す"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブ '{job_id}' が見つかりません。")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    ジョブの進捗を Server-Sent Events で配信する
+
+    イベント: started / node_start / node_end / foreach_item_start / foreach_item_end / token /
+    completed / failed（completed・failed で配信を終了する）。途中から接続した場合も最初のイベントから送る。
+    ジョブの完了後に接続した場合、token イベントは含まれない（生成結果は node_end の output で受け取れる）。
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブ '{job_id}' が見つかりません。")
+
+    async def stream():
+        async for event, data in job.events():
+            payload = json.dumps(data, ensure_ascii=False, default=str)
+            yield f"event: {event}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -0,0 +1,211 @@
+"""
+GraphExecutor.aexecute（ネイティブasyncio実行パス）のテスト
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+from ai_agent_work_base.core.llm import LLMClient
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills.basic import EchoSkill
+
+
+def make_async_llm(responses: list):
+    """achat_completion が順番にレスポンスを返すモックLLMを作成する"""
+    mock_llm = MagicMock()
+    mock_llm.achat_completion = AsyncMock(side_effect=[
+        Mock(choices=[Mock(message=Mock(content=content))]) for content in responses
+    ])
+    return mock_llm
+
+
+class AsyncEchoSkill(EchoSkill):
+    """async def の execute を持つテスト用スキル"""
+    @property
+    def name(self) -> str:
+        return "async_echo"
+
+    async def execute(self, message: str, **kwargs) -> str:
+        await asyncio.sleep(0)
+        return f"async:{message}"
+
+
+class ThreadRecordingSkill(EchoSkill):
+    """実行されたスレッド名を記録するテスト用スキル"""
+    def __init__(self):
+        self.threads = []
+
+    def execute(self, message: str, **kwargs) -> str:
+        self.threads.append(threading.current_thread().name)
+        return message
+
+
+def test_aexecute_simple_flow():
+    """aexecuteがLLM・同期スキル・async スキルを順に実行できるかテスト"""
+    yaml_content = """
+name: Async Flow
+nodes:
+  - id: step1
+    type: llm
+    prompt: "Hello {{inputs.name}}"
+    next: step2
+  - id: step2
+    type: skill
+    skill: echo
+    params:
+      message: "{{step1.output}}"
+    next: step3
+  - id: step3
+    type: skill
+    skill: async_echo
+    params:
+      message: "{{step2.output}}"
+    next: end
+"""
+    workflow = WorkflowLoader.load(yaml_content)
+    sync_skill = ThreadRecordingSkill()
+    mock_llm = make_async_llm(["LLM Result"])
+    executor = GraphExecutor(workflow, [sync_skill, AsyncEchoSkill()], mock_llm)
+
+    result = asyncio.run(executor.aexecute({"name": "User"}))
+
+    assert result["step1"]["output"] == "LLM Result"
+    assert result["step2"]["output"] == "LLM Result"
+    assert result["step3"]["output"] == "async:LLM Result"
+    mock_llm.achat_completion.assert_awaited_once()
+    mock_llm.chat_completion.assert_not_called()
+    # 同期スキルはイベントループのスレッドではなくスキル用プールで実行される
+    assert sync_skill.threads[0].startswith("skill")
+
+
+def test_aexecute_async_callbacks():
+    """aexecuteでasync関数のコールバックがawaitされるかテスト"""
+    yaml_content = """
+name: Callback Flow
+nodes:
+  - id: step1
+    type: skill
+    skill: echo
+    params:
+      message: "hi"
+    next: end
+"""
+    events = []
+
+    async def on_start(node):
+        events.append(("start", node.id))
+
+    async def on_end(node, output):
+        events.append(("end", node.id, output))
+
+    workflow = WorkflowLoader.load(yaml_content)
+    executor = GraphExecutor(workflow, [EchoSkill()], MagicMock(), on_node_start=on_start, on_node_end=on_end)
+
+    asyncio.run(executor.aexecute({}))
+
+    assert events == [("start", "step1"), ("end", "step1", "hi")]
+
+
+def test_aexecute_json_output_and_foreach():
+    """aexecuteでJSON出力とforeach（LLMインライン）が動作するかテスト"""
+    yaml_content = """
+name: Async Foreach
+nodes:
+  - id: plan
+    type: llm
+    output_format: json
+    prompt: "plan"
+    next: each
+  - id: each
+    type: foreach
+    items: "{{plan.output.queries}}"
+    concurrency: 2
+    node:
+      type: llm
+      prompt: "analyze {{item}}"
+    next: end
+"""
+    workflow = WorkflowLoader.load(yaml_content)
+    mock_llm = make_async_llm([json.dumps({"queries": ["q1", "q2"]}), "a1", "a2"])
+    executor = GraphExecutor(workflow, [], mock_llm)
+
+    result = asyncio.run(executor.aexecute({}))
+
+    assert result["plan"]["output"] == {"queries": ["q1", "q2"]}
+    assert sorted(result["each"]["output"]) == ["a1", "a2"]
+    assert mock_llm.achat_completion.await_count == 3
+
+
+def test_aexecute_parallel_collect():
+    """aexecuteでparallelノード（on_error: collect）が動作するかテスト"""
+    class FailingSkill(EchoSkill):
+        async def execute(self, message: str, **kwargs) -> str:
+            if message == "bad":
+                raise RuntimeError("boom")
+            return message
+
+    yaml_content = """
+name: Async Parallel
+nodes:
+  - id: fan_out
+    type: parallel
+    items: "{{inputs.items}}"
+    on_error: collect
+    node:
+      type: skill
+      skill: echo
+      params:
+        message: "{{item}}"
+    next: end
+"""
+    workflow = WorkflowLoader.load(yaml_content)
+    executor = GraphExecutor(workflow, [FailingSkill()], MagicMock())
+
+    result = asyncio.run(executor.aexecute({"items": ["a", "bad"]}))
+
+    assert result["fan_out"]["output"] == ["a", {"error": "RuntimeError: boom"}]
+
+
+def test_execute_runs_async_skill():
+    """同期のexecuteでもasync def のスキルが実行できるかテスト"""
+    yaml_content = """
+name: Sync With Async Skill
+nodes:
+  - id: step1
+    type: skill
+    skill: async_echo
+    params:
+      message: "hi"
+    next: end
+"""
+    workflow = WorkflowLoader.load(yaml_content)
+    executor = GraphExecutor(workflow, [AsyncEchoSkill()], MagicMock())
+
+    result = executor.execute({})
+
+    assert result["step1"]["output"] == "async:hi"
+
+
+def test_llm_client_achat_completion(monkeypatch):
+    """LLMClient.achat_completion がAsyncOpenAIクライアントに同じパラメータを渡すかテスト"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    client = LLMClient(model="gpt-test")
+    create = AsyncMock(return_value="response")
+    client._async_client = MagicMock()
+    client._async_client.chat.completions.create = create
+
+    result = asyncio.run(client.achat_completion(
+        messages=[{"role": "user", "content": "hi"}],
+        response_format={"type": "json_object"},
+    ))
+
+    assert result == "response"
+    create.assert_awaited_once_with(
+        model="gpt-test",
+        messages=[{"role": "user", "content": "hi"}],
+        response_format={"type": "json_object"},
+    )
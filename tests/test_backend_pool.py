@@ -0,0 +1,231 @@
+"""
+LLMバックエンドプールのテスト
+
+ローカルに立てた OpenAI 互換のスタンドインサーバーを相手に、振り分けとフェイルオーバーを確認する。
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import InternalServerError
+
+from ai_agent_work_base.core.backends import BackendPool, get_backend_pool, load_backend_pool
+from ai_agent_work_base.core.llm import LLMClient
+from ai_agent_work_base.core.llm_cache import SingleFlight
+from ai_agent_work_base.core.rate_limit import RateLimitScheduler
+from ai_agent_work_base.schemas.backend import BackendsConfig, EndpointConfig
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """POST /v1/chat/completions に応答する OpenAI 互換のスタンドイン"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.models.append(body["model"])
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_response(server.status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": {"message": "unavailable"}}).encode())
+            return
+        content = f"from {server.label}"
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for piece in (content[:5], content[5:]):
+                chunk = {
+                    "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        payload = json.dumps({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    """stand_in(label, delay=0, status=200) でサーバーを起動し、ベースURLとサーバーを返す"""
+    servers = []
+
+    def start(label, delay=0.0, status=200):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        server.label, server.delay, server.status, server.models = label, delay, status, []
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1", server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def unused_url() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def make_pool(*endpoints, **kwargs) -> BackendPool:
+    configs = [EndpointConfig(name=name, base_url=url, api_key="test", timeout=5, **extra)
+               for name, url, extra in endpoints]
+    return BackendPool(configs, **{"explore": 0.0, **kwargs})
+
+
+def make_client(monkeypatch, pool) -> LLMClient:
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    return LLMClient(model="gpt-test", backends=pool, rate_limiter=RateLimitScheduler(), single_flight=SingleFlight())
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_routes_to_lower_latency_endpoint(monkeypatch, stand_in):
+    """計測した遅延が小さいエンドポイントに振り分けるかテスト"""
+    slow_url, slow = stand_in("slow", delay=0.1)
+    fast_url, fast = stand_in("fast")
+    client = make_client(monkeypatch, make_pool(("slow", slow_url, {}), ("fast", fast_url, {})))
+
+    for _ in range(6):
+        client.chat_completion(MESSAGES)
+
+    # 未計測のうちは記載順に1回ずつ試し、以降は速い方に送る
+    assert len(slow.models) == 1
+    assert len(fast.models) == 5
+    stats = {s["name"]: s for s in client.backends.stats()}
+    assert stats["slow"]["latency_ms"] > stats["fast"]["latency_ms"]
+
+
+def test_fails_over_to_next_endpoint(monkeypatch, stand_in):
+    """5xx・接続できないエンドポイントを飛ばして応答し、以降は後回しにするかテスト"""
+    broken_url, broken = stand_in("broken", status=500)
+    ok_url, ok = stand_in("ok")
+    pool = make_pool(("down", unused_url(), {}), ("broken", broken_url, {}), ("ok", ok_url, {}))
+    client = make_client(monkeypatch, pool)
+
+    response = client.chat_completion(MESSAGES)
+    assert response.choices[0].message.content == "from ok"
+    stats = {s["name"]: s for s in pool.stats()}
+    assert not stats["down"]["healthy"] and not stats["broken"]["healthy"]
+    assert stats["ok"]["healthy"] and stats["ok"]["failures"] == 0
+
+    client.chat_completion(MESSAGES)
+    assert len(broken.models) == 1
+    assert len(ok.models) == 2
+
+
+def test_raises_when_all_endpoints_fail(stand_in):
+    url, _ = stand_in("broken", status=503)
+    pool = make_pool(("broken", url, {}))
+    with pytest.raises(InternalServerError):
+        pool.call("gpt-test", lambda client, model: client.chat.completions.create(model=model, messages=MESSAGES))
+    assert pool.stats()[0]["failures"] == 1
+
+
+def test_model_mapping_and_filter(monkeypatch, stand_in):
+    """エンドポイントごとのモデル名の対応と、扱わないモデルの除外をテスト"""
+    local_url, local = stand_in("local")
+    pool = make_pool(
+        ("openai", unused_url(), {"models": ["gpt-4o"]}),
+        ("local", local_url, {"models": {"gpt-test": "qwen-7b"}}),
+    )
+    client = make_client(monkeypatch, pool)
+
+    client.chat_completion(MESSAGES)
+    assert local.models == ["qwen-7b"]
+    assert [e.name for e, _ in pool.route("gpt-4o")] == ["openai"]
+    with pytest.raises(ValueError):
+        pool.route("unknown-model")
+
+
+def test_async_and_stream_through_pool(monkeypatch, stand_in):
+    """非同期・ストリーミングの呼び出しもプール経由でフェイルオーバーするかテスト"""
+    broken_url, _ = stand_in("broken", status=502)
+    ok_url, _ = stand_in("ok")
+    client = make_client(monkeypatch, make_pool(("broken", broken_url, {}), ("ok", ok_url, {})))
+
+    async def run():
+        deltas = []
+        streamed = await client.astream_chat_completion(MESSAGES, on_delta=deltas.append)
+        response = await client.achat_completion(MESSAGES, response_format={"type": "json_object"})
+        return deltas, streamed, response
+
+    deltas, streamed, response = asyncio.run(run())
+    assert "".join(deltas) == streamed.choices[0].message.content == "from ok"
+    assert response.choices[0].message.content == "from ok"
+
+    deltas = []
+    client.stream_chat_completion(MESSAGES, on_delta=deltas.append, model="gpt-test")
+    assert "".join(deltas) == "from ok"
+
+
+def test_load_from_yaml_and_env(monkeypatch, tmp_path):
+    """YAMLの設定ファイルと環境変数 LLM_BACKENDS からプールを作成するかテスト"""
+    path = tmp_path / "backends.yaml"
+    path.write_text(
+        "cooldown: 10\n"
+        "endpoints:\n"
+        "  - name: primary\n"
+        "    api_key_env: TEST_BACKEND_KEY\n"
+        "  - name: local\n"
+        "    base_url: http://localhost:8000/v1\n"
+        "    api_key: dummy\n"
+        "    models: {gpt-4o-mini: qwen}\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("TEST_BACKEND_KEY", "sk-test")
+    pool = load_backend_pool(path)
+    assert pool.cooldown == 10
+    assert pool.endpoints[0].config.resolve_api_key() == "sk-test"
+    assert [(e.name, served) for e, served in pool.route("gpt-4o-mini")] == [("primary", "gpt-4o-mini"), ("local", "qwen")]
+
+    monkeypatch.delenv("LLM_BACKENDS", raising=False)
+    assert get_backend_pool() is None
+    monkeypatch.setenv("LLM_BACKENDS", str(path))
+    assert get_backend_pool() is get_backend_pool()
+
+    with pytest.raises(FileNotFoundError):
+        load_backend_pool(tmp_path / "missing.yaml")
+    with pytest.raises(ValueError):
+        BackendsConfig(endpoints=[{"name": "a"}, {"name": "a"}])
+
+
+def test_llm_client_without_openai_api_key(monkeypatch, tmp_path, stand_in, capsys):
+    """LLM_BACKENDS がローカルのエンドポイントのみを指す場合、OPENAI_API_KEY なしで動作するかテスト"""
+    import ai_agent_work_base.core.backends as backends
+
+    url, local = stand_in("local")
+    path = tmp_path / "backends.yaml"
+    path.write_text(f"endpoints:\n  - name: local\n    base_url: {url}\n    api_key: dummy\n", encoding="utf-8")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    monkeypatch.setenv("LLM_BACKENDS", str(path))
+    monkeypatch.setattr(backends, "_default_pool", None)
+
+    client = LLMClient(model="gpt-test", rate_limiter=RateLimitScheduler(), single_flight=SingleFlight())
+
+    assert "OPENAI_API_KEY" not in capsys.readouterr().out
+    assert client.chat_completion(MESSAGES).choices[0].message.content == "from local"
+    assert client._client is None
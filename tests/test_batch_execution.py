@@ -0,0 +1,157 @@
+"""
+GraphExecutor.execute_many（バッチ実行）と CLI の run --inputs-jsonl のテスト
+"""
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ai_agent_work_base import cli
+from ai_agent_work_base.engine.cache import NodeResultCache
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.schemas.workflow import WorkflowDefinition
+from ai_agent_work_base.skills.base import BaseSkill
+
+
+class SlowEchoSkill(BaseSkill):
+    side_effect_free = True
+
+    def __init__(self):
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self): return "slow_echo"
+    @property
+    def description(self): return "slow echo"
+    @property
+    def parameters(self): return {}
+
+    def execute(self, message: str, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        if message == "fail":
+            raise RuntimeError("boom")
+        return message
+
+
+def make_workflow(cache: bool = False) -> WorkflowDefinition:
+    node = {
+        "id": "echo",
+        "type": "skill",
+        "skill": "slow_echo",
+        "params": {"message": "{{inputs.message}}"},
+        "next": "end",
+    }
+    if cache:
+        node["cache"] = {"ttl": 60}
+    return WorkflowDefinition(name="Batch", nodes=[node])
+
+
+def test_execute_many_runs_concurrently_and_streams_results():
+    """並行数を守って全件実行し、失敗した入力もエラーとして返すかテスト"""
+    skill = SlowEchoSkill()
+    executor = GraphExecutor(make_workflow(), [skill], MagicMock())
+    rows = [{"message": f"m{i}"} for i in range(6)] + [{"message": "fail"}]
+
+    results = list(executor.execute_many(iter(rows), concurrency=3))
+
+    assert skill.peak == 3
+    assert sorted(r.index for r in results) == list(range(7))
+    by_index = {r.index: r for r in results}
+    assert by_index[0].outputs["echo"] == {"output": "m0"}
+    assert by_index[6].outputs is None
+    assert str(by_index[6].error) == "boom"
+
+
+def test_execute_many_shares_node_cache():
+    """同じバッチ内の同一入力はノード結果キャッシュを共有するかテスト"""
+    skill = SlowEchoSkill()
+    executor = GraphExecutor(make_workflow(cache=True), [skill], MagicMock(), cache=NodeResultCache())
+    rows = [{"message": "same"}] * 4
+
+    results = list(executor.execute_many(rows, concurrency=1))
+
+    assert [r.outputs["echo"]["output"] for r in results] == ["same"] * 4
+    assert skill.calls == 1
+
+
+def test_execute_many_rejects_invalid_concurrency():
+    executor = GraphExecutor(make_workflow(), [SlowEchoSkill()], MagicMock())
+    with pytest.raises(ValueError):
+        list(executor.execute_many([{}], concurrency=0))
+
+
+def test_cli_run_without_inputs_jsonl_runs_named_workflow(monkeypatch):
+    """--inputs-jsonl なしで指定したワークフロー名を無視せず、そのワークフローを1回実行するかテスト"""
+    monkeypatch.setattr("sys.argv", ["cli", "run", "batch"])
+    with patch.object(cli, "run_workflow") as run_workflow, patch.object(cli, "run_batch") as run_batch, \
+            patch.object(cli, "console"):
+        cli.main()
+    run_workflow.assert_called_once_with("batch")
+    run_batch.assert_not_called()
+
+    monkeypatch.setattr("sys.argv", ["cli", "run", "batch", "--output", "out.jsonl"])
+    with pytest.raises(SystemExit), patch.object(cli, "run_workflow") as run_workflow:
+        cli.main()
+    run_workflow.assert_not_called()
+
+
+def test_cli_run_batch_writes_jsonl(tmp_path, monkeypatch):
+    """run --inputs-jsonl が結果をJSONLで書き出すかテスト"""
+    inputs_path = tmp_path / "inputs.jsonl"
+    inputs_path.write_text('{"message": "a"}\n\n{"message": "b"}\n', encoding="utf-8")
+    output_path = tmp_path / "results.jsonl"
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    registry = MagicMock()
+    registry.get.return_value = make_workflow()
+    with patch.object(cli, "get_registry", return_value=registry), \
+            patch.object(cli, "get_skill_registry", return_value={"slow_echo": SlowEchoSkill()}), \
+            patch.object(cli, "LLMClient"):
+        cli.run_batch("batch", inputs_path, jobs=2, output_path=output_path)
+
+    records = sorted(
+        (json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()),
+        key=lambda r: r["index"],
+    )
+    assert [r["outputs"]["echo"]["output"] for r in records] == ["a", "b"]
+    assert records[1]["inputs"] == {"message": "b"}
+
+
+def test_cli_run_batch_shares_llm_cache(tmp_path, monkeypatch):
+    """LLM_CACHE が未設定でも、入力セット間で同一のLLM呼び出しはAPIを1回しか呼ばないかテスト"""
+    from openai.types.chat import ChatCompletion
+
+    inputs_path = tmp_path / "inputs.jsonl"
+    inputs_path.write_text('{"topic": "AI", "id": 1}\n{"topic": "AI", "id": 2}\n', encoding="utf-8")
+    output_path = tmp_path / "results.jsonl"
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+
+    openai_client = MagicMock()
+    openai_client.chat.completions.create.return_value = ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-test",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "summary"}}],
+    })
+    registry = MagicMock()
+    registry.get.return_value = WorkflowDefinition(name="Batch", nodes=[{
+        "id": "summarize", "type": "llm", "prompt": "Summarize {{inputs.topic}}", "next": "end",
+    }])
+    with patch.object(cli, "get_registry", return_value=registry), \
+            patch.object(cli, "get_skill_registry", return_value={}), \
+            patch("ai_agent_work_base.core.llm.OpenAI", return_value=openai_client):
+        cli.run_batch("batch", inputs_path, jobs=1, output_path=output_path)
+
+    records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [r["outputs"]["summarize"]["output"] for r in records] == ["summary", "summary"]
+    assert openai_client.chat.completions.create.call_count == 1
@@ -0,0 +1,177 @@
+"""
+チェックポイントと再開のテスト
+"""
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from ai_agent_work_base.engine.checkpoint import CheckpointStore
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills.basic import EchoSkill
+
+
+class FlakyEchoSkill(EchoSkill):
+    """fail_on に含まれる message の呼び出しで失敗し、呼び出しを記録するテスト用スキル"""
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.calls = []
+
+    def execute(self, message: str, **kwargs) -> str:
+        self.calls.append(message)
+        if message in self.fail_on:
+            raise RuntimeError(f"failed: {message}")
+        return message
+
+
+YAML = """
+name: Checkpoint Test
+nodes:
+  - id: search
+    type: skill
+    skill: echo
+    params:
+      message: "search"
+    next: summarize
+  - id: summarize
+    type: skill
+    skill: echo
+    params:
+      message: "summarize"
+    next: create
+  - id: create
+    type: skill
+    skill: echo
+    params:
+      message: "{{summarize.output}}+create"
+    next: end
+"""
+
+
+def test_resume_from_failed_node(tmp_path):
+    """失敗したノードから再開し、完了済みのノードを再実行しないかテスト"""
+    store = CheckpointStore(tmp_path)
+    workflow = WorkflowLoader.load(YAML)
+
+    skill = FlakyEchoSkill(fail_on={"summarize+create"})
+    executor = GraphExecutor(workflow, [skill], MagicMock(), checkpoint_store=store)
+    with pytest.raises(RuntimeError):
+        executor.execute({}, run_id="run1")
+
+    checkpoint = store.load("run1")
+    assert checkpoint["status"] == "failed"
+    assert checkpoint["next_node_id"] == "create"
+    assert "RuntimeError" in checkpoint["error"]
+
+    skill = FlakyEchoSkill()
+    result = GraphExecutor(workflow, [skill], MagicMock(), checkpoint_store=store).resume("run1")
+
+    assert skill.calls == ["summarize+create"]
+    assert result["search"]["output"] == "search"
+    assert result["create"]["output"] == "summarize+create"
+    assert store.load("run1")["status"] == "completed"
+
+
+def test_cli_resume_deletes_checkpoint_on_success(tmp_path, monkeypatch):
+    """CLIの resume で完了まで実行した場合はチェックポイントを削除するかテスト"""
+    from ai_agent_work_base import cli
+
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    store = CheckpointStore()
+    workflow = WorkflowLoader.load(YAML)
+    with pytest.raises(RuntimeError):
+        GraphExecutor(workflow, [FlakyEchoSkill(fail_on={"summarize"})], MagicMock(), checkpoint_store=store).execute(
+            {}, run_id="run1"
+        )
+    assert store.list_runs()
+
+    with patch.object(cli, "get_skill_registry", return_value=[FlakyEchoSkill()]), patch.object(cli, "LLMClient"):
+        cli.resume_workflow("run1")
+
+    assert store.list_runs() == []
+
+
+def test_run_id_is_generated(tmp_path):
+    """run_id を省略した場合に自動生成されるかテスト"""
+    store = CheckpointStore(tmp_path)
+    executor = GraphExecutor(WorkflowLoader.load(YAML), [FlakyEchoSkill()], MagicMock(), checkpoint_store=store)
+
+    executor.execute({})
+
+    assert executor.last_run_id
+    assert store.load(executor.last_run_id)["status"] == "completed"
+    assert [r["run_id"] for r in store.list_runs()] == [executor.last_run_id]
+
+
+def test_async_resume(tmp_path):
+    """aexecute() / aresume() でも再開できるかテスト"""
+    store = CheckpointStore(tmp_path)
+    workflow = WorkflowLoader.load(YAML)
+
+    executor = GraphExecutor(workflow, [FlakyEchoSkill(fail_on={"summarize"})], MagicMock(), checkpoint_store=store)
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.aexecute({}, run_id="run2"))
+
+    skill = FlakyEchoSkill()
+    result = asyncio.run(GraphExecutor(workflow, [skill], MagicMock(), checkpoint_store=store).aresume("run2"))
+
+    assert skill.calls == ["summarize", "summarize+create"]
+    assert result["create"]["output"] == "summarize+create"
+
+
+def test_dag_resume_skips_completed_nodes_in_segment(tmp_path):
+    """DAGモードで区間内の完了済みノードを再実行しないかテスト"""
+    yaml_content = """
+name: DAG Checkpoint
+nodes:
+  - id: a
+    type: skill
+    skill: echo
+    params:
+      message: "a"
+    next: b
+  - id: b
+    type: skill
+    skill: echo
+    params:
+      message: "b"
+    next: c
+  - id: c
+    type: skill
+    skill: echo
+    params:
+      message: "{{a.output}}{{b.output}}"
+    next: end
+"""
+    store = CheckpointStore(tmp_path)
+    workflow = WorkflowLoader.load(yaml_content)
+
+    executor = GraphExecutor(
+        workflow, [FlakyEchoSkill(fail_on={"b"})], MagicMock(), scheduler="dag", checkpoint_store=store
+    )
+    with pytest.raises(RuntimeError):
+        executor.execute({}, run_id="dag1")
+    assert store.load("dag1")["completed"] == ["a"]
+
+    skill = FlakyEchoSkill()
+    result = GraphExecutor(workflow, [skill], MagicMock(), scheduler="dag", checkpoint_store=store).resume("dag1")
+
+    assert sorted(skill.calls) == ["ab", "b"]
+    assert result["c"]["output"] == "ab"
+
+
+def test_resume_rejects_other_workflow(tmp_path):
+    """別のワークフローのチェックポイントでは再開できないかテスト"""
+    store = CheckpointStore(tmp_path)
+    GraphExecutor(WorkflowLoader.load(YAML), [FlakyEchoSkill()], MagicMock(), checkpoint_store=store).execute({}, run_id="r")
+
+    other = WorkflowLoader.load(YAML.replace("Checkpoint Test", "Other"))
+    with pytest.raises(ValueError):
+        GraphExecutor(other, [FlakyEchoSkill()], MagicMock(), checkpoint_store=store).resume("r")
+
+
+def test_invalid_run_id(tmp_path):
+    """パスを含むrun_idを拒否するかテスト"""
+    with pytest.raises(ValueError):
+        CheckpointStore(tmp_path).load("../secret")
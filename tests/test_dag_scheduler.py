@@ -0,0 +1,195 @@
+"""
+DAGスケジューラ（scheduler="dag"）のテスト
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock, Mock
+
+from ai_agent_work_base.engine.dag import build_segment, node_references, segment_dependencies
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills.basic import EchoSkill
+
+
+class SlowEchoSkill(EchoSkill):
+    """同時実行数と実行順を記録するテスト用スキル"""
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.order = []
+        self._lock = threading.Lock()
+
+    def execute(self, message: str, **kwargs) -> str:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.order.append(message)
+        if message == "bad":
+            raise RuntimeError("node failed")
+        return message
+
+
+WIDE_YAML = """
+name: Wide Flow
+nodes:
+  - id: a
+    type: skill
+    skill: echo
+    params:
+      message: "{{inputs.x}}-a"
+    next: b
+  - id: b
+    type: skill
+    skill: echo
+    params:
+      message: "{{inputs.x}}-b"
+    next: c
+  - id: c
+    type: skill
+    skill: echo
+    params:
+      message: "{{a.output}}+{{b.output}}"
+    next: end
+"""
+
+
+def test_node_references():
+    """テンプレート参照と condition の source から依存先を抽出できるかテスト"""
+    workflow = WorkflowLoader.load("workflows/presentation.yaml")
+    node_map = {n.id: n for n in workflow.nodes}
+
+    assert node_references(node_map["judge_depth"]) == {"inputs", "research"}
+    assert node_references(node_map["route_research"]) == {"judge_depth"}
+    assert node_references(node_map["deep_research"]) == {"plan_queries"}
+
+
+def test_segment_dependencies():
+    """区間の切り出しと依存関係の推定が正しいかテスト"""
+    workflow = WorkflowLoader.load(WIDE_YAML)
+    node_map = {n.id: n for n in workflow.nodes}
+
+    segment, stop_node = build_segment(node_map, "a")
+
+    assert [n.id for n in segment] == ["a", "b", "c"]
+    assert stop_node is None
+    assert segment_dependencies(segment) == {"a": set(), "b": set(), "c": {"a", "b"}}
+
+
+def test_dag_runs_independent_nodes_concurrently():
+    """依存のないノードが同時に実行され、依存するノードは完了後に実行されるかテスト"""
+    workflow = WorkflowLoader.load(WIDE_YAML)
+    skill = SlowEchoSkill()
+    executor = GraphExecutor(workflow, [skill], MagicMock(), scheduler="dag")
+
+    result = executor.execute({"x": "v"})
+
+    assert result["c"]["output"] == "v-a+v-b"
+    assert skill.peak == 2
+    assert skill.order[-1] == "v-a+v-b"
+
+
+def test_dag_matches_sequential_result():
+    """DAGモードの結果が逐次実行と一致するかテスト"""
+    workflow = WorkflowLoader.load(WIDE_YAML)
+
+    sequential = GraphExecutor(workflow, [SlowEchoSkill(0)], MagicMock()).execute({"x": "v"})
+    dag = GraphExecutor(workflow, [SlowEchoSkill(0)], MagicMock(), scheduler="dag").execute({"x": "v"})
+
+    assert dag == sequential
+
+
+def test_dag_waits_for_hyphenated_node_id():
+    """ハイフンを含むノードIDへの参照も依存関係として扱い、逐次実行と同じ結果になるかテスト"""
+    workflow = WorkflowLoader.load("""
+name: Hyphen Flow
+nodes:
+  - id: step-a
+    type: skill
+    skill: echo
+    params:
+      message: "A"
+    next: step-b
+  - id: step-b
+    type: skill
+    skill: echo
+    params:
+      message: "got {{ step-a.output }}"
+    next: end
+""")
+    node_map = {n.id: n for n in workflow.nodes}
+    assert node_references(node_map["step-b"]) == {"step-a"}
+
+    sequential = GraphExecutor(workflow, [SlowEchoSkill(0)], MagicMock()).execute({})
+    dag = GraphExecutor(workflow, [SlowEchoSkill(0.05)], MagicMock(), scheduler="dag").execute({})
+
+    assert dag["step-b"]["output"] == sequential["step-b"]["output"] == "got A"
+
+
+def test_dag_honors_condition_branches():
+    """DAGモードでもconditionノードの分岐先だけが実行されるかテスト"""
+    yaml_content = """
+name: Branch Flow
+nodes:
+  - id: judge
+    type: llm
+    prompt: "judge"
+    next: route
+  - id: route
+    type: condition
+    params:
+      source: judge
+    branches:
+      deep: deep_step
+      shallow: shallow_step
+  - id: deep_step
+    type: skill
+    skill: echo
+    params:
+      message: "deep"
+    next: end
+  - id: shallow_step
+    type: skill
+    skill: echo
+    params:
+      message: "shallow"
+    next: end
+"""
+    mock_llm = MagicMock()
+    mock_llm.chat_completion.return_value = Mock(choices=[Mock(message=Mock(content="shallow"))])
+    workflow = WorkflowLoader.load(yaml_content)
+    executor = GraphExecutor(workflow, [EchoSkill()], mock_llm, scheduler="dag")
+
+    result = executor.execute({})
+
+    assert result["shallow_step"]["output"] == "shallow"
+    assert "deep_step" not in result
+
+
+def test_dag_propagates_error():
+    """DAGモードでノードが失敗した場合に例外が伝播し、依存ノードは実行されないかテスト"""
+    skill = SlowEchoSkill(0.01)
+    yaml_content = WIDE_YAML.replace('"{{inputs.x}}-a"', '"bad"')
+    executor = GraphExecutor(WorkflowLoader.load(yaml_content), [skill], MagicMock(), scheduler="dag")
+
+    with pytest.raises(RuntimeError, match="node failed"):
+        executor.execute({"x": "v"})
+    assert "v-a+v-b" not in skill.order
+
+
+def test_aexecute_dag_runs_independent_nodes_concurrently():
+    """aexecuteのDAGモードでも依存のないノードが同時に実行されるかテスト"""
+    workflow = WorkflowLoader.load(WIDE_YAML)
+    skill = SlowEchoSkill()
+    executor = GraphExecutor(workflow, [skill], MagicMock(), scheduler="dag")
+
+    result = asyncio.run(executor.aexecute({"x": "v"}))
+
+    assert result["c"]["output"] == "v-a+v-b"
+    assert skill.peak == 2
@@ -62,3 +62,21 @@ def test_executor_simple_flow():
     # contextの状態を確認
     assert result["step1"]["output"] == "LLM Result"
     assert result["step2"]["output"] == "executed with {'arg': 'LLM Result'}"
+
+def test_child_context_overlay():
+    """子コンテキストが親を参照しつつ、書き込みは子にのみ反映されるかテスト"""
+    parent = WorkflowContext({"topic": "AI"})
+    parent.set_step_output("step1", "parent output")
+
+    child = parent.child(item="x")
+    child.set_step_output("inner", "child output")
+
+    # 読み込みは親にフォールスルーする
+    assert child.resolve_template("{{inputs.topic}} {{step1.output}} {{item}}") == "AI parent output x"
+    assert child.get("inner.output") == "child output"
+    # 書き込みは親に漏れない
+    assert parent.get("item") is None
+    assert parent.get("inner.output") is None
+    # 親の更新は子からも見える（コピーではなく参照）
+    parent.set_step_output("step2", "later")
+    assert child.get("step2.output") == "later"
@@ -2,6 +2,8 @@
 foreachノードとLLMのJSON出力機能のテスト
 """
 import json
+import threading
+import time
 import pytest
 from unittest.mock import MagicMock, Mock, patch
 from ai_agent_work_base.engine.loader import WorkflowLoader
@@ -13,10 +15,12 @@ def make_mock_llm(responses: list):
     """複数のレスポンスを順番に返すモックLLMを作成する"""
     mock_llm = MagicMock()
     call_count = [0]
+    lock = threading.Lock()
 
     def mock_chat_completion(messages, model=None, response_format=None, **kwargs):
-        idx = call_count[0]
-        call_count[0] += 1
+        with lock:
+            idx = call_count[0]
+            call_count[0] += 1
         content = responses[idx] if idx < len(responses) else ""
         response = Mock()
         response.choices = [Mock(message=Mock(content=content))]
@@ -80,6 +84,97 @@ nodes:
         executor.execute({"not_a_list": "just a string"})
 
 
+class SlowEchoSkill(EchoSkill):
+    """同時実行数を記録しながら少し待ってから返すテスト用スキル"""
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def execute(self, message: str, **kwargs) -> str:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return message
+
+
+FOREACH_CONCURRENCY_YAML = """
+name: Foreach Concurrency Test
+nodes:
+  - id: search_all
+    type: foreach
+    items: "{{inputs.queries}}"
+    concurrency: 3
+    node:
+      type: skill
+      skill: echo
+      params:
+        message: "{{item}}"
+    next: end
+"""
+
+
+def test_foreach_concurrency_keeps_order_and_limit():
+    """concurrency指定時に上限を守って並行実行し、結果が入力順で返るかテスト"""
+    workflow = WorkflowLoader.load(FOREACH_CONCURRENCY_YAML)
+    skill = SlowEchoSkill()
+    executor = GraphExecutor(workflow, [skill], MagicMock())
+
+    queries = [f"query{i}" for i in range(7)]
+    result = executor.execute({"queries": queries})
+
+    assert result["search_all"]["output"] == queries
+    assert skill.peak == 3
+
+
+def test_foreach_concurrency_callbacks_fire_once_per_item():
+    """並行実行時もitem開始/終了コールバックが各要素につき1回ずつ呼ばれるかテスト"""
+    workflow = WorkflowLoader.load(FOREACH_CONCURRENCY_YAML)
+    starts, ends = [], []
+    executor = GraphExecutor(
+        workflow, [SlowEchoSkill(delay=0.01)], MagicMock(),
+        on_foreach_item_start=lambda node, idx, total, item: starts.append((idx, total, item)),
+        on_foreach_item_end=lambda node, idx, total, item, result: ends.append((idx, result)),
+    )
+
+    executor.execute({"queries": ["a", "b", "c", "d"]})
+
+    assert sorted(starts) == [(0, 4, "a"), (1, 4, "b"), (2, 4, "c"), (3, 4, "d")]
+    assert sorted(ends) == [(0, "a"), (1, "b"), (2, "c"), (3, "d")]
+
+
+def test_foreach_executor_default_concurrency():
+    """ノードでconcurrency未指定の場合はExecutorのmax_concurrencyが使われるかテスト"""
+    yaml_content = FOREACH_CONCURRENCY_YAML.replace("    concurrency: 3\n", "")
+    workflow = WorkflowLoader.load(yaml_content)
+    skill = SlowEchoSkill()
+    executor = GraphExecutor(workflow, [skill], MagicMock(), max_concurrency=2)
+
+    result = executor.execute({"queries": ["a", "b", "c", "d"]})
+
+    assert result["search_all"]["output"] == ["a", "b", "c", "d"]
+    assert skill.peak == 2
+
+
+def test_foreach_concurrency_propagates_error():
+    """並行実行中にitemが失敗した場合に例外が伝播するかテスト"""
+    class FailingSkill(EchoSkill):
+        def execute(self, message: str, **kwargs) -> str:
+            if message == "bad":
+                raise RuntimeError("item failed")
+            return message
+
+    workflow = WorkflowLoader.load(FOREACH_CONCURRENCY_YAML)
+    executor = GraphExecutor(workflow, [FailingSkill()], MagicMock())
+
+    with pytest.raises(RuntimeError, match="item failed"):
+        executor.execute({"queries": ["a", "bad", "c"]})
+
+
 # -----------------------------------------------------------------------
 # LLMのJSON出力対応
 # -----------------------------------------------------------------------
@@ -0,0 +1,299 @@
+"""
+JobQueue（Webhook用ジョブキュー）のテスト
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_agent_work_base.jobs import IdempotencyKeyConflictError, JobQueue, QueueFullError
+
+
+def test_workers_limit_concurrency():
+    """同時に実行されるジョブ数がワーカー数以下に抑えられるかテスト"""
+    running = 0
+    peak = 0
+
+    async def handler(workflow, inputs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"n": inputs["n"]}
+
+    async def main():
+        queue = JobQueue(handler, workers=2, maxsize=10)
+        submitted = [queue.submit("wf", {"n": i}) for i in range(6)]
+        for job in submitted:
+            await queue.wait(job)
+        await queue.stop()
+        return submitted
+
+    submitted = asyncio.run(main())
+    assert peak == 2
+    assert [job.result["n"] for job in submitted] == list(range(6))
+    assert all(job.status == "completed" for job in submitted)
+
+
+def test_queue_full_raises_with_retry_after():
+    """待ち件数が上限に達すると QueueFullError を送出するかテスト"""
+    async def handler(workflow, inputs):
+        await asyncio.sleep(1)
+        return {}
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=1)
+        queue.submit("wf", {"n": 1})
+        await asyncio.sleep(0)  # 1件目をワーカーに取り出させる
+        queue.submit("wf", {"n": 2})
+        with pytest.raises(QueueFullError) as exc_info:
+            queue.submit("wf", {"n": 3})
+        await queue.stop()
+        return exc_info.value
+
+    error = asyncio.run(main())
+    assert error.retry_after >= 1
+
+
+def test_failed_job_records_error():
+    """ハンドラーの例外がジョブのエラーとして記録されるかテスト"""
+    async def handler(workflow, inputs):
+        raise RuntimeError("boom")
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=1)
+        job = await queue.wait(queue.submit("wf", {}))
+        await queue.stop()
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == "failed"
+    assert job.error == "boom"
+
+
+def test_webhook_job_status_and_queue_full():
+    """202で返した job_id の結果を取得でき、満杯時は429を返すかテスト"""
+    from ai_agent_work_base import webhook
+
+    async def slow(workflow_name, inputs):
+        await asyncio.sleep(0.5)
+        return {}
+
+    with patch.object(webhook.runtime, "warm_up"), TestClient(webhook.app) as client:
+        with patch("ai_agent_work_base.webhook._run_workflow", return_value={"step": {"output": "ok"}}):
+            resp = client.post("/webhook", json={"workflow": "inquiry_response", "inputs": {}})
+            job_id = resp.json()["job_id"]
+            for _ in range(100):
+                data = client.get(f"/jobs/{job_id}").json()
+                if data["status"] == "completed":
+                    break
+                time.sleep(0.01)
+        assert data["status"] == "completed"
+        assert data["result"] == {"step": {"output": "ok"}}
+        assert client.get("/jobs/unknown").status_code == 404
+
+        queue = JobQueue(slow, workers=1, maxsize=1)
+        with patch.object(webhook, "jobs", queue):
+            statuses = [
+                client.post("/webhook", json={"workflow": "inquiry_response", "inputs": {"n": n}}).status_code
+                for n in range(3)
+            ]
+        assert statuses[-1] == 429
+
+
+def test_identical_inflight_requests_are_coalesced():
+    """同じワークフロー・入力のジョブが実行中なら新しく実行せず合流するかテスト"""
+    calls = []
+
+    async def handler(workflow, inputs):
+        calls.append(inputs)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def main():
+        queue = JobQueue(handler, workers=2, maxsize=10)
+        first = queue.submit("wf", {"a": 1, "b": 2})
+        second = queue.submit("wf", {"b": 2, "a": 1})
+        other = queue.submit("wf", {"a": 2})
+        await queue.wait(first)
+        await queue.wait(other)
+        # 完了後の同一リクエストは新しく実行する
+        third = queue.submit("wf", {"a": 1, "b": 2})
+        await queue.wait(third)
+        await queue.stop()
+        return first, second, other, third, queue
+
+    first, second, other, third, queue = asyncio.run(main())
+    assert second is first
+    assert first.requests == 2
+    assert other is not first
+    assert third is not first
+    assert len(calls) == 3
+    assert queue.stats()["coalesced"] == 1
+
+
+def test_idempotency_key_returns_stored_result():
+    """Idempotency-Key が一致すれば完了後も同じジョブを返し、失敗時は再実行できるかテスト"""
+    results = iter([{"n": 1}, RuntimeError("boom"), {"n": 3}])
+
+    async def handler(workflow, inputs):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=10, idempotency_ttl=60)
+        first = await queue.wait(queue.submit("wf", {"x": 1}, idempotency_key="k1"))
+        again = queue.submit("wf", {"x": 1}, idempotency_key="k1")
+        failed = await queue.wait(queue.submit("wf", {"x": 2}, idempotency_key="k2"))
+        retried = await queue.wait(queue.submit("wf", {"x": 2}, idempotency_key="k2"))
+        await queue.stop()
+        return first, again, failed, retried
+
+    first, again, failed, retried = asyncio.run(main())
+    assert again is first
+    assert again.result == {"n": 1}
+    assert failed.status == "failed"
+    assert retried is not failed
+    assert retried.result == {"n": 3}
+
+
+def test_idempotency_key_expires():
+    """TTLを過ぎた Idempotency-Key は新しいジョブとして扱うかテスト"""
+    async def handler(workflow, inputs):
+        return {}
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=10, idempotency_ttl=0.01)
+        first = await queue.wait(queue.submit("wf", {}, idempotency_key="k"))
+        await asyncio.sleep(0.02)
+        second = queue.submit("wf", {}, idempotency_key="k")
+        await queue.wait(second)
+        await queue.stop()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert second is not first
+
+
+def test_idempotency_key_recorded_when_joining_inflight_job():
+    """キーなしで投入された実行中のジョブに合流した Idempotency-Key も、完了後の再送で同じジョブを返すかテスト"""
+    calls = []
+
+    async def handler(workflow, inputs):
+        calls.append(inputs)
+        await asyncio.sleep(0.01)
+        return {"n": len(calls)}
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=10, idempotency_ttl=60)
+        first = queue.submit("wf", {"x": 1})
+        joined = queue.submit("wf", {"x": 1}, idempotency_key="k")
+        await queue.wait(first)
+        retried = queue.submit("wf", {"x": 1}, idempotency_key="k")
+        with pytest.raises(IdempotencyKeyConflictError):
+            queue.submit("wf", {"x": 2}, idempotency_key="k")
+        await queue.stop()
+        return first, joined, retried
+
+    first, joined, retried = asyncio.run(main())
+    assert joined is first
+    assert retried is first
+    assert len(calls) == 1
+
+
+def test_webhook_idempotency_key_header():
+    """Idempotency-Key ヘッダーが同じリクエストは同じ job_id を返すかテスト"""
+    from ai_agent_work_base import webhook
+
+    with patch.object(webhook.runtime, "warm_up"), TestClient(webhook.app) as client:
+        with patch("ai_agent_work_base.webhook._run_workflow", return_value={}) as mock_run:
+            body = {"workflow": "inquiry_response", "inputs": {"inquiry": "同じ内容"}, "async_run": False}
+            first = client.post("/webhook", json=body, headers={"Idempotency-Key": "abc"}).json()
+            second = client.post("/webhook", json=body, headers={"Idempotency-Key": "abc"}).json()
+    assert second["job_id"] == first["job_id"]
+    assert second["coalesced"] is True
+    assert mock_run.call_count == 1
+
+
+def test_idempotency_key_reused_with_different_payload_is_rejected():
+    """同じ Idempotency-Key を別のワークフロー・入力で使った場合は既存のジョブを返さず拒否するかテスト"""
+    async def handler(workflow, inputs):
+        return {}
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=10, idempotency_ttl=60)
+        first = await queue.wait(queue.submit("wf", {"x": 1}, idempotency_key="k"))
+        with pytest.raises(IdempotencyKeyConflictError):
+            queue.submit("wf", {"x": 2}, idempotency_key="k")
+        with pytest.raises(IdempotencyKeyConflictError):
+            queue.submit("other", {"x": 1}, idempotency_key="k")
+        again = queue.submit("wf", {"x": 1}, idempotency_key="k")
+        await queue.stop()
+        return first, again
+
+    first, again = asyncio.run(main())
+    assert again is first
+
+    from ai_agent_work_base import webhook
+
+    with patch.object(webhook.runtime, "warm_up"), TestClient(webhook.app) as client:
+        with patch("ai_agent_work_base.webhook._run_workflow", return_value={}) as mock_run:
+            headers = {"Idempotency-Key": "conflict"}
+            body = {"workflow": "inquiry_response", "inputs": {"inquiry": "A"}, "async_run": False}
+            assert client.post("/webhook", json=body, headers=headers).status_code == 202
+            body["inputs"] = {"inquiry": "B"}
+            response = client.post("/webhook", json=body, headers=headers)
+    assert response.status_code == 422
+    assert mock_run.call_count == 1
+
+
+def test_job_events_replay_and_thread_safe_emit():
+    """別スレッドから発行したイベントを順序どおり受け取り、完了後に購読した場合は token 以外を最初から受け取れるかテスト"""
+    from ai_agent_work_base.jobs import current_job
+
+    async def handler(workflow, inputs):
+        job = current_job.get()
+        job.emit("node_start", {"node_id": "a"})
+        await asyncio.to_thread(job.emit, "token", {"node_id": "a", "delta": "x"})
+        job.emit("node_end", {"node_id": "a"})
+        return {"a": "x"}
+
+    async def main():
+        queue = JobQueue(handler, workers=1, maxsize=10)
+        job = queue.submit("wf", {})
+        live = [event async for event, _ in job.events()]
+        replay = [event async for event, _ in job.events()]
+        await queue.stop()
+        return live, replay
+
+    live, replay = asyncio.run(main())
+    assert live == ["started", "node_start", "token", "node_end", "completed"]
+    # 完了したジョブの履歴には token を残さない
+    assert replay == ["started", "node_start", "node_end", "completed"]
+
+
+def test_webhook_job_events_stream():
+    """GET /jobs/{job_id}/events がSSEで進捗を配信するかテスト"""
+    from ai_agent_work_base import webhook
+    from ai_agent_work_base.jobs import current_job
+
+    async def fake_run(workflow_name, inputs):
+        current_job.get().emit("node_end", {"node_id": "summarize", "output": "要約"})
+        return {"summarize": "要約"}
+
+    with patch.object(webhook.runtime, "warm_up"), TestClient(webhook.app) as client:
+        with patch("ai_agent_work_base.webhook._run_workflow", side_effect=fake_run):
+            job_id = client.post("/webhook", json={"workflow": "inquiry_response", "inputs": {"sse": 1}}).json()["job_id"]
+            with client.stream("GET", f"/jobs/{job_id}/events") as resp:
+                assert resp.headers["content-type"].startswith("text/event-stream")
+                body = "".join(resp.iter_text())
+        assert client.get("/jobs/unknown/events").status_code == 404
+
+    events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert events == ["started", "node_end", "completed"]
+    assert '"output": "要約"' in body
@@ -0,0 +1,314 @@
+"""
+LLMレスポンスキャッシュのテスト
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from openai.types.chat import ChatCompletion
+
+from ai_agent_work_base.core.llm import LLMClient
+from ai_agent_work_base.core.llm_cache import (
+    MemoryResponseCache,
+    SingleFlight,
+    SQLiteResponseCache,
+    create_response_cache_from_env,
+    make_request_key,
+)
+
+
+def make_completion(content: str = "hello", finish_reason: str = "stop") -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-test",
+        "choices": [{
+            "index": 0,
+            "finish_reason": finish_reason,
+            "message": {"role": "assistant", "content": content},
+        }],
+    })
+
+
+def make_client(monkeypatch, cache, response=None) -> LLMClient:
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    client = LLMClient(model="gpt-test", cache=cache)
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = response or make_completion()
+    client._async_client = MagicMock()
+    client._async_client.chat.completions.create = AsyncMock(return_value=response or make_completion())
+    return client
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryResponseCache()
+    return SQLiteResponseCache(tmp_path / "llm.sqlite3")
+
+
+def test_request_key_is_normalized():
+    """キーが辞書のキー順に依存しないかテスト"""
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+    b = {"messages": [{"content": "hi", "role": "user"}], "model": "m"}
+    assert make_request_key(a) == make_request_key(b)
+    assert make_request_key(a) != make_request_key({**a, "model": "other"})
+
+
+def test_chat_completion_is_served_from_cache(monkeypatch, cache):
+    """同一リクエストの2回目はAPIを呼ばずにキャッシュから返すかテスト"""
+    client = make_client(monkeypatch, cache)
+    messages = [{"role": "user", "content": "hi"}]
+
+    first = client.chat_completion(messages=messages)
+    second = client.chat_completion(messages=messages)
+
+    assert client.client.chat.completions.create.call_count == 1
+    assert second.choices[0].message.content == first.choices[0].message.content == "hello"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # response_format が異なれば別のキーになる
+    client.chat_completion(messages=messages, response_format={"type": "json_object"})
+    assert client.client.chat.completions.create.call_count == 2
+
+
+def test_async_and_sync_share_cache(monkeypatch, cache):
+    """achat_completion も同じキャッシュを使うかテスト"""
+    client = make_client(monkeypatch, cache)
+    messages = [{"role": "user", "content": "hi"}]
+
+    client.chat_completion(messages=messages)
+    result = asyncio.run(client.achat_completion(messages=messages))
+
+    assert result.choices[0].message.content == "hello"
+    client._async_client.chat.completions.create.assert_not_awaited()
+
+
+def test_truncated_response_is_not_cached(monkeypatch, cache):
+    """finish_reason が length の応答は保存しないかテスト"""
+    client = make_client(monkeypatch, cache, response=make_completion(finish_reason="length"))
+    messages = [{"role": "user", "content": "hi"}]
+
+    client.chat_completion(messages=messages)
+    client.chat_completion(messages=messages)
+
+    assert client.client.chat.completions.create.call_count == 2
+
+
+def test_ttl_and_purge(cache):
+    """TTL切れのエントリがヒットせず、purge で削除されるかテスト"""
+    cache.ttl = 0.05
+    cache.set("old", "1")
+    time.sleep(0.1)
+    cache.ttl = None
+    cache.set("new", "2")
+
+    assert cache.get("old") is None
+    assert cache.get("new") == "2"
+    assert cache.purge(expired_only=True) in (0, 1)
+    assert cache.purge() >= 1
+    assert cache.get("new") is None
+
+
+def test_max_entries_eviction(cache):
+    """最大件数を超えた場合に最も古く使われたエントリから削除するかテスト"""
+    cache.max_entries = 2
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    """同じSQLiteファイルを開いた別インスタンス間でエントリと統計を共有するかテスト"""
+    path = tmp_path / "llm.sqlite3"
+    SQLiteResponseCache(path).set("k", "v")
+
+    other = SQLiteResponseCache(path)
+    assert other.get("k") == "v"
+    other.close()
+    assert SQLiteResponseCache(path).stats()["hits"] == 1
+
+
+def test_sqlite_get_does_not_write_until_flushed(tmp_path):
+    """get() はファイルに書き込まず、統計は flush_interval ごと・stats() でまとめて反映されるかテスト"""
+    path = tmp_path / "llm.sqlite3"
+    cache = SQLiteResponseCache(path, flush_interval=3600)
+    cache.set("k", "v")
+    reader = SQLiteResponseCache(path)
+
+    for _ in range(3):
+        assert cache.get("k") == "v"
+    assert cache.get("missing") is None
+    assert reader.stats()["hits"] == 0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+    assert reader.stats()["hits"] == 3
+
+    cache.flush_interval = 0
+    cache.get("k")
+    assert reader.stats()["hits"] == 4
+
+
+def test_create_from_env(monkeypatch, tmp_path):
+    """環境変数 LLM_CACHE からバックエンドを選択するかテスト"""
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    assert create_response_cache_from_env() is None
+
+    monkeypatch.setenv("LLM_CACHE", "sqlite")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "c.sqlite3"))
+    monkeypatch.setenv("LLM_CACHE_TTL", "60")
+    cache = create_response_cache_from_env()
+    assert isinstance(cache, SQLiteResponseCache)
+    assert cache.ttl == 60
+
+    monkeypatch.setenv("LLM_CACHE", "redis")
+    with pytest.raises(ValueError):
+        create_response_cache_from_env()
+
+
+def make_flight_client(monkeypatch) -> LLMClient:
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    client = LLMClient(model="gpt-test", single_flight=SingleFlight())
+    client.client = MagicMock()
+    client._async_client = MagicMock()
+    return client
+
+
+def test_concurrent_identical_calls_share_one_request(monkeypatch):
+    """実行中の同一リクエストに相乗りし、API呼び出しが1回になるかテスト"""
+    client = make_flight_client(monkeypatch)
+    release = threading.Event()
+
+    def create(**params):
+        release.wait(5)
+        return make_completion()
+
+    client.client.chat.completions.create.side_effect = create
+    messages = [{"role": "user", "content": "hi"}]
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.chat_completion(messages=messages)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    while client.single_flight.stats()["waiting"] < 2:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert client.client.chat.completions.create.call_count == 1
+    assert len(results) == 3 and results[0] is results[1] is results[2]
+    assert client.single_flight.stats() == {"inflight": 0, "waiting": 0, "saved_calls": 2}
+
+    # 完了後の同一リクエストは（キャッシュが無効なので）改めて呼ぶ
+    client.chat_completion(messages=messages)
+    assert client.client.chat.completions.create.call_count == 2
+
+
+def test_async_single_flight_keys_on_response_format(monkeypatch):
+    """response_format が異なるリクエストは相乗りしないかテスト"""
+    client = make_flight_client(monkeypatch)
+
+    async def create(**params):
+        await asyncio.sleep(0.05)
+        return make_completion()
+
+    client._async_client.chat.completions.create = AsyncMock(side_effect=create)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def run():
+        return await asyncio.gather(
+            client.achat_completion(messages=messages),
+            client.achat_completion(messages=messages),
+            client.achat_completion(messages=messages, response_format={"type": "json_object"}),
+        )
+
+    asyncio.run(run())
+    assert client._async_client.chat.completions.create.await_count == 2
+    assert client.single_flight.saved_calls == 1
+
+
+def test_single_flight_shares_errors_and_stream(monkeypatch):
+    """leader の例外は相乗りした呼び出しにも伝わり、ストリーミングの相乗りは全文を1回で受け取るかテスト"""
+    client = make_flight_client(monkeypatch)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def failing(**params):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    client._async_client.chat.completions.create = AsyncMock(side_effect=failing)
+
+    async def run_failing():
+        return await asyncio.gather(
+            client.achat_completion(messages=messages),
+            client.achat_completion(messages=messages),
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(run_failing())
+    assert [str(e) for e in errors] == ["boom", "boom"]
+    assert client.single_flight.stats()["inflight"] == 0
+
+    async def leader_call():
+        return await client.achat_completion(messages=messages)
+
+    follower_deltas = []
+
+    async def slow(**params):
+        await asyncio.sleep(0.05)
+        return make_completion("streamed")
+
+    client._async_client.chat.completions.create = AsyncMock(side_effect=slow)
+
+    async def run_stream():
+        return await asyncio.gather(
+            leader_call(),
+            client.astream_chat_completion(messages=messages, on_delta=follower_deltas.append),
+        )
+
+    first, second = asyncio.run(run_stream())
+    assert first is second
+    assert follower_deltas == ["streamed"]
+
+
+def test_cancelled_leader_lets_followers_retry(monkeypatch):
+    """leader がキャンセルされた場合、相乗りしていた呼び出しが自分で呼び直すかテスト"""
+    client = make_flight_client(monkeypatch)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def create(**params):
+        await asyncio.sleep(0.05)
+        return make_completion()
+
+    client._async_client.chat.completions.create = AsyncMock(side_effect=create)
+
+    async def run():
+        leader = asyncio.create_task(client.achat_completion(messages=messages))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(client.achat_completion(messages=messages))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    result = asyncio.run(run())
+    assert result.choices[0].message.content == "hello"
+    assert client._async_client.chat.completions.create.await_count == 2
+    assert client.single_flight.saved_calls == 0
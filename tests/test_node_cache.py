@@ -0,0 +1,230 @@
+"""
+ノード結果キャッシュのテスト
+"""
+import asyncio
+import time
+
+from unittest.mock import AsyncMock, MagicMock
+
+from ai_agent_work_base.engine.cache import NodeResultCache, make_cache_key
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills.basic import EchoSkill
+from ai_agent_work_base.skills.file import FileWriteSkill
+
+
+class CountingEchoSkill(EchoSkill):
+    """呼び出し回数を記録するテスト用スキル"""
+    def __init__(self):
+        self.calls = 0
+
+    def execute(self, message: str, **kwargs) -> str:
+        self.calls += 1
+        return message
+
+
+def make_llm(content: str = "answer"):
+    llm = MagicMock()
+    llm.model = "gpt-4o"
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    llm.chat_completion.return_value = response
+    llm.achat_completion = AsyncMock(return_value=response)
+    return llm
+
+
+SKILL_WORKFLOW = """
+name: Cache Test
+nodes:
+  - id: step1
+    type: skill
+    skill: echo
+    params:
+      message: "{{inputs.text}}"
+    cache:
+      ttl: 60
+    next: end
+"""
+
+
+def test_cache_key_is_stable():
+    """キーが辞書の順序に依存しないかテスト"""
+    assert make_cache_key({"a": 1, "b": 2}) == make_cache_key({"b": 2, "a": 1})
+    assert make_cache_key({"a": 1}) != make_cache_key({"a": 2})
+
+
+def test_skill_node_result_is_reused(tmp_path):
+    """同じ入力での再実行時にスキルが呼ばれないかテスト"""
+    skill = CountingEchoSkill()
+    cache = NodeResultCache(directory=tmp_path)
+    executor = GraphExecutor(WorkflowLoader.load(SKILL_WORKFLOW), [skill], MagicMock(), cache=cache)
+
+    assert executor.execute({"text": "hello"})["step1"]["output"] == "hello"
+    assert executor.execute({"text": "hello"})["step1"]["output"] == "hello"
+    assert skill.calls == 1
+
+    # 入力が変わればキーも変わる
+    assert executor.execute({"text": "other"})["step1"]["output"] == "other"
+    assert skill.calls == 2
+
+
+def test_disk_tier_survives_new_cache_instance(tmp_path):
+    """ディスク層に保存した結果を別のキャッシュインスタンスから読めるかテスト"""
+    workflow = WorkflowLoader.load(SKILL_WORKFLOW)
+    GraphExecutor(workflow, [CountingEchoSkill()], MagicMock(), cache=NodeResultCache(directory=tmp_path)).execute({"text": "hi"})
+
+    skill = CountingEchoSkill()
+    executor = GraphExecutor(workflow, [skill], MagicMock(), cache=NodeResultCache(directory=tmp_path))
+    assert executor.execute({"text": "hi"})["step1"]["output"] == "hi"
+    assert skill.calls == 0
+
+
+def test_llm_node_key_includes_model(tmp_path):
+    """LLMノードは解決済みプロンプトとモデルをキーに含めるかテスト"""
+    yaml_content = """
+name: LLM Cache
+nodes:
+  - id: ask
+    type: llm
+    prompt: "Q: {{inputs.q}}"
+    cache: {}
+    next: end
+"""
+    workflow = WorkflowLoader.load(yaml_content)
+    cache = NodeResultCache(directory=tmp_path)
+    llm = make_llm()
+
+    GraphExecutor(workflow, [], llm, cache=cache).execute({"q": "x"})
+    GraphExecutor(workflow, [], llm, cache=cache).execute({"q": "x"})
+    assert llm.chat_completion.call_count == 1
+
+    other_llm = make_llm()
+    other_llm.model = "gpt-4o-mini"
+    GraphExecutor(workflow, [], other_llm, cache=cache).execute({"q": "x"})
+    assert other_llm.chat_completion.call_count == 1
+
+
+def test_async_execution_uses_cache(tmp_path):
+    """aexecute() でもキャッシュが使われるかテスト"""
+    skill = CountingEchoSkill()
+    executor = GraphExecutor(
+        WorkflowLoader.load(SKILL_WORKFLOW), [skill], MagicMock(), cache=NodeResultCache(directory=tmp_path)
+    )
+
+    executor.execute({"text": "hello"})
+    result = asyncio.run(executor.aexecute({"text": "hello"}))
+
+    assert result["step1"]["output"] == "hello"
+    assert skill.calls == 1
+
+
+def test_side_effect_skill_is_not_cached(tmp_path):
+    """副作用のあるスキルは cache 設定があってもキャッシュしないかテスト"""
+    yaml_content = f"""
+name: Write
+nodes:
+  - id: write
+    type: skill
+    skill: file_write
+    params:
+      file_path: "{tmp_path / 'out.txt'}"
+      content: "{{{{inputs.text}}}}"
+    cache:
+      ttl: 60
+    next: end
+"""
+    cache = NodeResultCache(directory=tmp_path / "cache")
+    executor = GraphExecutor(WorkflowLoader.load(yaml_content), [FileWriteSkill()], MagicMock(), cache=cache)
+
+    executor.execute({"text": "first"})
+    (tmp_path / "out.txt").unlink()
+    executor.execute({"text": "first"})
+
+    assert (tmp_path / "out.txt").read_text() == "first"
+
+
+def test_foreach_node_is_cached(tmp_path):
+    """foreachノードは要素ごとに解決した入力と子ノード定義をキーに結果全体をキャッシュするかテスト"""
+    yaml_content = """
+name: Foreach Cache
+nodes:
+  - id: loop
+    type: foreach
+    items: "{{inputs.items}}"
+    cache: {}
+    node:
+      type: skill
+      skill: echo
+      params:
+        message: "{{item}}"
+    next: end
+"""
+    skill = CountingEchoSkill()
+    executor = GraphExecutor(
+        WorkflowLoader.load(yaml_content), [skill], MagicMock(), cache=NodeResultCache(directory=tmp_path)
+    )
+
+    executor.execute({"items": ["a", "b"]})
+    result = executor.execute({"items": ["a", "b"]})
+
+    assert result["loop"]["output"] == ["a", "b"]
+    assert skill.calls == 2
+
+
+def test_foreach_key_includes_values_referenced_by_inline_node(tmp_path):
+    """同じ items でもインラインノードが参照する inputs が異なればキャッシュを使わないかテスト"""
+    yaml_content = """
+name: Foreach Inline Reference
+nodes:
+  - id: analyze_each
+    type: foreach
+    items: "{{inputs.items}}"
+    cache: {}
+    node:
+      type: llm
+      prompt: "{{item}} for {{inputs.topic}}"
+    next: end
+"""
+    llm = make_llm()
+    executor = GraphExecutor(WorkflowLoader.load(yaml_content), [], llm, cache=NodeResultCache(directory=tmp_path))
+
+    executor.execute({"items": ["a"], "topic": "cats"})
+    executor.execute({"items": ["a"], "topic": "dogs"})
+    executor.execute({"items": ["a"], "topic": "cats"})
+
+    prompts = [c.kwargs["messages"][0]["content"] for c in llm.chat_completion.call_args_list]
+    assert prompts == ["a for cats", "a for dogs"]
+
+
+def test_ttl_expiry():
+    """TTLを過ぎたエントリが破棄されるかテスト"""
+    cache = NodeResultCache()
+    cache.set("k", "v", ttl=0.05)
+    assert cache.get("k") == (True, "v")
+    time.sleep(0.1)
+    assert cache.get("k") == (False, None)
+
+
+def test_memory_lru_eviction():
+    """メモリ層が件数上限を超えると最も古く使われたエントリから破棄するかテスト"""
+    cache = NodeResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+
+
+def test_disk_size_bound(tmp_path):
+    """ディスク層が合計サイズ上限内に収まるかテスト"""
+    cache = NodeResultCache(directory=tmp_path, max_entries=1, max_disk_bytes=500)
+    for i in range(20):
+        cache.set(f"{i:02d}key", "x" * 100)
+
+    total = sum(p.stat().st_size for p in tmp_path.glob("*/*.json"))
+    assert total <= 500
+    # 最後に書き込んだエントリは残っている
+    assert NodeResultCache(directory=tmp_path).get("19key") == (True, "x" * 100)
@@ -0,0 +1,140 @@
+"""
+parallelノードのテスト
+"""
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills.basic import EchoSkill
+
+
+class SleepSkill(EchoSkill):
+    """message に応じて待機・失敗し、同時実行数を記録するテスト用スキル"""
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def execute(self, message: str, **kwargs) -> str:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if message == "bad":
+                raise RuntimeError("item failed")
+            time.sleep(0.5 if message == "slow" else 0.05)
+            return message
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def make_workflow(extra: str = ""):
+    yaml_content = f"""
+name: Parallel Test
+nodes:
+  - id: fan_out
+    type: parallel
+    items: "{{{{inputs.queries}}}}"
+{extra}    node:
+      type: skill
+      skill: echo
+      params:
+        message: "{{{{item}}}}"
+    next: end
+"""
+    return WorkflowLoader.load(yaml_content)
+
+
+def test_parallel_runs_all_items_in_order():
+    """parallelノードが全要素を同時に実行し、結果を入力順で返すかテスト"""
+    skill = SleepSkill()
+    executor = GraphExecutor(make_workflow(), [skill], MagicMock())
+
+    result = executor.execute({"queries": ["a", "b", "c", "d"]})
+
+    assert result["fan_out"]["output"] == ["a", "b", "c", "d"]
+    assert skill.peak == 4
+
+
+def test_parallel_concurrency_limit():
+    """concurrency指定時に同時実行数が上限を超えないかテスト"""
+    skill = SleepSkill()
+    executor = GraphExecutor(make_workflow("    concurrency: 2\n"), [skill], MagicMock())
+
+    result = executor.execute({"queries": ["a", "b", "c", "d", "e"]})
+
+    assert result["fan_out"]["output"] == ["a", "b", "c", "d", "e"]
+    assert skill.peak == 2
+
+
+def test_parallel_fail_fast_raises():
+    """on_error: fail_fast（デフォルト）で1要素が失敗すると例外が送出されるかテスト"""
+    executor = GraphExecutor(make_workflow(), [SleepSkill()], MagicMock())
+
+    with pytest.raises(RuntimeError, match="item failed"):
+        executor.execute({"queries": ["a", "bad", "c"]})
+
+
+def test_parallel_collect_errors():
+    """on_error: collect で失敗した要素がエラー情報として結果に含まれるかテスト"""
+    executor = GraphExecutor(make_workflow("    on_error: collect\n"), [SleepSkill()], MagicMock())
+
+    result = executor.execute({"queries": ["a", "bad", "c"]})
+
+    outputs = result["fan_out"]["output"]
+    assert outputs[0] == "a"
+    assert outputs[1] == {"error": "RuntimeError: item failed"}
+    assert outputs[2] == "c"
+
+
+def test_parallel_timeout_per_item():
+    """timeoutを超えた要素がタイムアウトとして扱われるかテスト"""
+    executor = GraphExecutor(
+        make_workflow("    timeout: 0.1\n    on_error: collect\n"), [SleepSkill()], MagicMock()
+    )
+
+    started = time.monotonic()
+    result = executor.execute({"queries": ["a", "slow"]})
+    elapsed = time.monotonic() - started
+
+    outputs = result["fan_out"]["output"]
+    assert outputs[0] == "a"
+    assert outputs[1]["error"].startswith("TimeoutError")
+    # タイムアウトした要素の完了を待たずに次へ進む
+    assert elapsed < 0.4
+
+
+def test_parallel_timeout_fail_fast_raises():
+    """fail_fastでタイムアウトした場合にTimeoutErrorが送出されるかテスト"""
+    executor = GraphExecutor(make_workflow("    timeout: 0.1\n"), [SleepSkill()], MagicMock())
+
+    with pytest.raises(TimeoutError, match="fan_out"):
+        executor.execute({"queries": ["a", "slow"]})
+
+
+def test_parallel_empty_items():
+    """itemsが空リストの場合は空リストを返すかテスト"""
+    executor = GraphExecutor(make_workflow(), [SleepSkill()], MagicMock())
+
+    result = executor.execute({"queries": []})
+
+    assert result["fan_out"]["output"] == []
+
+
+def test_parallel_sync_execute_inside_running_loop_raises():
+    """イベントループ上で execute() を呼んだ場合は aexecute() を案内するエラーになるかテスト"""
+    import asyncio
+
+    executor = GraphExecutor(make_workflow(), [SleepSkill()], MagicMock())
+
+    async def main():
+        executor.execute({"queries": ["a"]})
+
+    with pytest.raises(RuntimeError, match="aexecute"):
+        asyncio.run(main())
+    assert asyncio.run(executor.aexecute({"queries": ["a"]}))["fan_out"]["output"] == ["a"]
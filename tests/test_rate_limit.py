@@ -0,0 +1,172 @@
+"""
+LLM API のレート制限スケジューラーのテスト
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from openai import RateLimitError
+from unittest.mock import AsyncMock, MagicMock
+
+from ai_agent_work_base.core.llm import LLMClient
+from ai_agent_work_base.core.rate_limit import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    RateLimitScheduler,
+    _parse_limits,
+    estimate_tokens,
+    is_quota_exhausted,
+    resolve_priority,
+    retry_after_hint,
+)
+
+
+def make_rate_limit_error(headers=None, code=None) -> RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    body = {"message": "rate limited", "code": code} if code else None
+    return RateLimitError("rate limited", response=response, body=body)
+
+
+def test_retry_after_hint_reads_reset_headers():
+    """サーバーが返すリセット時間のヘッダーを秒に変換できるかテスト"""
+    assert retry_after_hint(make_rate_limit_error({"retry-after-ms": "250"})) == 0.25
+    assert retry_after_hint(make_rate_limit_error({"retry-after": "2"})) == 2.0
+    assert retry_after_hint(make_rate_limit_error({
+        "x-ratelimit-reset-requests": "1m30s",
+        "x-ratelimit-reset-tokens": "250ms",
+    })) == 90.0
+    assert retry_after_hint(make_rate_limit_error()) is None
+
+
+def test_parse_limits_and_priority():
+    assert _parse_limits("gpt-4o=500/30000, gpt-4o-mini=/200000") == {
+        "gpt-4o": (500, 30000),
+        "gpt-4o-mini": (None, 200000),
+    }
+    with pytest.raises(ValueError):
+        _parse_limits("gpt-4o")
+    assert resolve_priority("batch") == PRIORITY_BATCH
+    assert resolve_priority(3) == 3
+    with pytest.raises(ValueError):
+        resolve_priority("urgent")
+
+
+def test_estimate_tokens_includes_completion_reserve():
+    params = {"model": "m", "messages": [{"role": "user", "content": "x" * 400}]}
+    assert estimate_tokens(params) == 100 + 4 + 256
+    assert estimate_tokens({**params, "max_tokens": 10}) == 100 + 4 + 10
+
+
+def test_requests_per_minute_are_enforced():
+    """RPM を使い切ると枠が補充されるまで待つかテスト"""
+    scheduler = RateLimitScheduler({"m": (600, None)})  # 0.1秒に1件
+    state = scheduler._state("m")
+    state.requests.level = 1
+    start = time.monotonic()
+    scheduler.call("m", 10, PRIORITY_INTERACTIVE, lambda: None)
+    scheduler.call("m", 10, PRIORITY_INTERACTIVE, lambda: None)
+    assert time.monotonic() - start >= 0.08
+    assert scheduler.stats()["m"]["granted"] == 2
+
+
+def test_tokens_are_reconciled_with_actual_usage():
+    scheduler = RateLimitScheduler({"m": (None, 1000)})
+    scheduler.acquire("m", 500)
+    scheduler.reconcile("m", 500, 100)
+    assert scheduler._state("m").tokens.level == pytest.approx(900, abs=5)
+    # usage が取れない場合は補正しない
+    scheduler.reconcile("m", 500, None)
+    assert scheduler._state("m").tokens.level == pytest.approx(900, abs=5)
+
+
+def test_interactive_calls_go_before_batch():
+    """枠待ちの間に来た interactive の呼び出しが先に実行されるかテスト"""
+    scheduler = RateLimitScheduler({"m": (600, None)})
+    scheduler._state("m").requests.level = 0
+    order = []
+
+    def run(name, priority, delay):
+        time.sleep(delay)
+        scheduler.call("m", 1, priority, lambda: order.append(name))
+
+    threads = [
+        threading.Thread(target=run, args=("batch-1", PRIORITY_BATCH, 0)),
+        threading.Thread(target=run, args=("batch-2", PRIORITY_BATCH, 0.01)),
+        threading.Thread(target=run, args=("interactive", PRIORITY_INTERACTIVE, 0.03)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert order[0] == "interactive"
+    assert order[1:] == ["batch-1", "batch-2"]
+
+
+def test_rate_limit_error_is_retried_after_reset_hint():
+    """429 でモデル全体の送信を止め、リセット後に再試行するかテスト"""
+    scheduler = RateLimitScheduler(max_retries=2, base_delay=0.01)
+    fn = MagicMock(side_effect=[make_rate_limit_error({"retry-after-ms": "100"}), "ok"])
+    start = time.monotonic()
+    assert scheduler.call("m", 1, PRIORITY_INTERACTIVE, fn) == "ok"
+    assert time.monotonic() - start >= 0.1
+    stats = scheduler.stats()["m"]
+    assert stats["throttled"] == 1
+    assert stats["retries"] == 1
+
+
+def test_rate_limit_error_is_raised_after_max_retries():
+    scheduler = RateLimitScheduler(max_retries=1, base_delay=0.01)
+    fn = MagicMock(side_effect=make_rate_limit_error())
+    with pytest.raises(RateLimitError):
+        scheduler.call("m", 1, PRIORITY_INTERACTIVE, fn)
+    assert fn.call_count == 2
+
+
+def test_quota_exhausted_error_is_not_retried():
+    """クォータ切れ（insufficient_quota）の 429 は再試行・送信停止せずにすぐ送出するかテスト"""
+    scheduler = RateLimitScheduler(max_retries=3, base_delay=0.01)
+    error = make_rate_limit_error({"retry-after": "30"}, code="insufficient_quota")
+    assert is_quota_exhausted(error)
+    assert not is_quota_exhausted(make_rate_limit_error())
+
+    fn = MagicMock(side_effect=error)
+    with pytest.raises(RateLimitError):
+        scheduler.call("m", 1, PRIORITY_INTERACTIVE, fn)
+    afn = AsyncMock(side_effect=error)
+    with pytest.raises(RateLimitError):
+        asyncio.run(scheduler.acall("m", 1, PRIORITY_INTERACTIVE, afn))
+
+    assert fn.call_count == 1 and afn.await_count == 1
+    stats = scheduler.stats()["m"]
+    assert stats["throttled"] == 0 and stats["retries"] == 0
+    assert scheduler._state("m").blocked_until == 0
+
+
+def test_async_call_retries_rate_limit_error():
+    scheduler = RateLimitScheduler(max_retries=2, base_delay=0.01)
+    fn = AsyncMock(side_effect=[make_rate_limit_error(), "ok"])
+    assert asyncio.run(scheduler.acall("m", 1, PRIORITY_INTERACTIVE, fn)) == "ok"
+    assert fn.await_count == 2
+
+
+def test_llm_client_goes_through_scheduler(monkeypatch):
+    """LLMClient の呼び出しがスケジューラーを通り、429 を再試行するかテスト"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    scheduler = RateLimitScheduler({"gpt-test": (None, 6000)}, base_delay=0.01)
+    client = LLMClient(model="gpt-test", cache=None, priority="batch", rate_limiter=scheduler)
+    assert client.priority == PRIORITY_BATCH
+    response = MagicMock()
+    response.usage.total_tokens = 50
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = [make_rate_limit_error(), response]
+
+    assert client.chat_completion([{"role": "user", "content": "hi"}]) is response
+    stats = scheduler.stats()["gpt-test"]
+    assert stats["granted"] == 2
+    assert stats["throttled"] == 1
+    # 2回目の見積もりは実際の usage（50トークン）で補正されている（429 になった1回目は見積もりのまま）
+    estimated = estimate_tokens({"messages": [{"role": "user", "content": "hi"}]})
+    assert scheduler._state("gpt-test").tokens.level == pytest.approx(6000 - estimated - 50, abs=10)
@@ -0,0 +1,119 @@
+"""
+Runtime（サーバー用の共有ランタイム）のテスト
+"""
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_agent_work_base.engine.registry import WorkflowRegistry
+from ai_agent_work_base.runtime import Runtime
+from ai_agent_work_base.skills import EchoSkill
+
+
+def write_workflow(path, name, message="hi"):
+    path.write_text(f"""
+name: "{name}"
+nodes:
+  - id: step1
+    type: skill
+    skill: echo
+    params:
+      message: "{message}"
+    next: end
+""", encoding="utf-8")
+
+
+@pytest.fixture
+def runtime(tmp_path):
+    write_workflow(tmp_path / "hello.yaml", "Hello")
+    registry = WorkflowRegistry(tmp_path, refresh_interval=0)
+    return Runtime(tmp_path, llm_client=MagicMock(), skills={"echo": EchoSkill()}, workflows=registry)
+
+
+def test_executor_is_reused(runtime):
+    """同じワークフローに対して同じ GraphExecutor を返すかテスト"""
+    executor = runtime.executor("hello")
+    assert runtime.executor("hello") is executor
+    assert executor.llm is runtime.llm
+    assert executor.execute({})["step1"] == {"output": "hi"}
+
+
+def test_executor_rebuilt_when_workflow_changes(runtime, tmp_path):
+    """ワークフロー定義が更新された場合は GraphExecutor を作り直すかテスト"""
+    executor = runtime.executor("hello")
+    path = tmp_path / "hello.yaml"
+    write_workflow(path, "Hello", message="updated")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    rebuilt = runtime.executor("hello")
+    assert rebuilt is not executor
+    assert rebuilt.execute({})["step1"] == {"output": "updated"}
+
+
+def test_warm_up_sets_ready(runtime):
+    """warm_up() で GraphExecutor が準備され ready になるかテスト"""
+    assert not runtime.ready
+    with patch("ai_agent_work_base.runtime.GraphExecutor") as executor_cls:
+        runtime.warm_up()
+    assert runtime.ready
+    executor_cls.assert_called_once()
+
+
+def test_warm_up_logs_failures_and_continues(runtime, caplog):
+    """LLMクライアントの準備に失敗してもログを出して残りを準備し、ready になるかテスト"""
+    runtime.llm.warm_up.side_effect = RuntimeError("no credentials")
+    with patch("ai_agent_work_base.runtime.GraphExecutor") as executor_cls, caplog.at_level("ERROR"):
+        runtime.warm_up()
+    assert runtime.ready
+    executor_cls.assert_called_once()
+    assert "LLMクライアントの準備に失敗しました" in caplog.text
+    assert "no credentials" in caplog.text
+
+
+def test_warm_up_with_backends_without_openai_api_key(tmp_path, monkeypatch):
+    """LLM_BACKENDS を設定し OPENAI_API_KEY がない場合も、各エンドポイントのクライアントを準備して ready になるかテスト"""
+    import ai_agent_work_base.core.backends as backends
+
+    write_workflow(tmp_path / "hello.yaml", "Hello")
+    config = tmp_path / "backends.yaml"
+    config.write_text("endpoints:\n  - name: local\n    base_url: http://localhost:8000/v1\n    api_key: dummy\n",
+                      encoding="utf-8")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    monkeypatch.setenv("LLM_BACKENDS", str(config))
+    monkeypatch.setattr(backends, "_default_pool", None)
+    runtime = Runtime(tmp_path, skills={"echo": EchoSkill()}, workflows=WorkflowRegistry(tmp_path, refresh_interval=0))
+
+    runtime.warm_up()
+
+    assert runtime.ready
+    assert runtime.llm._async_client is None
+    assert all(e._async_client is not None for e in runtime.llm.backends.endpoints)
+
+
+def test_ready_endpoint():
+    """ウォームアップ完了まで /ready が503を返すかテスト"""
+    from ai_agent_work_base import webhook
+
+    client = TestClient(webhook.app)
+    with patch.object(webhook.runtime, "_ready") as ready:
+        ready.is_set.return_value = False
+        assert client.get("/ready").status_code == 503
+        ready.is_set.return_value = True
+        resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "ready"
+
+
+def test_executor_with_extra_callbacks(runtime):
+    """追加のコールバックを指定すると共有インスタンスを変えずにコピーへ追加するかテスト"""
+    shared = runtime.executor("hello")
+    started = []
+    executor = runtime.executor("hello", on_node_start=lambda node: started.append(node.id))
+    assert executor is not shared
+    assert shared.on_node_start is None
+    executor.execute({})
+    assert started == ["step1"]
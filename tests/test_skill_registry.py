@@ -0,0 +1,146 @@
+"""
+SkillRegistry のテスト
+"""
+import subprocess
+import sys
+
+import pytest
+from unittest.mock import MagicMock
+
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills import SKILL_MANIFEST, SkillRegistry, get_skill_registry
+from ai_agent_work_base.skills.base import BaseSkill
+
+
+@pytest.mark.parametrize("name", list(SKILL_MANIFEST))
+def test_manifest_matches_implementation(name, monkeypatch):
+    """マニフェストの内容がスキルの実装と一致しているかテスト（スキル変更時の更新漏れ検出）"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    registry = SkillRegistry()
+    skill = registry.load_class(name)()
+    entry = SKILL_MANIFEST[name]
+
+    assert skill.name == name
+    assert skill.description == entry["description"]
+    assert skill.parameters == entry["parameters"]
+    assert skill.side_effect_free == entry["side_effect_free"]
+
+
+def test_all_skill_classes_are_in_manifest():
+    """BaseSkill のサブクラスがすべてマニフェストに登録されているかテスト"""
+    registry = SkillRegistry()
+    for name in registry:
+        registry.load_class(name)
+    implemented = {
+        cls.__name__ for cls in BaseSkill.__subclasses__()
+        if cls.__module__.startswith("ai_agent_work_base.skills.")
+    }
+    assert implemented <= {entry["class"] for entry in SKILL_MANIFEST.values()}
+
+
+def test_listing_does_not_import_skill_modules():
+    """スキル一覧の取得と存在確認ではスキルのモジュールをimportしないかテスト"""
+    code = (
+        "import sys\n"
+        "from ai_agent_work_base.skills import get_skill_registry\n"
+        "registry = get_skill_registry()\n"
+        "assert [s.name for s in registry.specs()]\n"
+        "assert 'web_search' in registry\n"
+        "loaded = [m for m in ('pptx', 'tavily', 'smtplib', 'ai_agent_work_base.skills.research') if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_instance_is_created_once():
+    """初回アクセス時にインスタンス化し、以降は同じインスタンスを返すかテスト"""
+    registry = SkillRegistry()
+    assert registry.loaded() == []
+
+    echo = registry["echo"]
+    assert registry["echo"] is echo
+    assert registry.loaded() == ["echo"]
+    assert "missing" not in registry
+    with pytest.raises(KeyError):
+        registry["missing"]
+
+
+def test_registered_instance_takes_precedence():
+    """register() で登録したインスタンスを返すかテスト"""
+    registry = SkillRegistry()
+    custom = MagicMock(spec=BaseSkill)
+    custom.name = "echo"
+    registry.register(custom)
+    assert registry["echo"] is custom
+
+
+def test_executor_accepts_registry():
+    """GraphExecutor にレジストリを渡すと、使用するスキルだけがインスタンス化されるかテスト"""
+    yaml_content = """
+name: Registry Test
+nodes:
+  - id: step1
+    type: skill
+    skill: reverse
+    params:
+      text: "abc"
+    next: end
+"""
+    registry = SkillRegistry()
+    executor = GraphExecutor(WorkflowLoader.load(yaml_content), registry, MagicMock())
+
+    result = executor.execute({})
+
+    assert result["step1"]["output"] == "cba"
+    assert registry.loaded() == ["reverse"]
+
+
+def test_cache_check_does_not_instantiate_skills(tmp_path):
+    """cache 指定ノードの副作用判定はマニフェストで行い、スキルを生成しないかテスト"""
+    from ai_agent_work_base.engine.cache import NodeResultCache
+
+    yaml_content = """
+name: Registry Cache Test
+nodes:
+  - id: search
+    type: skill
+    skill: web_search
+    params:
+      query: "AI"
+    cache: {}
+    next: write
+  - id: write
+    type: skill
+    skill: file_write
+    params:
+      path: "out.txt"
+      content: "x"
+    cache: {}
+    next: end
+"""
+    registry = SkillRegistry()
+    executor = GraphExecutor(
+        WorkflowLoader.load(yaml_content), registry, MagicMock(), cache=NodeResultCache(directory=tmp_path)
+    )
+
+    assert executor._cacheable == {"search"}
+    assert registry.loaded() == []
+
+
+def test_web_search_skill_without_api_key(monkeypatch):
+    """TAVILY_API_KEY がなくてもインスタンス化でき、クライアントは初回検索時に生成されるかテスト"""
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    skill = SkillRegistry()["web_search"]
+    with pytest.raises(RuntimeError):
+        skill._client
+
+
+def test_backward_compatible_imports():
+    """従来どおりパッケージからスキルクラスをimportできるかテスト"""
+    from ai_agent_work_base.skills import EchoSkill, load_all_skills
+
+    assert EchoSkill().name == "echo"
+    assert get_skill_registry() is get_skill_registry()
+    assert callable(load_all_skills)
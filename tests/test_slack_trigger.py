@@ -0,0 +1,113 @@
+"""
+SlackTriggerApp（/run の同時実行制御）のテスト
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from ai_agent_work_base.engine.slack_trigger import SlackTriggerApp
+from ai_agent_work_base.skills import EchoSkill
+
+
+def write_workflow(path):
+    path.write_text("""
+name: "Echo"
+nodes:
+  - id: step1
+    type: skill
+    skill: echo
+    params:
+      message: "{{inputs.message}}"
+    next: end
+""", encoding="utf-8")
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def app(tmp_path):
+    write_workflow(tmp_path / "echo.yaml")
+    app = SlackTriggerApp(
+        tmp_path, MagicMock(), [EchoSkill()], bot_token="x", app_token="y",
+        max_concurrency=2, max_per_user=1, max_per_channel=2, max_queue=2,
+    )
+    release = threading.Event()
+    started = []
+
+    async def blocking_run(workflow_name, inputs, say):
+        started.append(inputs)
+        await asyncio.to_thread(release.wait, 5)
+
+    app._run_workflow = blocking_run
+    app.release = release
+    app.started = started
+    yield app
+    release.set()
+
+
+def test_queues_when_saturated_and_reports_position(app):
+    """上限に達したら実行待ちに積み、順番を返信するかテスト"""
+    say = MagicMock()
+    assert app.submit_run("echo", {"n": "1"}, say, user="U1", channel="C1").startswith("⏳")
+    assert app.submit_run("echo", {"n": "2"}, say, user="U2", channel="C2").startswith("⏳")
+    assert app.submit_run("echo", {"n": "3"}, say, user="U3", channel="C3").startswith("🕒 queued (#1)")
+    assert app.submit_run("echo", {"n": "4"}, say, user="U4", channel="C4").startswith("🕒 queued (#2)")
+    assert app.submit_run("echo", {"n": "5"}, say, user="U5", channel="C5").startswith("🚫")
+    assert app.queue_status() == {"running": 2, "queued": 2}
+
+    app.release.set()
+    assert wait_until(lambda: app.queue_status() == {"running": 0, "queued": 0})
+    assert sorted(i["n"] for i in app.started) == ["1", "2", "3", "4"]
+    say.assert_any_call("⏳ 実行待ちだったワークフロー `echo` を開始しました。")
+
+
+def test_per_user_cap(app):
+    """同じユーザーの2件目は全体に空きがあっても実行待ちになるかテスト"""
+    say = MagicMock()
+    assert app.submit_run("echo", {"n": "1"}, say, user="U1", channel="C1").startswith("⏳")
+    assert app.submit_run("echo", {"n": "2"}, say, user="U1", channel="C1").startswith("🕒 queued (#1)")
+    # 別ユーザーは追い越して開始できる
+    assert app.submit_run("echo", {"n": "3"}, say, user="U2", channel="C2").startswith("⏳")
+    assert app.queue_status() == {"running": 2, "queued": 1}
+
+
+def test_duplicate_request_is_rejected(app):
+    """同じチャンネルの同一リクエストは受け付けないかテスト"""
+    say = MagicMock()
+    app.submit_run("echo", {"n": "1"}, say, user="U1", channel="C1")
+    assert app.submit_run("echo", {"n": "1"}, say, user="U2", channel="C1").startswith("ℹ️")
+    assert app.queue_status() == {"running": 1, "queued": 0}
+
+
+def test_executor_is_reused(tmp_path):
+    """同じワークフローの GraphExecutor を再利用し、結果を返信するかテスト"""
+    write_workflow(tmp_path / "echo.yaml")
+    app = SlackTriggerApp(tmp_path, MagicMock(), [EchoSkill()], bot_token="x", app_token="y")
+    assert app._executor("echo") is app._executor("echo")
+
+    say = MagicMock()
+    app.submit_run("echo", {"message": "hello"}, say, user="U1", channel="C1")
+    assert wait_until(lambda: app.queue_status()["running"] == 0)
+    assert "hello" in say.call_args[0][0]
+
+
+def test_workflow_list_uses_catalog(tmp_path):
+    """/workflows の返信にカタログの内容が使われるかテスト"""
+    write_workflow(tmp_path / "echo.yaml")
+    (tmp_path / "broken.yaml").write_text("name: [", encoding="utf-8")
+    app = SlackTriggerApp(tmp_path, MagicMock(), [EchoSkill()], bot_token="x", app_token="y")
+
+    text = app.format_workflow_list()
+    assert "• `echo` — Echo (入力: なし)" in text
+    assert "• `broken` (読み込みエラー)" in text
+    assert app.format_workflow_list() is text
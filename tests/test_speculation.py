@@ -0,0 +1,239 @@
+"""
+condition ノードの分岐先の先行実行（speculate）のテスト
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.skills.basic import EchoSkill
+
+
+class DelayEchoSkill(EchoSkill):
+    """delay 秒待ってから message を返し、呼び出しを記録するテスト用スキル（副作用なし）"""
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def execute(self, message: str, delay: float = 0, **kwargs) -> str:
+        with self._lock:
+            self.calls.append(message)
+        time.sleep(delay)
+        return message
+
+
+class NotifySkill(DelayEchoSkill):
+    """副作用のあるスキル"""
+    side_effect_free = False
+
+    @property
+    def name(self) -> str:
+        return "notify"
+
+
+def make_workflow(speculate: str = "true", deep_message: str = "plan", deep_skill: str = "echo"):
+    yaml_content = f"""
+name: Speculation Test
+nodes:
+  - id: judge
+    type: skill
+    skill: echo
+    params:
+      message: "{{{{inputs.verdict}}}}"
+      delay: 0.3
+    next: route
+  - id: route
+    type: condition
+    speculate: {speculate}
+    params:
+      source: judge
+    branches:
+      deep: plan
+      shallow: merge
+  - id: plan
+    type: skill
+    skill: {deep_skill}
+    params:
+      message: "{deep_message}"
+      delay: 0.3
+    next: end
+  - id: merge
+    type: skill
+    skill: echo
+    params:
+      message: "merge"
+      delay: 0.3
+    next: end
+"""
+    return WorkflowLoader.load(yaml_content)
+
+
+def make_executor(workflow, skill, **kwargs):
+    events = []
+    executor = GraphExecutor(
+        workflow,
+        [skill, NotifySkill()],
+        MagicMock(),
+        on_node_start=lambda node: events.append(("start", node.id)),
+        on_node_end=lambda node, output: events.append(("end", node.id)),
+        **kwargs,
+    )
+    return executor, events
+
+
+@pytest.mark.parametrize("scheduler", ["sequential", "dag"])
+def test_winner_branch_overlaps_judge(scheduler):
+    """判定ノードの実行中に分岐先が先行実行され、採用された分岐のみコールバックが呼ばれるかテスト"""
+    skill = DelayEchoSkill()
+    executor, events = make_executor(make_workflow(), skill, scheduler=scheduler)
+
+    start = time.perf_counter()
+    result = executor.execute({"verdict": "deep"})
+    elapsed = time.perf_counter() - start
+
+    assert result["plan"]["output"] == "plan"
+    assert "merge" not in result
+    assert elapsed < 0.55
+    assert skill.calls.count("plan") == 1
+    assert events == [
+        ("start", "judge"), ("end", "judge"),
+        ("start", "route"), ("end", "route"),
+        ("start", "plan"), ("end", "plan"),
+    ]
+
+
+def test_async_speculation():
+    """aexecute() でも先行実行され、不採用の分岐はキャンセルされるかテスト"""
+    skill = DelayEchoSkill()
+    executor, events = make_executor(make_workflow(), skill)
+
+    start = time.perf_counter()
+    result = asyncio.run(executor.aexecute({"verdict": "shallow"}))
+    elapsed = time.perf_counter() - start
+
+    assert result["merge"]["output"] == "merge"
+    assert "plan" not in result
+    assert elapsed < 0.55
+    assert ("start", "plan") not in events
+
+
+def test_speculate_list_limits_branches():
+    """speculate にブランチを指定した場合はそのブランチのみ先行実行するかテスト"""
+    skill = DelayEchoSkill()
+    executor, _ = make_executor(make_workflow(speculate='["shallow"]'), skill)
+
+    start = time.perf_counter()
+    executor.execute({"verdict": "deep"})
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.6
+    assert skill.calls.count("plan") == 1
+
+
+def test_node_referencing_judge_is_not_speculated():
+    """判定ノードの出力を参照する分岐先は先行実行しないかテスト"""
+    skill = DelayEchoSkill()
+    executor, _ = make_executor(make_workflow(deep_message="{{judge.output}}!"), skill)
+
+    result = executor.execute({"verdict": "deep"})
+
+    assert result["plan"]["output"] == "deep!"
+    # merge は先行実行されるが、plan は判定の完了後に1回だけ実行される
+    assert [c for c in skill.calls if c != "merge"] == ["deep", "deep!"]
+
+
+def test_side_effect_node_is_not_speculated():
+    """副作用のあるスキルのノードは先行実行しないかテスト"""
+    skill = DelayEchoSkill()
+    executor, _ = make_executor(make_workflow(deep_skill="notify"), skill)
+
+    start = time.perf_counter()
+    executor.execute({"verdict": "deep"})
+
+    assert time.perf_counter() - start >= 0.6
+
+
+def test_speculative_failure_is_raised_only_when_adopted():
+    """先行実行の失敗は、その分岐が採用された場合のみ送出されるかテスト"""
+    class FailingPlanSkill(DelayEchoSkill):
+        def execute(self, message: str, delay: float = 0, **kwargs) -> str:
+            if message == "plan":
+                raise RuntimeError("plan failed")
+            return super().execute(message, delay, **kwargs)
+
+    executor, _ = make_executor(make_workflow(), FailingPlanSkill())
+    assert executor.execute({"verdict": "shallow"})["merge"]["output"] == "merge"
+
+    with pytest.raises(RuntimeError, match="plan failed"):
+        executor.execute({"verdict": "deep"})
+
+
+def make_foreach_workflow(node_type: str):
+    yaml_content = f"""
+name: Speculation Foreach Test
+nodes:
+  - id: judge
+    type: skill
+    skill: echo
+    params:
+      message: "{{{{inputs.verdict}}}}"
+      delay: 0.3
+    next: route
+  - id: route
+    type: condition
+    speculate: true
+    params:
+      source: judge
+    branches:
+      deep: plan
+      shallow: merge
+  - id: plan
+    type: {node_type}
+    items: "{{{{inputs.items}}}}"
+    concurrency: 2
+    node:
+      type: skill
+      skill: echo
+      params:
+        message: "{{{{item}}}}"
+    next: end
+  - id: merge
+    type: skill
+    skill: echo
+    params:
+      message: "merge"
+    next: end
+"""
+    return WorkflowLoader.load(yaml_content)
+
+
+@pytest.mark.parametrize("node_type", ["foreach", "parallel"])
+@pytest.mark.parametrize("use_async", [False, True])
+def test_item_callbacks_are_buffered_until_adopted(node_type, use_async):
+    """先行実行した foreach / parallel の item コールバックは採用時にのみ呼ばれ、不採用の分岐からは呼ばれないかテスト"""
+    def run(verdict):
+        executor, events = make_executor(
+            make_foreach_workflow(node_type),
+            DelayEchoSkill(),
+            on_foreach_item_start=lambda node, idx, total, item: events.append(("item_start", node.id, idx)),
+            on_foreach_item_end=lambda node, idx, total, item, result: events.append(("item_end", node.id, idx)),
+        )
+        if use_async:
+            asyncio.run(executor.aexecute({"verdict": verdict, "items": ["a", "b"]}))
+        else:
+            executor.execute({"verdict": verdict, "items": ["a", "b"]})
+        return events
+
+    events = run("shallow")
+    assert not [e for e in events if e[0].startswith("item")]
+    assert events[-2:] == [("start", "merge"), ("end", "merge")]
+
+    events = run("deep")
+    plan_events = events[events.index(("start", "plan")):]
+    assert plan_events[0] == ("start", "plan") and plan_events[-1] == ("end", "plan")
+    assert sorted(plan_events[1:-1]) == [("item_end", "plan", 0), ("item_end", "plan", 1),
+                                         ("item_start", "plan", 0), ("item_start", "plan", 1)]
@@ -0,0 +1,132 @@
+"""
+LLMノードのトークンストリーミングのテスト
+"""
+import asyncio
+
+from unittest.mock import AsyncMock, MagicMock
+
+from openai.types.chat import ChatCompletionChunk
+
+from ai_agent_work_base.core.llm import LLMClient
+from ai_agent_work_base.core.llm_cache import MemoryResponseCache
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+
+
+def make_chunks(parts):
+    chunks = []
+    for i, text in enumerate(parts):
+        last = i == len(parts) - 1
+        chunks.append(ChatCompletionChunk.model_validate({
+            "id": "chatcmpl-1",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": "stop" if last else None}],
+        }))
+    # include_usage 指定時の最終チャンク（choices が空）
+    chunks.append(ChatCompletionChunk.model_validate({
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-test",
+        "choices": [],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+    }))
+    return chunks
+
+
+class AsyncStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_client(monkeypatch, parts, cache=None) -> LLMClient:
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    client = LLMClient(model="gpt-test", cache=cache)
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = lambda **kwargs: iter(make_chunks(parts))
+    client._async_client = MagicMock()
+    client._async_client.chat.completions.create = AsyncMock(side_effect=lambda **kwargs: AsyncStream(make_chunks(parts)))
+    return client
+
+
+YAML = """
+name: Stream Test
+nodes:
+  - id: write
+    type: llm
+    prompt: "Write about {{inputs.topic}}"
+    next: end
+"""
+
+
+def test_stream_chat_completion_assembles_response(monkeypatch):
+    """差分ごとに on_delta が呼ばれ、連結した結果が ChatCompletion として返るかテスト"""
+    client = make_client(monkeypatch, ["Hel", "lo"])
+    deltas = []
+
+    response = client.stream_chat_completion(messages=[{"role": "user", "content": "hi"}], on_delta=deltas.append)
+
+    assert deltas == ["Hel", "lo"]
+    assert response.choices[0].message.content == "Hello"
+    assert response.choices[0].finish_reason == "stop"
+    assert response.usage.total_tokens == 5
+    kwargs = client.client.chat.completions.create.call_args.kwargs
+    assert kwargs["stream"] is True
+
+
+def test_executor_streams_tokens_to_callback(monkeypatch):
+    """on_node_token に差分が渡され、ノードの出力は非ストリーミング時と同じになるかテスト"""
+    client = make_client(monkeypatch, ["A", "B", "C"])
+    tokens = []
+    executor = GraphExecutor(
+        WorkflowLoader.load(YAML), [], client,
+        on_node_token=lambda node, delta: tokens.append((node.id, delta)),
+    )
+
+    result = executor.execute({"topic": "x"})
+
+    assert tokens == [("write", "A"), ("write", "B"), ("write", "C")]
+    assert result["write"]["output"] == "ABC"
+
+
+def test_async_executor_streams_to_async_callback(monkeypatch):
+    """aexecute() で async の on_node_token が await されるかテスト"""
+    client = make_client(monkeypatch, ["{\"a\": ", "1}"])
+    tokens = []
+
+    async def on_token(node, delta):
+        tokens.append(delta)
+
+    yaml_content = YAML.replace('    next: end', '    output_format: json\n    next: end')
+    executor = GraphExecutor(WorkflowLoader.load(yaml_content), [], client, on_node_token=on_token)
+
+    result = asyncio.run(executor.aexecute({"topic": "x"}))
+
+    assert tokens == ["{\"a\": ", "1}"]
+    assert result["write"]["output"] == {"a": 1}
+
+
+def test_streamed_response_is_cached(monkeypatch):
+    """ストリーミングの結果がキャッシュされ、ヒット時は全文を1回で渡すかテスト"""
+    client = make_client(monkeypatch, ["Hel", "lo"], cache=MemoryResponseCache())
+    messages = [{"role": "user", "content": "hi"}]
+
+    client.stream_chat_completion(messages=messages, on_delta=lambda d: None)
+    deltas = []
+    response = client.stream_chat_completion(messages=messages, on_delta=deltas.append)
+
+    assert client.client.chat.completions.create.call_count == 1
+    assert deltas == ["Hello"]
+    assert response.choices[0].message.content == "Hello"
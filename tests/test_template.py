@@ -0,0 +1,94 @@
+"""
+テンプレートエンジン（コンパイル済みテンプレート）のテスト
+"""
+from unittest.mock import MagicMock
+
+from ai_agent_work_base.engine.context import WorkflowContext
+from ai_agent_work_base.engine.executor import GraphExecutor
+from ai_agent_work_base.engine.loader import WorkflowLoader
+from ai_agent_work_base.engine.template import CompiledValue, compile_template, parse_path
+from ai_agent_work_base.skills.basic import EchoSkill
+
+
+def make_context() -> WorkflowContext:
+    context = WorkflowContext({"topic": "AI", "count": 3})
+    context.set_step_output("plan", {"queries": ["q1", "q2", "q3"], "meta": {"lang": "ja"}})
+    return context
+
+
+def test_parse_path():
+    """ドット区切り・インデックス付きのキーをアクセスパスに分割できるかテスト"""
+    assert parse_path("inputs.topic") == ("inputs", "topic")
+    assert parse_path("plan.output.queries[0]") == ("plan", "output", "queries", 0)
+    assert parse_path("plan.output.rows[1][-1]") == ("plan", "output", "rows", 1, -1)
+
+
+def test_resolve_template_list_index():
+    """{{plan.output.queries[0]}} のようなリストのインデックス指定が解決できるかテスト"""
+    context = make_context()
+
+    assert context.resolve_template("first={{plan.output.queries[0]}}") == "first=q1"
+    assert context.resolve_template("last={{ plan.output.queries[-1] }}") == "last=q3"
+    assert context.get("plan.output.queries[1]") == "q2"
+
+
+def test_resolve_template_keeps_unresolved():
+    """存在しない変数や範囲外のインデックスは元のプレースホルダのまま残るかテスト"""
+    context = make_context()
+
+    assert context.resolve_template("{{missing.output}} / {{plan.output.queries[9]}}") == (
+        "{{missing.output}} / {{plan.output.queries[9]}}"
+    )
+
+
+def test_resolve_value_preserves_type():
+    """文字列全体が変数参照の場合は型を維持し、入れ子のparamsも解決できるかテスト"""
+    context = make_context()
+
+    assert context.resolve_value("{{inputs.count}}") == 3
+    assert context.resolve_value("{{plan.output.queries}}") == ["q1", "q2", "q3"]
+    resolved = context.resolve_value({
+        "query": "{{inputs.topic}} {{plan.output.meta.lang}}",
+        "list": ["{{plan.output.queries[2]}}", 1],
+        "static": {"a": "b"},
+    })
+    assert resolved == {"query": "AI ja", "list": ["q3", 1], "static": {"a": "b"}}
+
+
+def test_compile_template_is_cached():
+    """同じテンプレート文字列は一度だけコンパイルされるかテスト"""
+    text = "Research about {{inputs.topic}}"
+
+    assert compile_template(text) is compile_template(text)
+    assert compile_template("plain text").is_static
+
+
+def test_compiled_value_resolves_against_different_data():
+    """コンパイル済みの値を異なるデータで繰り返し解決できるかテスト"""
+    compiled = CompiledValue({"message": "{{item}}", "prefix": "fixed"})
+
+    assert compiled.resolve({"item": "a"}) == {"message": "a", "prefix": "fixed"}
+    assert compiled.resolve({"item": "b"}) == {"message": "b", "prefix": "fixed"}
+
+
+def test_foreach_params_with_index():
+    """foreachの子ノードのparamsでインデックス指定が使えるかテスト"""
+    yaml_content = """
+name: Index Test
+nodes:
+  - id: each
+    type: foreach
+    items: "{{inputs.rows}}"
+    node:
+      type: skill
+      skill: echo
+      params:
+        message: "{{item[0]}}={{item[1]}}"
+    next: end
+"""
+    workflow = WorkflowLoader.load(yaml_content)
+    executor = GraphExecutor(workflow, [EchoSkill()], MagicMock())
+
+    result = executor.execute({"rows": [["a", 1], ["b", 2]]})
+
+    assert result["each"]["output"] == ["a=1", "b=2"]
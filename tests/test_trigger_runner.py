@@ -0,0 +1,171 @@
+"""
+TriggerRunner（cronトリガー）のテスト
+"""
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import ValidationError
+
+from ai_agent_work_base.engine.trigger_runner import TriggerRunner
+from ai_agent_work_base.schemas.trigger import CronTriggerConfig
+
+
+def write_trigger(path, name, options=""):
+    path.write_text(f"""
+name: "{name}"
+workflow: "daily_news"
+trigger:
+  type: "cron"
+  schedule: "0 7 * * *"
+{options}
+""", encoding="utf-8")
+
+
+@pytest.fixture
+def scheduler_factory():
+    schedulers = []
+
+    def start(runner):
+        scheduler = runner.start_cron()
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield start
+    for scheduler in schedulers:
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
+
+
+def make_runner(tmp_path, **kwargs):
+    return TriggerRunner(tmp_path, tmp_path / "workflows", llm_client=MagicMock(), skills=[], **kwargs)
+
+
+def test_cron_defaults():
+    """オプション省略時は重複実行しない設定になるかテスト"""
+    config = CronTriggerConfig(type="cron", schedule="0 7 * * *")
+    assert config.max_instances == 1
+    assert config.coalesce is True
+    assert config.misfire_grace_time == 300
+    assert config.jitter is None
+
+    with pytest.raises(ValidationError):
+        CronTriggerConfig(type="cron", schedule="0 7 * * *", max_instances=0)
+
+
+def test_start_cron_applies_job_options(tmp_path, scheduler_factory):
+    """YAMLのオプションがジョブとスケジューラーに反映されるかテスト"""
+    write_trigger(tmp_path / "news.yaml", "News", options="""
+  max_instances: 2
+  coalesce: false
+  misfire_grace_time: 60
+  jitter: 30""")
+    scheduler = scheduler_factory(make_runner(tmp_path, max_workers=3))
+
+    job = scheduler.get_job("News")
+    assert job.max_instances == 2
+    assert job.coalesce is False
+    assert job.misfire_grace_time == 60
+    assert job.trigger.jitter == 30
+    assert scheduler._executors["default"]._pool._max_workers == 3
+
+
+def test_start_cron_skips_invalid_config(tmp_path, scheduler_factory):
+    """不正なオプションのトリガーは登録しないかテスト"""
+    write_trigger(tmp_path / "ok.yaml", "OK")
+    write_trigger(tmp_path / "bad.yaml", "Bad", options="  max_instances: 0")
+    scheduler = scheduler_factory(make_runner(tmp_path))
+
+    assert scheduler.get_job("OK") is not None
+    assert scheduler.get_job("Bad") is None
+
+
+def write_workflow(path, message):
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(f"""
+name: "Daily News"
+nodes:
+  - id: step1
+    type: skill
+    skill: echo
+    params:
+      message: "{message}"
+    next: end
+""", encoding="utf-8")
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def compiled_runner(tmp_path):
+    from ai_agent_work_base.skills import EchoSkill
+
+    write_workflow(tmp_path / "workflows" / "daily_news.yaml", "v1")
+    write_trigger(tmp_path / "news.yaml", "News")
+    write_trigger(tmp_path / "other.yaml", "Other")
+    return TriggerRunner(
+        tmp_path, tmp_path / "workflows", llm_client=MagicMock(), skills=[EchoSkill()], watch_interval=0
+    )
+
+
+def test_run_once_uses_precompiled_workflow(compiled_runner):
+    """起動時に読み込んだ定義を使い、実行時にYAMLを読み直さないかテスト"""
+    compiled_runner.compile()
+    with patch("ai_agent_work_base.engine.trigger_runner.yaml.safe_load") as safe_load, \
+            patch("ai_agent_work_base.engine.registry.yaml.safe_load") as workflow_load:
+        result = compiled_runner.run_once("News")
+    assert result["step1"] == {"output": "v1"}
+    safe_load.assert_not_called()
+    workflow_load.assert_not_called()
+
+    with pytest.raises(ValueError):
+        compiled_runner.run_once("Missing")
+
+
+def test_watch_reschedules_only_changed_triggers(compiled_runner, tmp_path, scheduler_factory):
+    """変更されたトリガーのジョブのみ登録し直し、削除されたトリガーのジョブを解除するかテスト"""
+    scheduler = scheduler_factory(compiled_runner)
+    other_trigger = scheduler.get_job("Other").trigger
+    assert compiled_runner.watch() == set()
+
+    path = tmp_path / "news.yaml"
+    path.write_text(path.read_text(encoding="utf-8").replace("0 7 * * *", "30 8 * * *"), encoding="utf-8")
+    bump_mtime(path)
+    assert compiled_runner.watch() == {"News"}
+    assert "hour='8'" in str(scheduler.get_job("News").trigger)
+    assert str(scheduler.get_job("Other").trigger) == str(other_trigger)
+
+    (tmp_path / "other.yaml").unlink()
+    assert compiled_runner.watch() == {"Other"}
+    assert scheduler.get_job("Other") is None
+
+
+def test_watch_rebuilds_executor_when_workflow_changes(compiled_runner, tmp_path):
+    """ワークフローが変更された場合は実行時に新しい定義が使われるかテスト"""
+    compiled_runner.compile()
+    assert compiled_runner.run_once("News")["step1"] == {"output": "v1"}
+
+    path = tmp_path / "workflows" / "daily_news.yaml"
+    write_workflow(path, "v2")
+    bump_mtime(path)
+    assert compiled_runner.watch() == {"News", "Other"}
+    assert compiled_runner.run_once("News")["step1"] == {"output": "v2"}
+
+
+def test_watch_keeps_schedule_when_only_workflow_changes(compiled_runner, tmp_path, scheduler_factory):
+    """ワークフローのみの変更ではジョブを登録し直さない（次回実行時刻・jitter が変わらない）かテスト"""
+    write_trigger(tmp_path / "news.yaml", "News", options="  jitter: 3600")
+    scheduler = scheduler_factory(compiled_runner)
+    next_run_time = scheduler.get_job("News").next_run_time
+
+    path = tmp_path / "workflows" / "daily_news.yaml"
+    write_workflow(path, "v2")
+    bump_mtime(path)
+    with patch.object(compiled_runner, "_schedule", wraps=compiled_runner._schedule) as schedule:
+        assert compiled_runner.watch() == {"News", "Other"}
+    schedule.assert_not_called()
+    assert scheduler.get_job("News").next_run_time == next_run_time
+    assert compiled_runner.run_once("News")["step1"] == {"output": "v2"}
@@ -36,6 +36,19 @@ def test_list_workflows():
     assert any("inquiry_response" in n for n in names)
 
 
+def test_list_workflows_not_modified():
+    """If-None-Match が ETag と一致する場合は304が返る"""
+    resp = client.get("/workflows")
+    etag = resp.headers["etag"]
+    resp = client.get("/workflows", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+
+    for header in (f'"other", {etag}', f"W/{etag}", "*"):
+        assert client.get("/workflows", headers={"If-None-Match": header}).status_code == 304
+    assert client.get("/workflows", headers={"If-None-Match": '"other", W/"stale"'}).status_code == 200
+
+
 # -----------------------------------------------------------------------
 # /webhook 汎用エンドポイント（正常系）
 # -----------------------------------------------------------------------
@@ -0,0 +1,151 @@
+"""
+WorkflowRegistry のテスト
+"""
+import os
+
+import pytest
+from unittest.mock import patch
+
+from ai_agent_work_base.engine.registry import WorkflowRegistry, get_registry
+
+
+def write_workflow(path, name, description=""):
+    path.write_text(f"""
+name: "{name}"
+description: "{description}"
+nodes:
+  - id: step1
+    type: skill
+    skill: echo
+    params:
+      message: "hi"
+    next: end
+""", encoding="utf-8")
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    write_workflow(tmp_path / "daily_news.yaml", "Daily News")
+    write_workflow(tmp_path / "report.yml", "Report")
+    return WorkflowRegistry(tmp_path, refresh_interval=0)
+
+
+def test_resolve_by_file_name_stem_and_workflow_name(registry, tmp_path):
+    """ファイル名・拡張子なしのファイル名・ワークフロー名で解決できるかテスト"""
+    assert registry.resolve_path("daily_news") == tmp_path / "daily_news.yaml"
+    assert registry.resolve_path("daily_news.yaml") == tmp_path / "daily_news.yaml"
+    assert registry.resolve_path("Report") == tmp_path / "report.yml"
+    assert registry.get("report").name == "Report"
+
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing")
+
+
+def test_definition_is_parsed_once(registry):
+    """変更がなければ再パースせず同じ定義オブジェクトを返すかテスト"""
+    first = registry.get("daily_news")
+    with patch("ai_agent_work_base.engine.registry.yaml.safe_load") as safe_load:
+        assert registry.get("daily_news") is first
+        registry.entries()
+    safe_load.assert_not_called()
+
+
+def test_reload_when_file_changes(registry, tmp_path):
+    """ファイルの内容が変わった場合のみ再読み込みするかテスト"""
+    path = tmp_path / "daily_news.yaml"
+    first = registry.get("daily_news")
+
+    # 内容が同じなら更新日時が変わっても再パースしない
+    bump_mtime(path)
+    assert registry.get("daily_news") is first
+
+    write_workflow(path, "Daily News", description="updated")
+    bump_mtime(path)
+    assert registry.get("daily_news").description == "updated"
+
+
+def test_added_and_removed_files(registry, tmp_path):
+    """追加されたファイルは即座に解決でき、削除されたファイルは解決できなくなるかテスト"""
+    write_workflow(tmp_path / "new_flow.yaml", "New Flow")
+    assert registry.get("new_flow").name == "New Flow"
+
+    (tmp_path / "report.yml").unlink()
+    with pytest.raises(FileNotFoundError):
+        registry.get("report")
+
+
+def test_invalid_workflow_is_listed_with_error(registry, tmp_path):
+    """読み込みに失敗したファイルはエラー付きで保持され、get では ValueError になるかテスト"""
+    (tmp_path / "broken.yaml").write_text("name: broken\n", encoding="utf-8")
+
+    entries = {e.path.name: e for e in registry.entries()}
+    assert entries["broken.yaml"].definition is None
+    assert entries["broken.yaml"].error
+    assert [p.name for p, _ in registry.workflows()] == ["daily_news.yaml", "report.yml"]
+    with pytest.raises(ValueError):
+        registry.get("broken")
+
+
+def test_refresh_interval_throttles_scans(tmp_path):
+    """refresh_interval の間はディレクトリを再走査しないかテスト"""
+    write_workflow(tmp_path / "a.yaml", "A")
+    registry = WorkflowRegistry(tmp_path, refresh_interval=60)
+    assert [p.name for p, _ in registry.workflows()] == ["a.yaml"]
+
+    write_workflow(tmp_path / "b.yaml", "B")
+    assert [p.name for p, _ in registry.workflows()] == ["a.yaml"]
+    # 未知の名前を引いた場合は即座に再走査する
+    assert registry.get("b").name == "B"
+
+
+def test_unknown_name_rescans_only_when_directory_changes(tmp_path):
+    """未知の名前を引いても、ディレクトリが変わっていなければ再走査しないかテスト"""
+    write_workflow(tmp_path / "a.yaml", "A")
+    os.utime(tmp_path, ns=(0, 1_000_000_000))
+    registry = WorkflowRegistry(tmp_path, refresh_interval=60)
+    registry.get("a")
+    checked_at = registry._checked_at
+
+    for _ in range(3):
+        with pytest.raises(FileNotFoundError):
+            registry.get("missing")
+    assert registry._checked_at == checked_at
+
+    write_workflow(tmp_path / "b.yaml", "B")
+    assert registry.get("b").name == "B"
+    assert registry._checked_at != checked_at
+
+
+def test_get_registry_is_shared(tmp_path):
+    """同じディレクトリに対しては同じレジストリを返すかテスト"""
+    assert get_registry(tmp_path) is get_registry(tmp_path / ".")
+
+
+def test_catalog_is_reused_until_change(registry, tmp_path):
+    """カタログは変更がない限り同じものを返し、変更時は ETag が変わるかテスト"""
+    catalog = registry.catalog()
+    assert [w["file"] for w in catalog.workflows()] == ["daily_news.yaml", "report.yml"]
+    assert catalog.entries[1]["name"] == "Report"
+    assert registry.catalog() is catalog
+
+    path = tmp_path / "daily_news.yaml"
+    write_workflow(path, "Daily News", description="updated")
+    bump_mtime(path)
+    updated = registry.catalog()
+    assert updated.etag != catalog.etag
+    assert updated.generation == catalog.generation + 1
+    assert updated.entries[0]["description"] == "updated"
+
+
+def test_catalog_lists_broken_files(registry, tmp_path):
+    """読み込みに失敗したファイルはエラーとしてカタログに含まれるかテスト"""
+    (tmp_path / "broken.yaml").write_text("name: [", encoding="utf-8")
+    catalog = registry.catalog()
+    broken = [w for w in catalog.entries if w["file"] == "broken.yaml"][0]
+    assert broken["error"]
+    assert "broken.yaml" not in [w["file"] for w in catalog.workflows()]